@@ -8,21 +8,34 @@ Features:
 - ML model training and predictions
 - Text analysis and questionnaire assessments
 """
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+import hmac
+import io
 import json
 import os
 from mental_health_predictor import MentalHealthPredictor
 from text_analyzer import TextAnalyzer
 from database import (
     create_user, get_user, get_user_by_email, update_user_activity, get_all_users,
-    save_chat_message, get_chat_history, clear_chat_history,
+    save_chat_message, get_chat_history, get_chat_history_page, clear_chat_history,
     save_assessment, get_user_assessments,
-    save_chat_analysis, get_chat_analysis
+    record_chat_analysis, get_chat_analysis, run_write, CHAT_WRITE_BEHIND,
+    get_cohort, RISK_RANKS, search_chat_messages, get_search_index_status,
+    get_cache_stats
 )
+from write_behind import get_write_behind
 from chatbot import MentalHealthChatbot
 from ml_model import get_model, MentalHealthMLModel
+from cascade_predictor import CascadePredictor
+from micro_batcher import MicroBatcher
+from model_server import ModelServerClient
+from multi_head_model import get_multi_head_model
+from stage_runner import Stage, StageRunner
+from fusion_engine import FUSED_RESULT_KEYS
+from facial_aggregator import get_facial_aggregator
+from reports import build_user_report
 
 app = Flask(__name__)
 # Configure CORS to allow requests from GitHub Pages and other deployment platforms
@@ -43,7 +56,53 @@ CORS(app, resources={
 predictor = MentalHealthPredictor()
 text_analyzer = TextAnalyzer()
 chatbot = MentalHealthChatbot()
-ml_model = get_model()
+# Use the shared model-server sidecar when configured; the in-process model
+# is then only loaded as a fallback if the sidecar is unreachable
+if os.environ.get('MODEL_SERVER_SOCKET'):
+    ml_model = ModelServerClient(os.environ['MODEL_SERVER_SOCKET'])
+else:
+    ml_model = get_model()
+cascade_predictor = CascadePredictor(
+    text_analyzer,
+    ml_model,
+    confidence_threshold=float(os.environ.get('CASCADE_CONFIDENCE_THRESHOLD', '0.8'))
+)
+
+condition_model = get_multi_head_model()
+
+facial_aggregator = get_facial_aggregator()
+
+MAX_HISTORY_PAGE_SIZE = 500
+MAX_COHORT_SIZE = 1000
+
+# Bearer token required by the admin and chat search endpoints (they answer 403 when unset)
+ADMIN_API_TOKEN = os.environ.get('ADMIN_API_TOKEN')
+MAX_SEARCH_PAGE_SIZE = 100
+
+# Shared pool for the concurrent analyzers of /api/analyze/combined
+stage_runner = StageRunner(max_workers=int(os.environ.get('ANALYSIS_WORKERS', '8')))
+COMBINED_ANALYSIS_DEADLINE_MS = float(os.environ.get('COMBINED_ANALYSIS_DEADLINE_MS', '1000'))
+
+# Optional micro-batching of concurrent /api/model/predict requests
+model_batcher = None
+if os.environ.get('MODEL_MICRO_BATCHING', 'false').lower() == 'true':
+    model_batcher = MicroBatcher(
+        ml_model.predict_batch,
+        max_batch_size=int(os.environ.get('MODEL_BATCH_MAX_SIZE', '32')),
+        max_wait_ms=float(os.environ.get('MODEL_BATCH_WAIT_MS', '2'))
+    )
+
+
+def check_admin_token():
+    """Return an error response unless the request carries the admin bearer token"""
+    if not ADMIN_API_TOKEN:
+        # Fail closed: admin data is never served without a configured token
+        return jsonify({'error': 'Admin endpoints are disabled; set ADMIN_API_TOKEN to enable them'}), 403
+    auth = request.headers.get('Authorization', '')
+    scheme, _, token = auth.partition(' ')
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(token.strip().encode(), ADMIN_API_TOKEN.encode()):
+        return jsonify({'error': 'Unauthorized'}), 401
+    return None
 
 
 @app.route('/api/health', methods=['GET'])
@@ -78,6 +137,40 @@ def analyze_questionnaire():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/analyze/questionnaire/batch', methods=['POST'])
+def analyze_questionnaire_batch():
+    """
+    Score many questionnaire submissions in one request
+    
+    Expected JSON body (either or both matrices, same number of rows):
+    {
+        "phq9": [[0, 1, 2, 3, 0, 1, 2, 1, 0], ...],  # N x 9
+        "gad7": [[0, 1, 2, 3, 0, 1, 2], ...]         # N x 7
+    }
+    
+    Alternatively post a CSV (Content-Type: text/csv) with columns
+    id, phq9_1..phq9_9 and/or gad7_1..gad7_7; results stream back as CSV.
+    """
+    try:
+        if request.mimetype == 'text/csv':
+            stream = io.TextIOWrapper(request.stream, encoding='utf-8')
+            # Header problems raise here, before the 200 response starts
+            lines = predictor.iter_questionnaire_csv(stream)
+            return Response(stream_with_context(lines), mimetype='text/csv')
+        
+        data = request.get_json()
+        if not data or not (data.get('phq9') or data.get('gad7')):
+            return jsonify({'error': 'No responses provided'}), 400
+        
+        results = predictor.score_questionnaires_batch(data.get('phq9'), data.get('gad7'))
+        invalid = sum(1 for result in results if 'error' in result)
+        return jsonify({'results': results, 'count': len(results), 'invalid': invalid})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/analyze/text', methods=['POST'])
 def analyze_text():
     """
@@ -112,34 +205,130 @@ def analyze_combined():
     {
         "responses": {...},
         "text": "...",
-        "facial_emotion": "happy"  # optional
+        "facial_emotion": "happy",  # optional
+        "facial_session_id": "..."  # optional, frames sent to /api/facial/frames
     }
+
+    Analyzers run concurrently. Optional ones still running after
+    COMBINED_ANALYSIS_DEADLINE_MS are left out and listed in metadata.
     """
     try:
         data = request.get_json()
         
         results = {}
+        stages = []
         
         # Analyze questionnaire if provided
         if 'responses' in data and data['responses']:
-            results['questionnaire'] = predictor.predict_from_questionnaire(data['responses'])
+            stages.append(Stage('questionnaire', lambda emit: emit(
+                'questionnaire', predictor.predict_from_questionnaire(data['responses'])
+            ), required=True))
         
         # Analyze text if provided
         if 'text' in data and data['text'].strip():
-            results['text_analysis'] = text_analyzer.analyze(data['text'])
+            text = data['text']
+
+            use_conditions = condition_model.is_trained
+
+            def analyze_text(emit):
+                analysis = text_analyzer.analyze(text)
+                emit('text_analysis', analysis)
+                if use_conditions:
+                    # One featurization: the multi-head model's risk head stands in
+                    # for the cascade's model stage
+                    conditions = condition_model.predict(text)
+                    emit('ml_conditions', conditions)
+                    risk_head = None if conditions.get('fallback') else {
+                        key: conditions[key] for key in ('risk_level', 'confidence', 'probabilities')
+                    }
+                    emit('ml_prediction', cascade_predictor.predict(
+                        text, analysis=analysis, model_prediction=risk_head
+                    ))
+                else:
+                    # Reuse the lexicon result; the ML model only runs for ambiguous texts
+                    emit('ml_prediction', cascade_predictor.predict(text, analysis=analysis))
+
+            keys = ['text_analysis', 'ml_conditions', 'ml_prediction'] if use_conditions \
+                else ['text_analysis', 'ml_prediction']
+            stages.append(Stage(keys, analyze_text))
+        
+        # Independent analyzers run concurrently; late optional ones are dropped
+        run = stage_runner.run(stages, COMBINED_ANALYSIS_DEADLINE_MS)
+        results.update(run['outputs'])
         
         # Include facial emotion if provided
         if 'facial_emotion' in data:
             results['facial_emotion'] = data['facial_emotion']
         
-        # Generate combined assessment
-        results['combined_assessment'] = predictor.generate_combined_assessment(results)
+        # Rolling distribution of frames streamed to /api/facial/frames
+        if data.get('facial_session_id'):
+            facial_summary = facial_aggregator.get_summary(data['facial_session_id'])
+            if facial_summary and facial_summary['frames']:
+                results['facial_summary'] = facial_summary
+                results.setdefault('facial_emotion', facial_summary['dominant_emotion'])
+        
+        # Generate combined assessment; only a missing fused modality makes it
+        # less certain (ML outputs are reported but not fused)
+        results['combined_assessment'] = predictor.generate_combined_assessment(
+            results, missing_sources=[key for key in run['missing'] if key in FUSED_RESULT_KEYS]
+        )
+        results['metadata'] = {
+            'deadline_ms': COMBINED_ANALYSIS_DEADLINE_MS,
+            'timings_ms': run['timings_ms'],
+            'total_ms': run['total_ms'],
+            'missing_sources': run['errors']
+        }
         
         return jsonify(results)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/facial/frames', methods=['POST'])
+def add_facial_frames():
+    """
+    Add a batch of frame-level facial emotion detections to a session
+
+    Expected JSON body:
+    {
+        "session_id": "abc123",
+        "frames": [
+            {"emotion": "sad", "confidence": 0.82, "timestamp": 1717171717000},
+            ["neutral", 0.64, 1717171717120]
+        ]
+    }
+    """
+    try:
+        data = request.get_json()
+        if not data or 'session_id' not in data or 'frames' not in data:
+            return jsonify({'error': 'session_id and frames are required'}), 400
+
+        try:
+            summary = facial_aggregator.add_frames(data['session_id'], data['frames'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify(summary)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/facial/sessions/<session_id>', methods=['GET', 'DELETE'])
+def facial_session(session_id):
+    """Get (or forget) the rolling facial emotion aggregate of a session"""
+    try:
+        if request.method == 'DELETE':
+            if not facial_aggregator.clear_session(session_id):
+                return jsonify({'error': 'Session not found'}), 404
+            return jsonify({'message': 'Session cleared'})
+
+        summary = facial_aggregator.get_summary(session_id)
+        if summary is None:
+            return jsonify({'error': 'Session not found'}), 404
+        return jsonify(summary)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/recommendations', methods=['POST'])
 def get_recommendations():
     """
@@ -151,14 +340,23 @@ def get_recommendations():
         "conditions": ["depression", "anxiety"],
         "scores": {...}
     }
+
+    Responses carry a strong ETag; send it back in If-None-Match to get a 304.
     """
     try:
         data = request.get_json()
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
-        recommendations = predictor.get_recommendations(data)
-        return jsonify(recommendations)
+        # Content is precompiled per canonical input, so this is a table lookup
+        payload, etag = predictor.get_recommendations_payload(data)
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(payload, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -260,63 +458,48 @@ def chat():
         if not message:
             return jsonify({'error': 'Empty message'}), 400
         
-        # Get user info for personalization
+        # Reads only: no transaction or lock is held during the chatbot call
+        user = None
         user_name = None
+        history = []
         if user_id:
             user = get_user(user_id)
             if user:
                 user_name = user.get('name')
-                update_user_activity(user_id)
-        
-        # Get chat history for context
-        history = []
-        if user_id:
+            # Most recent turns for context
             history = get_chat_history(user_id, limit=10)
         
         # Get chatbot response
         result = chatbot.get_response(message, history, user_name)
         
-        # Save messages to database if user_id provided
+        # Save messages to database if user_id provided: every write of the turn
+        # in one transaction and commit.
+        # With CHAT_WRITE_BEHIND the turn is group-committed by the writer thread.
         if user_id:
-            # Save user message
-            save_chat_message(
-                user_id, 'user', message,
-                sentiment=result.get('risk_level'),
-                emotions=result.get('emotions')
-            )
+            def write_turn():
+                if user:
+                    update_user_activity(user_id)
+                
+                # Save user message
+                save_chat_message(
+                    user_id, 'user', message,
+                    sentiment=result.get('risk_level'),
+                    emotions=result.get('emotions'),
+                    topics=result.get('topics')
+                )
+                
+                # Save bot response
+                save_chat_message(user_id, 'bot', result['response'])
+                
+                # Update chat analysis counters (in-SQL increments)
+                record_chat_analysis(
+                    user_id,
+                    result.get('emotions', []),
+                    result.get('topics', []),
+                    result.get('risk_level', 'low')
+                )
             
-            # Save bot response
-            save_chat_message(user_id, 'bot', result['response'])
-            
-            # Update chat analysis
-            analysis = get_chat_analysis(user_id) or {
-                'message_count': 0,
-                'detected_emotions': [],
-                'topics': [],
-                'overall_sentiment': 'neutral',
-                'risk_level': 'low'
-            }
-            
-            # Update analysis data
-            message_count = analysis.get('message_count', 0) + 1
-            detected_emotions = list(set(analysis.get('detected_emotions', []) + result.get('emotions', [])))
-            topics = list(set(analysis.get('topics', []) + result.get('topics', [])))
-            
-            # Determine overall sentiment from emotions
-            positive_emotions = ['happy']
-            negative_emotions = ['sad', 'anxious', 'stressed', 'angry', 'lonely']
-            neg_count = len([e for e in detected_emotions if e in negative_emotions])
-            pos_count = len([e for e in detected_emotions if e in positive_emotions])
-            overall_sentiment = 'positive' if pos_count > neg_count else ('negative' if neg_count > 0 else 'neutral')
-            
-            save_chat_analysis(
-                user_id,
-                message_count,
-                detected_emotions,
-                topics,
-                overall_sentiment,
-                result.get('risk_level', 'low')
-            )
+            run_write(write_turn)
         
         return jsonify({
             'response': result['response'],
@@ -331,11 +514,26 @@ def chat():
 
 @app.route('/api/chat/history/<int:user_id>', methods=['GET'])
 def get_user_chat_history(user_id):
-    """Get chat history for a user"""
+    """
+    Get a page of chat history for a user (most recent messages by default)
+
+    Query parameters:
+        limit: messages per page (default 50, at most 500)
+        before: message id; return the messages just before it
+        after: message id; return the messages just after it
+    """
     try:
         limit = request.args.get('limit', 50, type=int)
-        history = get_chat_history(user_id, limit)
-        return jsonify({'messages': history, 'count': len(history)})
+        before = request.args.get('before', type=int)
+        after = request.args.get('after', type=int)
+        if limit < 1 or limit > MAX_HISTORY_PAGE_SIZE:
+            return jsonify({'error': f'limit must be between 1 and {MAX_HISTORY_PAGE_SIZE}'}), 400
+        if before is not None and after is not None:
+            return jsonify({'error': 'Use either before or after, not both'}), 400
+
+        page = get_chat_history_page(user_id, limit, before=before, after=after)
+        page['count'] = len(page['messages'])
+        return jsonify(page)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -350,6 +548,46 @@ def delete_chat_history(user_id):
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/chat/search', methods=['GET'])
+def search_chat():
+    """
+    Full-text search over chat messages (requires ADMIN_API_TOKEN; answers 403 when it is unset)
+
+    Query parameters:
+        q: search text
+        user_id: only search this user's conversations
+        mode: words (all words, default), phrase (exact phrase) or raw (FTS5 syntax)
+        sort: relevance (default) or recent
+        limit: results per page (default 20, at most 100)
+        cursor: next_cursor of the previous page
+    """
+    denied = check_admin_token()
+    if denied:
+        return denied
+    try:
+        text = request.args.get('q', '').strip()
+        user_id = request.args.get('user_id', type=int)
+        mode = request.args.get('mode', 'words')
+        sort = request.args.get('sort', 'relevance')
+        limit = request.args.get('limit', 20, type=int)
+        cursor = request.args.get('cursor')
+        if not text:
+            return jsonify({'error': 'q is required'}), 400
+        if limit < 1 or limit > MAX_SEARCH_PAGE_SIZE:
+            return jsonify({'error': f'limit must be between 1 and {MAX_SEARCH_PAGE_SIZE}'}), 400
+
+        try:
+            page = search_chat_messages(text, user_id=user_id, mode=mode, sort=sort,
+                                        limit=limit, cursor=cursor)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        page['count'] = len(page['results'])
+        page['index'] = get_search_index_status()
+        return jsonify(page)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/chat/analysis/<int:user_id>', methods=['GET'])
 def get_user_chat_analysis(user_id):
     """Get chat analysis summary for a user"""
@@ -362,6 +600,20 @@ def get_user_chat_analysis(user_id):
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/chat/write-behind/stats', methods=['GET'])
+def get_write_behind_stats():
+    """Get write-behind group commit counters"""
+    if CHAT_WRITE_BEHIND == 'off':
+        return jsonify({'enabled': False, 'mode': 'off'})
+    return jsonify({'enabled': True, 'mode': CHAT_WRITE_BEHIND, **get_write_behind().get_stats()})
+
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_read_cache_stats():
+    """Get hit ratios of the user and chat analysis read caches"""
+    return jsonify(get_cache_stats())
+
+
 @app.route('/api/chat/status', methods=['GET'])
 def get_chat_status():
     """Get chatbot API status"""
@@ -418,7 +670,10 @@ def predict_risk():
         if not text:
             return jsonify({'error': 'Empty text provided'}), 400
         
-        result = ml_model.predict(text)
+        if model_batcher is not None:
+            result = model_batcher.predict(text)
+        else:
+            result = ml_model.predict(text)
         return jsonify(result)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -430,6 +685,72 @@ def get_model_info():
     return jsonify(ml_model.get_model_info())
 
 
+@app.route('/api/model/conditions/train', methods=['POST'])
+def train_condition_model():
+    """
+    Train the multi-head condition model
+    
+    Expected JSON body (optional):
+    {
+        "texts": ["sample text 1", ...],
+        "labels": ["low", "moderate", "high", ...],
+        "condition_labels": {  # optional, derived from keywords if missing
+            "depression": ["none", "mild", ...],
+            "anxiety": [...],
+            "stress": [...]
+        }
+    }
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        result = condition_model.train(
+            data.get('texts'),
+            data.get('labels'),
+            data.get('condition_labels')
+        )
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/model/conditions/predict', methods=['POST'])
+def predict_conditions():
+    """
+    Predict overall risk and per-condition levels using the multi-head model
+    
+    Expected JSON body:
+    {
+        "text": "User's text describing their feelings..."
+    }
+    """
+    try:
+        data = request.get_json()
+        if not data or 'text' not in data:
+            return jsonify({'error': 'Text is required'}), 400
+        
+        text = data['text'].strip()
+        if not text:
+            return jsonify({'error': 'Empty text provided'}), 400
+        
+        return jsonify(condition_model.predict(text))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/model/batcher/stats', methods=['GET'])
+def get_batcher_stats():
+    """Get micro-batching batch size and wait time histograms"""
+    if model_batcher is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **model_batcher.get_stats()})
+
+
+@app.route('/api/model/cascade/stats', methods=['GET'])
+def get_cascade_stats():
+    """Get how often the lexicon vs the ML model decided cascade predictions"""
+    return jsonify(cascade_predictor.get_stats())
+
+
 # =====================================================
 # ASSESSMENT STORAGE ENDPOINTS
 # =====================================================
@@ -483,72 +804,83 @@ def get_assessments(user_id):
 
 @app.route('/api/report/<int:user_id>', methods=['GET'])
 def generate_user_report(user_id):
-    """Generate a comprehensive report for a user"""
+    """Generate a comprehensive report for a user (from precomputed aggregates)"""
     try:
-        user = get_user(user_id)
-        if not user:
+        report = build_user_report(user_id)
+        if not report:
             return jsonify({'error': 'User not found'}), 404
-        
-        # Get chat analysis
-        analysis = get_chat_analysis(user_id)
-        
-        # Get recent assessments
-        assessments = get_user_assessments(user_id, limit=5)
-        
-        # Get chat history summary
-        chat_history = get_chat_history(user_id, limit=100)
-        user_messages = [m for m in chat_history if m.get('role') == 'user']
-        
-        # Generate recommendations based on analysis
-        recommendations = []
-        if analysis:
-            emotions = analysis.get('detected_emotions', [])
-            risk = analysis.get('risk_level', 'low')
-            
-            if 'anxious' in emotions:
-                recommendations.append('Practice daily relaxation techniques such as deep breathing')
-                recommendations.append('Consider limiting caffeine intake')
-            if 'sad' in emotions or 'depressed' in emotions:
-                recommendations.append('Engage in activities that bring you joy')
-                recommendations.append('Maintain social connections')
-            if 'stressed' in emotions:
-                recommendations.append('Break tasks into smaller manageable steps')
-                recommendations.append('Schedule regular breaks')
-            if risk in ['moderate', 'high']:
-                recommendations.insert(0, 'Consider speaking with a mental health professional')
-        
-        if not recommendations:
-            recommendations = [
-                'Continue practicing self-awareness',
-                'Maintain healthy lifestyle habits',
-                'Build and nurture supportive relationships'
-            ]
-        
-        report = {
-            'user': {
-                'id': user['id'],
-                'name': user['name'],
-                'email': user.get('email'),
-                'age': user.get('age')
-            },
-            'summary': {
-                'total_messages': len(user_messages),
-                'total_assessments': len(assessments),
-                'detected_emotions': analysis.get('detected_emotions', []) if analysis else [],
-                'topics_discussed': analysis.get('topics', []) if analysis else [],
-                'overall_sentiment': analysis.get('overall_sentiment', 'neutral') if analysis else 'neutral',
-                'risk_level': analysis.get('risk_level', 'low') if analysis else 'low'
-            },
-            'recent_assessments': assessments[:3],
-            'recommendations': recommendations,
-            'generated_at': datetime.now().isoformat()
-        }
-        
         return jsonify(report)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+# =====================================================
+# ADMIN ENDPOINTS
+# =====================================================
+
+def parse_timestamp(value):
+    """Normalize an ISO 8601 timestamp query parameter to the database's UTC format"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.strftime('%Y-%m-%d %H:%M:%S')
+
+
+@app.route('/api/admin/cohorts', methods=['GET'])
+def get_admin_cohort():
+    """
+    Find users whose chat messages carried an emotion and/or topic
+
+    Query parameters:
+        emotion: emotion of the messages (e.g. anxious)
+        topic: topic of the messages (e.g. work); with emotion, on the same message
+        min_risk: lowest risk level of the messages (low, moderate or high)
+        days: only messages from the last N days
+        since / until: ISO 8601 time range (instead of days)
+        limit: maximum users returned (default 100, at most 1000)
+    """
+    denied = check_admin_token()
+    if denied:
+        return denied
+    try:
+        emotion = request.args.get('emotion')
+        topic = request.args.get('topic')
+        min_risk = request.args.get('min_risk')
+        days = request.args.get('days', type=float)
+        limit = request.args.get('limit', 100, type=int)
+        if not emotion and not topic:
+            return jsonify({'error': 'emotion or topic is required'}), 400
+        if min_risk is not None and min_risk not in RISK_RANKS:
+            return jsonify({'error': f'min_risk must be one of {list(RISK_RANKS)}'}), 400
+        if limit < 1 or limit > MAX_COHORT_SIZE:
+            return jsonify({'error': f'limit must be between 1 and {MAX_COHORT_SIZE}'}), 400
+        if days is not None and request.args.get('since'):
+            return jsonify({'error': 'Use either days or since, not both'}), 400
+        if days is not None and days <= 0:
+            return jsonify({'error': 'days must be positive'}), 400
+
+        try:
+            since = parse_timestamp(request.args['since']) if request.args.get('since') else None
+            until = parse_timestamp(request.args['until']) if request.args.get('until') else None
+        except ValueError:
+            return jsonify({'error': 'since and until must be ISO 8601 timestamps'}), 400
+        if days is not None:
+            since = (datetime.now(timezone.utc) - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+
+        cohort = get_cohort(emotion=emotion, topic=topic, min_risk=min_risk,
+                            since=since, until=until, limit=limit)
+        cohort['filters'] = {
+            'emotion': emotion,
+            'topic': topic,
+            'min_risk': min_risk,
+            'since': since,
+            'until': until
+        }
+        return jsonify(cohort)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 if __name__ == '__main__':
     import os
     # Only enable debug mode in development, not in production
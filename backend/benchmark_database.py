@@ -0,0 +1,211 @@
+"""
+Database Benchmark
+
+Fills a scratch SQLite database with synthetic users, chat messages,
+assessments and chat analyses, then for each hot query path prints the
+EXPLAIN QUERY PLAN and compares its latency with and without indexes
+(using SQLite's NOT INDEXED clause to force a table scan). A cohort query
+on the emotion tag index is compared with decoding every message's
+emotions in Python, and cached user and chat analysis reads with direct
+ones. Finally it
+measures concurrent chat message inserts with and without write-behind
+(set DATABASE_SYNCHRONOUS=FULL to see the fsync-bound case).
+
+Usage:
+    python benchmark_database.py [--users 2000] [--messages 100] [--db /tmp/bench.db]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+EMOTIONS = ['happy', 'sad', 'anxious', 'stressed', 'angry', 'lonely']
+TOPICS = ['work', 'sleep', 'family', 'relationships', 'health']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Show query plans and index speedups for hot queries')
+    parser.add_argument('--users', type=int, default=2000, help='Number of synthetic users')
+    parser.add_argument('--messages', type=int, default=100, help='Chat messages per user')
+    parser.add_argument('--assessments', type=int, default=10, help='Assessments per user')
+    parser.add_argument('--queries', type=int, default=200, help='Timed queries per path')
+    parser.add_argument('--writers', type=int, default=8, help='Concurrent threads in the insert benchmark')
+    parser.add_argument('--inserts', type=int, default=500, help='Chat message inserts per writer thread')
+    parser.add_argument('--db', help='Database file (a temporary file by default)')
+    return parser.parse_args()
+
+
+def populate(database, users, messages, assessments):
+    """Bulk-insert synthetic rows in one transaction"""
+    rng = random.Random(42)
+    with database.get_db_connection() as conn:
+        conn.executemany(
+            'INSERT INTO users (name, email, age) VALUES (?, ?, ?)',
+            ((f'user{i}', f'user{i}@example.com', rng.randint(18, 80)) for i in range(users))
+        )
+        # The insert trigger tags each message's emotions and topics
+        conn.executemany(
+            'INSERT INTO chat_messages (user_id, role, content, timestamp, sentiment, emotions, topics) '
+            'VALUES (?, ?, ?, datetime(\'now\', ?), ?, ?, ?)',
+            ((rng.randint(1, users), 'user', 'synthetic message',
+              f'-{rng.randint(0, 10_000_000)} seconds',
+              rng.choice(['low', 'low', 'moderate', 'high']),
+              json.dumps(rng.sample(EMOTIONS, rng.randint(0, 2))),
+              json.dumps(rng.sample(TOPICS, rng.randint(0, 1))))
+             for _ in range(users * messages))
+        )
+        conn.executemany(
+            'INSERT INTO assessments (user_id, assessment_type, risk_level, created_at) '
+            'VALUES (?, ?, ?, datetime(\'now\', ?))',
+            ((rng.randint(1, users), 'phq9', rng.choice(['low', 'moderate', 'high']),
+              f'-{rng.randint(0, 10_000_000)} seconds')
+             for _ in range(users * assessments))
+        )
+        conn.executemany(
+            'INSERT INTO chat_analysis (user_id, message_count) VALUES (?, ?)',
+            ((i, rng.randint(1, 100)) for i in range(1, users + 1))
+        )
+        conn.commit()
+
+
+def time_query(conn, sql, params_fn, n):
+    """Average latency of a query in milliseconds"""
+    start = time.perf_counter()
+    for _ in range(n):
+        conn.execute(sql, params_fn()).fetchall()
+    return (time.perf_counter() - start) / n * 1000
+
+
+def insert_throughput(database, users, writers, inserts, mode):
+    """Chat message inserts per second from concurrent threads in a write-behind mode"""
+    database.CHAT_WRITE_BEHIND = mode
+
+    def write():
+        for i in range(inserts):
+            database.save_chat_message((i % users) + 1, 'user', 'benchmark message')
+
+    threads = [threading.Thread(target=write) for _ in range(writers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if mode != 'off':
+        from write_behind import get_write_behind
+        get_write_behind().flush()
+    return writers * inserts / (time.perf_counter() - start)
+
+
+def main():
+    args = parse_args()
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix='db-bench-'), 'bench.db')
+    os.environ['DATABASE_PATH'] = db_path
+    import database  # reads DATABASE_PATH and applies migrations on import
+
+    rng = random.Random(7)
+    users = args.users
+    print(f"Database: {db_path} (schema version {database.get_schema_version()})")
+    print(f"Populating {users} users, {users * args.messages} messages, "
+          f"{users * args.assessments} assessments...")
+    populate(database, users, args.messages, args.assessments)
+
+    # (name, query with a {hint} placeholder for the NOT INDEXED variant, params)
+    paths = [
+        ('get_chat_history (most recent page)',
+         'SELECT * FROM chat_messages{hint} WHERE user_id = ? AND id < ? ORDER BY id DESC LIMIT 50',
+         lambda: (rng.randint(1, users), 2 ** 63 - 1)),
+        ('get_chat_history (page before a cursor)',
+         'SELECT * FROM chat_messages{hint} WHERE user_id = ? AND id < ? ORDER BY id DESC LIMIT 50',
+         lambda: (rng.randint(1, users), rng.randint(1, users * args.messages))),
+        ('get_user_assessments',
+         'SELECT * FROM assessments{hint} WHERE user_id = ? ORDER BY created_at DESC LIMIT 10',
+         lambda: (rng.randint(1, users),)),
+        ('get_user_by_email',
+         'SELECT * FROM users{hint} WHERE email = ?',
+         lambda: (f'user{rng.randint(0, users - 1)}@example.com',)),
+        ('get_chat_analysis',
+         'SELECT * FROM chat_analysis{hint} WHERE user_id = ?',
+         lambda: (rng.randint(1, users),)),
+    ]
+
+    with database.get_db_connection() as conn:
+        conn.execute('ANALYZE')
+        for name, sql, params_fn in paths:
+            indexed_sql = sql.format(hint='')
+            print(f"\n{name}")
+            for row in conn.execute(f'EXPLAIN QUERY PLAN {indexed_sql}', params_fn()):
+                print(f"  plan: {row['detail']}")
+            indexed_ms = time_query(conn, indexed_sql, params_fn, args.queries)
+            scan_ms = time_query(conn, sql.format(hint=' NOT INDEXED'), params_fn, args.queries)
+            print(f"  indexed: {indexed_ms:.4f} ms   table scan: {scan_ms:.4f} ms   "
+                  f"speedup: {scan_ms / indexed_ms:.1f}x")
+
+    # Cohort: users with 'anxious' messages at moderate+ risk in the last 7 days
+    print("\nget_cohort (anxious, min_risk=moderate, last 7 days)")
+    since = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(time.time() - 7 * 86400))
+    start = time.perf_counter()
+    for _ in range(args.queries):
+        cohort = database.get_cohort(emotion='anxious', min_risk='moderate', since=since)
+    indexed_ms = (time.perf_counter() - start) / args.queries * 1000
+    with database.get_db_connection() as conn:
+        for row in conn.execute(
+            'EXPLAIN QUERY PLAN SELECT user_id FROM chat_message_tags '
+            'WHERE kind = ? AND name = ? AND created_at >= ? AND risk_rank >= ?',
+            ('emotion', 'anxious', since, 1)
+        ):
+            print(f"  plan: {row['detail']}")
+
+        # What the query took before: decode every message's JSON in Python
+        start = time.perf_counter()
+        matches = {}
+        for user_id, timestamp, sentiment, emotions in conn.execute(
+            'SELECT user_id, timestamp, sentiment, emotions FROM chat_messages'
+        ):
+            if (emotions and timestamp >= since and sentiment in ('moderate', 'high')
+                    and 'anxious' in json.loads(emotions)):
+                matches[user_id] = matches.get(user_id, 0) + 1
+        decode_ms = (time.perf_counter() - start) * 1000
+    assert len(matches) == cohort['total_users'], (len(matches), cohort['total_users'])
+    print(f"  {cohort['total_users']} users, {cohort['total_matches']} messages")
+    print(f"  indexed: {indexed_ms:.4f} ms   decode every row: {decode_ms:.4f} ms   "
+          f"speedup: {decode_ms / indexed_ms:.1f}x")
+
+    # get_user / get_chat_analysis through the read cache vs straight from SQLite
+    print("\nread cache (cached vs uncached lookups of hot users)")
+    hot_users = [rng.randint(1, users) for _ in range(50)]
+    for name, cached, uncached in (
+        ('get_user', database.get_user, database._load_user),
+        ('get_chat_analysis', database.get_chat_analysis, database._load_chat_analysis),
+    ):
+        timings = []
+        for fn in (cached, uncached):
+            start = time.perf_counter()
+            for _ in range(args.queries):
+                for user_id in hot_users:
+                    fn(user_id)
+            timings.append((time.perf_counter() - start) / (args.queries * len(hot_users)) * 1000)
+        print(f"  {name:<18} cached: {timings[0]:.4f} ms   uncached: {timings[1]:.4f} ms   "
+              f"speedup: {timings[1] / timings[0]:.1f}x")
+    for namespace, stats in database.get_cache_stats()['caches'].items():
+        print(f"  {namespace} hit ratio: {stats['hit_ratio']:.2%}")
+
+    # record_chat_analysis is counter UPSERTs plus one summary UPSERT, all index lookups
+    print("\nrecord_chat_analysis")
+    start = time.perf_counter()
+    for _ in range(args.queries):
+        database.record_chat_analysis(rng.randint(1, users), ['sad', 'anxious'], ['work'], 'moderate')
+    print(f"  upsert: {(time.perf_counter() - start) / args.queries * 1000:.4f} ms per call")
+
+    # Each insert committing on its own vs group commits through the write-behind queue
+    print(f"\nsave_chat_message throughput ({args.writers} threads, "
+          f"synchronous={database.DB_SYNCHRONOUS})")
+    for mode in ('off', 'enqueue', 'commit'):
+        rate = insert_throughput(database, users, args.writers, args.inserts, mode)
+        print(f"  CHAT_WRITE_BEHIND={mode:<8} {rate:12,.0f} inserts/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""
+Fusion Benchmark
+
+Compares scoring combined assessments one request at a time with the
+original hardcoded averaging (kept below as legacy_combined_assessment)
+against the vectorized FusionEngine batch path, on synthetic
+questionnaire/text/facial results. The engine's own per-request path
+(MentalHealthPredictor.generate_combined_assessment) is timed as well.
+
+Usage:
+    python benchmark_fusion.py [--samples 50000] [--repeat 3]
+"""
+import argparse
+import random
+import time
+
+from fusion_engine import get_fusion_engine
+from mental_health_predictor import MentalHealthPredictor
+
+EMOTIONS = ['neutral', 'happy', 'sad', 'angry', 'fearful', 'disgusted', 'surprised']
+
+# Constants of the scoring that predates the fusion engine
+LEGACY_RISK_SCORES = {'low': 0, 'moderate': 1, 'high': 2}
+LEGACY_FACIAL_NEGATIVE = ['sad', 'fearful', 'angry']
+LEGACY_FACIAL_CONCERN_SHARE = 0.25
+LEGACY_FACIAL_VOLATILITY_CONCERN = 0.5
+
+
+def legacy_combined_assessment(predictor, results):
+    """
+    Combined assessment as scored before the fusion engine: an unweighted
+    average of per-modality risk scores with fixed thresholds
+
+    Args:
+        predictor: MentalHealthPredictor, used for the summary text
+        results: combined-analysis results dict
+
+    Returns:
+        dict with overall_risk, confidence, concerns, positive_indicators and summary
+    """
+    assessment = {
+        'overall_risk': 'low',
+        'confidence': 'medium',
+        'concerns': [],
+        'positive_indicators': [],
+        'summary': ''
+    }
+    risk_scores = []
+
+    if 'questionnaire' in results:
+        q = results['questionnaire']
+        if 'risk_level' in q:
+            risk_scores.append(LEGACY_RISK_SCORES.get(q['risk_level'], 0))
+        if 'conditions_detected' in q:
+            assessment['concerns'].extend(q['conditions_detected'])
+
+    if 'text_analysis' in results:
+        ta = results['text_analysis']
+        if 'risk_level' in ta:
+            risk_scores.append(LEGACY_RISK_SCORES.get(ta['risk_level'], 0))
+        if 'sentiment' in ta:
+            polarity = ta['sentiment'].get('polarity', 0)
+            if polarity > 0.2:
+                assessment['positive_indicators'].append('positive_language')
+            elif polarity < -0.2:
+                assessment['concerns'].append('negative_language')
+
+    if results.get('facial_summary'):
+        facial = results['facial_summary']
+        distribution = facial.get('distribution', {})
+        negative = sum(distribution.get(e, 0.0) for e in LEGACY_FACIAL_NEGATIVE)
+        positive = distribution.get('happy', 0.0)
+        if negative + positive > 0:
+            risk_scores.append(negative / (negative + positive))
+        for emotion in LEGACY_FACIAL_NEGATIVE:
+            if distribution.get(emotion, 0.0) >= LEGACY_FACIAL_CONCERN_SHARE:
+                assessment['concerns'].append(f'{emotion}_facial_expression')
+        if positive >= LEGACY_FACIAL_CONCERN_SHARE:
+            assessment['positive_indicators'].append('positive_facial_expression')
+        if facial.get('volatility', 0.0) >= LEGACY_FACIAL_VOLATILITY_CONCERN:
+            assessment['concerns'].append('unstable_facial_expression')
+    elif 'facial_emotion' in results:
+        emotion = results['facial_emotion']
+        if emotion in LEGACY_FACIAL_NEGATIVE:
+            risk_scores.append(1)
+            assessment['concerns'].append(f'{emotion}_facial_expression')
+        elif emotion == 'happy':
+            risk_scores.append(0)
+            assessment['positive_indicators'].append('positive_facial_expression')
+
+    if risk_scores:
+        avg_risk = sum(risk_scores) / len(risk_scores)
+        if avg_risk >= 1.5:
+            assessment['overall_risk'] = 'high'
+        elif avg_risk >= 0.8:
+            assessment['overall_risk'] = 'moderate'
+        if len(risk_scores) >= 3:
+            assessment['confidence'] = 'high'
+        elif len(risk_scores) < 2:
+            assessment['confidence'] = 'low'
+
+    assessment['summary'] = predictor._generate_summary(assessment)
+    return assessment
+
+
+def make_results(n, seed=42):
+    """Generate n synthetic combined-analysis results dicts"""
+    rng = random.Random(seed)
+    results_list = []
+    for _ in range(n):
+        results = {}
+        if rng.random() < 0.8:
+            results['questionnaire'] = {
+                'risk_level': rng.choice(['low', 'moderate', 'high']),
+                'conditions_detected': rng.sample(['depression', 'anxiety'], rng.randint(0, 2))
+            }
+        if rng.random() < 0.8:
+            results['text_analysis'] = {
+                'risk_level': rng.choice(['low', 'moderate', 'high']),
+                'sentiment': {'polarity': rng.uniform(-1, 1)}
+            }
+        roll = rng.random()
+        if roll < 0.4:
+            results['facial_emotion'] = rng.choice(EMOTIONS)
+        elif roll < 0.8:
+            weights = [rng.random() for _ in EMOTIONS]
+            total = sum(weights)
+            results['facial_summary'] = {
+                'distribution': {e: w / total for e, w in zip(EMOTIONS, weights)},
+                'volatility': rng.random()
+            }
+        results_list.append(results)
+    return results_list
+
+
+def best_of(repeat, fn):
+    """Best wall-clock time of several runs, and the last result"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark per-request vs batch multimodal fusion')
+    parser.add_argument('--samples', type=int, default=50000, help='Number of synthetic assessments')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per method (best is reported)')
+    args = parser.parse_args()
+
+    predictor = MentalHealthPredictor()
+    engine = get_fusion_engine()
+    results_list = make_results(args.samples)
+
+    print("=" * 60)
+    print(f"Fusion benchmark: {args.samples} assessments, best of {args.repeat}")
+    print("=" * 60)
+
+    legacy_time, legacy = best_of(args.repeat, lambda: [
+        legacy_combined_assessment(predictor, results) for results in results_list
+    ])
+    per_request_time, per_request = best_of(args.repeat, lambda: [
+        predictor.generate_combined_assessment(results) for results in results_list
+    ])
+    features = engine.features_matrix(results_list)
+    extract_time, _ = best_of(args.repeat, lambda: engine.features_matrix(results_list))
+    batch_time, batch = best_of(args.repeat, lambda: engine.score_batch(features))
+
+    rows = [
+        ('per-request original averaging', legacy_time),
+        ('per-request generate_combined_assessment', per_request_time),
+        ('batch: feature extraction', extract_time),
+        ('batch: vectorized scoring', batch_time),
+        ('batch: total', extract_time + batch_time),
+    ]
+    for name, elapsed in rows:
+        print(f"{name:<42} {elapsed * 1000:10.1f} ms  {args.samples / elapsed:12,.0f} /s")
+
+    def disagreements(assessments):
+        return sum(
+            1 for assessment, risk, confidence in zip(assessments, batch['overall_risk'], batch['confidence'])
+            if assessment['overall_risk'] != risk or assessment['confidence'] != confidence
+        )
+
+    print(f"\nSpeedup over original averaging (scoring only): {legacy_time / batch_time:.1f}x")
+    print(f"Speedup over original averaging (with extraction): {legacy_time / (extract_time + batch_time):.1f}x")
+    print(f"Speedup over engine per-request path (with extraction): "
+          f"{per_request_time / (extract_time + batch_time):.1f}x")
+    print(f"Disagreements with original averaging: {disagreements(legacy)}")
+    print(f"Disagreements with engine per-request results: {disagreements(per_request)}")
+
+
+if __name__ == '__main__':
+    main()
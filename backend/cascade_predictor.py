@@ -0,0 +1,174 @@
+"""
+Cascade Predictor Module
+
+This module combines the keyword-based TextAnalyzer with the ML model in a
+two-stage cascade:
+- Stage 1 (lexicon): cheap keyword and sentiment analysis
+- Stage 2 (model): TF-IDF + classifier inference, only for ambiguous texts
+
+Clear crisis phrases and clearly positive texts with no indicators are decided
+by the lexicon alone, so the expensive model only runs when it can add signal.
+"""
+import threading
+
+from text_analyzer import TextAnalyzer
+from ml_model import get_model
+
+
+class CascadePredictor:
+    """
+    Two-stage risk predictor that short-circuits on conclusive lexicon results.
+    """
+
+    def __init__(self, text_analyzer=None, ml_model=None,
+                 confidence_threshold=0.8, crisis_confidence=0.95,
+                 positive_polarity_threshold=0.3):
+        """
+        Initialize the cascade
+
+        Args:
+            text_analyzer: TextAnalyzer instance (created if None)
+            ml_model: MentalHealthMLModel instance (global model if None)
+            confidence_threshold: minimum lexicon confidence needed to skip the model
+            crisis_confidence: confidence assigned to high-level crisis indicators
+            positive_polarity_threshold: minimum polarity for a text with no
+                indicators to be treated as clearly low risk
+        """
+        self.text_analyzer = text_analyzer or TextAnalyzer()
+        self.ml_model = ml_model or get_model()
+        self.confidence_threshold = confidence_threshold
+        self.crisis_confidence = crisis_confidence
+        self.positive_polarity_threshold = positive_polarity_threshold
+
+        self._lock = threading.Lock()
+        self._stats = {'total': 0, 'lexicon': 0, 'model': 0, 'lexicon_fallback': 0}
+
+    def _lexicon_decision(self, analysis):
+        """
+        Derive a risk level and confidence from a TextAnalyzer result
+
+        Returns:
+            tuple: (risk_level or None, confidence)
+        """
+        indicators = analysis.get('indicators', {})
+        levels = [indicators.get(c, {}).get('level', 'none')
+                  for c in ['depression', 'anxiety', 'stress']]
+
+        # Clear crisis phrases
+        if indicators.get('depression', {}).get('level') == 'high' or \
+           indicators.get('anxiety', {}).get('level') == 'high':
+            return 'high', self.crisis_confidence
+
+        # No indicators at all and clearly positive sentiment
+        polarity = analysis.get('sentiment', {}).get('polarity', 0)
+        if all(level == 'none' for level in levels) and \
+           polarity >= self.positive_polarity_threshold:
+            return 'low', round(0.5 + 0.5 * polarity, 4)
+
+        return None, 0.0
+
+    def _record(self, stage):
+        """Update per-stage counters"""
+        with self._lock:
+            self._stats['total'] += 1
+            self._stats[stage] += 1
+
+    def predict(self, text, analysis=None, model_prediction=None):
+        """
+        Predict mental health risk, running the ML model only when needed
+
+        Args:
+            text: str - User's text input
+            analysis: precomputed TextAnalyzer result for text (optional)
+            model_prediction: precomputed model risk prediction for text, used
+                as the model stage instead of calling the ML model (optional)
+
+        Returns:
+            dict with risk_level, confidence and the stage that decided
+        """
+        result = self._decide(text, analysis, model_prediction)
+        if 'decided_by' in result:
+            self._record(result['decided_by'])
+        return result
+
+    def _decide(self, text, analysis=None, model_prediction=None):
+        """Run the cascade without updating the live stage counters"""
+        if analysis is None:
+            analysis = self.text_analyzer.analyze(text)
+        if 'error' in analysis:
+            return {'error': analysis['error'], 'risk_level': 'unknown'}
+
+        risk_level, confidence = self._lexicon_decision(analysis)
+
+        if risk_level is not None and confidence >= self.confidence_threshold:
+            return {
+                'risk_level': risk_level,
+                'confidence': confidence,
+                'decided_by': 'lexicon'
+            }
+
+        if model_prediction is not None:
+            prediction = dict(model_prediction)
+        elif self.ml_model.is_trained:
+            prediction = self.ml_model.predict(text)
+        else:
+            prediction = None
+        if prediction is not None:
+            if not prediction.get('fallback'):
+                prediction['decided_by'] = 'model'
+                return prediction
+
+        # Model unavailable: fall back to the lexicon's own risk level
+        return {
+            'risk_level': analysis.get('risk_level', 'low'),
+            'confidence': confidence,
+            'decided_by': 'lexicon_fallback'
+        }
+
+    def get_stats(self):
+        """Get counters of which stage decided each prediction"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['model_call_fraction'] = round(stats['model'] / stats['total'], 4) if stats['total'] else 0.0
+        return stats
+
+    def evaluate(self, texts, labels):
+        """
+        Compare the cascade against model-only inference on a labeled set
+
+        Args:
+            texts: list of text samples
+            labels: list of true labels ('low', 'moderate', 'high')
+
+        Returns:
+            dict with accuracy of both pipelines and the fraction of model calls
+        """
+        if len(texts) != len(labels):
+            raise ValueError("Number of texts must match number of labels")
+        if not texts:
+            raise ValueError("Need at least one sample for evaluation")
+
+        model_only = self.ml_model.predict_batch(texts)
+        model_calls = 0
+        cascade_correct = 0
+        model_correct = 0
+        agreement = 0
+
+        for text, label, model_result in zip(texts, labels, model_only):
+            # Offline evaluation must not skew the production counters
+            result = self._decide(text)
+            if result.get('decided_by') == 'model':
+                model_calls += 1
+            cascade_correct += result['risk_level'] == label
+            model_correct += model_result['risk_level'] == label
+            agreement += result['risk_level'] == model_result['risk_level']
+
+        n = len(texts)
+        return {
+            'samples': n,
+            'model_calls': model_calls,
+            'model_call_fraction': round(model_calls / n, 4),
+            'cascade_accuracy': round(cascade_correct / n, 4),
+            'model_only_accuracy': round(model_correct / n, 4),
+            'agreement_with_model': round(agreement / n, 4)
+        }
@@ -7,29 +7,270 @@ This module provides SQLite database functionality for storing:
 - Assessment results
 """
 import sqlite3
+import base64
 import json
 import os
+import threading
+import time
 from datetime import datetime
 from contextlib import contextmanager
 
+from read_cache import ReadThroughCache
+
 # Database file path
 DB_PATH = os.environ.get('DATABASE_PATH', 'mental_health.db')
 
+# Connection tuning
+DB_MMAP_SIZE = int(os.environ.get('DATABASE_MMAP_SIZE', str(256 * 1024 * 1024)))
+DB_CACHE_SIZE_KB = int(os.environ.get('DATABASE_CACHE_SIZE_KB', '65536'))
+DB_BUSY_TIMEOUT_MS = int(os.environ.get('DATABASE_BUSY_TIMEOUT_MS', '5000'))
+# NORMAL (default) or FULL, which fsyncs every commit; write-behind amortizes that cost
+DB_SYNCHRONOUS = os.environ.get('DATABASE_SYNCHRONOUS', 'NORMAL').upper()
+if DB_SYNCHRONOUS not in ('OFF', 'NORMAL', 'FULL', 'EXTRA'):
+    raise ValueError(f"DATABASE_SYNCHRONOUS must be OFF, NORMAL, FULL or EXTRA, not '{DB_SYNCHRONOUS}'")
+DB_STATEMENT_CACHE_SIZE = 256
+
+# Write-behind for chat writes: 'off' (write and commit on the caller's thread),
+# 'enqueue' (acknowledge once queued) or 'commit' (acknowledge after the group commit)
+CHAT_WRITE_BEHIND = os.environ.get('CHAT_WRITE_BEHIND', 'off').lower()
+if CHAT_WRITE_BEHIND not in ('off', 'enqueue', 'commit'):
+    raise ValueError(f"CHAT_WRITE_BEHIND must be off, enqueue or commit, not '{CHAT_WRITE_BEHIND}'")
+
+# Read-through caches of user and chat analysis rows (0 entries disables them)
+READ_CACHE_MAX_ENTRIES = int(os.environ.get('READ_CACHE_MAX_ENTRIES', '10000'))
+READ_CACHE_TTL_S = float(os.environ.get('READ_CACHE_TTL_S', '30'))
+# How often other workers' writes are picked up from the cache_versions log
+READ_CACHE_SYNC_MS = float(os.environ.get('READ_CACHE_SYNC_MS', '100'))
+
+# Emotions that decide a user's overall chat sentiment
+CHAT_POSITIVE_EMOTIONS = ['happy']
+CHAT_NEGATIVE_EMOTIONS = ['sad', 'anxious', 'stressed', 'angry', 'lonely']
+
+# Risk levels in increasing order; cohort queries filter on the rank
+RISK_RANKS = {'low': 0, 'moderate': 1, 'high': 2}
+
+# Largest SQLite rowid, used as the open upper bound of keyset queries
+MAX_ROWID = 2 ** 63 - 1
+
+# One persistent connection per thread (and per process, see _thread_connection)
+_local = threading.local()
+
+
+def _copy_analysis(analysis):
+    """Copy a chat analysis dict (much cheaper than copy.deepcopy for its known shape)"""
+    return {
+        **analysis,
+        'detected_emotions': list(analysis['detected_emotions']),
+        'topics': list(analysis['topics']),
+        'emotion_counts': {name: dict(c) for name, c in analysis['emotion_counts'].items()},
+        'topic_counts': {name: dict(c) for name, c in analysis['topic_counts'].items()}
+    }
+
+
+# Cached rows by cache_versions namespace, keyed by user id
+_read_caches = {
+    'user': ReadThroughCache('user', READ_CACHE_MAX_ENTRIES, READ_CACHE_TTL_S, copy=dict),
+    'chat_analysis': ReadThroughCache('chat_analysis', READ_CACHE_MAX_ENTRIES, READ_CACHE_TTL_S,
+                                      copy=_copy_analysis),
+}
+# Highest cache_versions.seq whose invalidation this process has applied,
+# and when the log is next read
+_cache_seq = None
+_cache_next_sync = 0.0
+_cache_sync_lock = threading.Lock()
+
 
 def get_db_path():
     """Get the database file path"""
     return DB_PATH
 
 
+def _open_connection(path):
+    """Open a connection with WAL journaling and tuned pragmas"""
+    conn = sqlite3.connect(
+        path,
+        timeout=DB_BUSY_TIMEOUT_MS / 1000.0,
+        cached_statements=DB_STATEMENT_CACHE_SIZE
+    )
+    conn.row_factory = sqlite3.Row
+    # WAL lets readers run alongside a writer; NORMAL sync is durable across
+    # application crashes and only risks the last commits on power loss
+    # (FULL also survives power loss, at one fsync per commit)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute(f'PRAGMA synchronous={DB_SYNCHRONOUS}')
+    conn.execute(f'PRAGMA mmap_size={DB_MMAP_SIZE}')
+    # Negative cache_size is in KiB
+    conn.execute(f'PRAGMA cache_size=-{DB_CACHE_SIZE_KB}')
+    conn.execute(f'PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    return conn
+
+
+def _thread_connection():
+    """Get this thread's connection, opening it on first use"""
+    path = get_db_path()
+    conn = getattr(_local, 'conn', None)
+    # A connection opened before a fork (e.g. gunicorn --preload) must not be
+    # used by the child; open a fresh one instead
+    if conn is None or _local.pid != os.getpid() or _local.path != path:
+        if conn is not None and _local.pid == os.getpid():
+            conn.close()
+        conn = _open_connection(path)
+        _local.conn = conn
+        _local.pid = os.getpid()
+        _local.path = path
+    return conn
+
+
+def close_db_connection():
+    """Close the calling thread's connection (it is reopened on next use)"""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.pid == os.getpid():
+        conn.close()
+    _local.conn = None
+
+
+# Close the forking thread's connection so no open SQLite handle crosses a fork
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(before=close_db_connection)
+
+
+def _in_session():
+    """True while the calling thread is inside a db_session unit of work"""
+    return getattr(_local, 'session_depth', 0) > 0 and _local.session_pid == os.getpid()
+
+
+def _commit(conn):
+    """Commit now, or leave it to the enclosing db_session"""
+    if not _in_session():
+        conn.commit()
+
+
 @contextmanager
 def get_db_connection():
-    """Context manager for database connections"""
-    conn = sqlite3.connect(get_db_path())
-    conn.row_factory = sqlite3.Row
+    """Context manager for this thread's persistent database connection"""
+    conn = _thread_connection()
     try:
         yield conn
     finally:
-        conn.close()
+        # Uncommitted work is discarded, as when each call closed its own connection;
+        # inside a db_session the session decides
+        if conn.in_transaction and not _in_session():
+            conn.rollback()
+
+
+@contextmanager
+def db_session(immediate=True):
+    """
+    Unit of work: run several database calls in one transaction with one commit
+
+    Every database function called inside the block joins the transaction;
+    it commits when the block exits and rolls back if it raises. Nested
+    sessions join the outermost one.
+
+    Args:
+        immediate: take the write lock at the start (BEGIN IMMEDIATE), so
+            read-modify-write sequences cannot interleave with other writers.
+            Use False for read-only sessions (a consistent snapshot, no write lock).
+
+    Example:
+        with db_session():
+            save_chat_message(user_id, 'user', message)
+            record_chat_analysis(user_id, emotions, topics, risk_level)
+    """
+    if _in_session():
+        _local.session_depth += 1
+        try:
+            yield _thread_connection()
+        finally:
+            _local.session_depth -= 1
+        return
+
+    conn = _thread_connection()
+    if conn.in_transaction:
+        conn.rollback()
+    conn.execute('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+    _local.session_depth = 1
+    _local.session_pid = os.getpid()
+    _local.pending_invalidations = []
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        _local.session_depth = 0
+        # Cached rows written in the session are dropped once it has ended
+        for namespace, key in _local.pending_invalidations:
+            _read_caches[namespace].invalidate(key)
+        _local.pending_invalidations = []
+
+
+def _cache_key(user_id):
+    """Cache key of a user id, or None if it is not an integer"""
+    try:
+        return int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def _invalidate_cached(namespace, user_id):
+    """Drop a cached row after a write (at the end of the enclosing db_session)"""
+    key = _cache_key(user_id)
+    if key is None:
+        return
+    if _in_session():
+        _local.pending_invalidations.append((namespace, key))
+    else:
+        _read_caches[namespace].invalidate(key)
+
+
+def _sync_cache_invalidations():
+    """
+    Apply invalidations committed by other worker processes
+
+    Triggers record every write to a cached table in cache_versions under a
+    new sequence number; the entries past the last applied one are read at
+    most every READ_CACHE_SYNC_MS. Writes in this process invalidate directly.
+    """
+    global _cache_seq, _cache_next_sync
+    with _cache_sync_lock:
+        now = time.monotonic()
+        if now < _cache_next_sync:
+            return
+        with get_db_connection() as conn:
+            if _cache_seq is None:
+                # Nothing is cached yet; start from the current end of the log
+                _cache_seq = conn.execute('SELECT COALESCE(MAX(seq), 0) FROM cache_versions').fetchone()[0]
+            else:
+                for namespace, key, seq in conn.execute(
+                    'SELECT namespace, key, seq FROM cache_versions WHERE seq > ? ORDER BY seq',
+                    (_cache_seq,)
+                ):
+                    if namespace in _read_caches:
+                        _read_caches[namespace].invalidate(key)
+                    _cache_seq = seq
+        _cache_next_sync = now + READ_CACHE_SYNC_MS / 1000.0
+
+
+def _cached_read(namespace, user_id, loader):
+    """Read a row through its cache (bypassed inside a db_session, which must see its own writes)"""
+    key = _cache_key(user_id)
+    if READ_CACHE_MAX_ENTRIES <= 0 or key is None or _in_session():
+        return loader()
+    if time.monotonic() >= _cache_next_sync:
+        _sync_cache_invalidations()
+    return _read_caches[namespace].get(key, loader)
+
+
+def get_cache_stats():
+    """Get hit ratios and counters of the read-through caches"""
+    return {
+        'enabled': READ_CACHE_MAX_ENTRIES > 0,
+        'synced_seq': _cache_seq,
+        'caches': {namespace: cache.get_stats() for namespace, cache in _read_caches.items()}
+    }
 
 
 def init_database():
@@ -84,8 +325,8 @@ def init_database():
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 user_id INTEGER NOT NULL,
                 message_count INTEGER DEFAULT 0,
-                detected_emotions TEXT,
-                topics TEXT,
+                detected_emotions TEXT,  -- legacy JSON list, see chat_analysis_counts
+                topics TEXT,  -- legacy JSON list, see chat_analysis_counts
                 overall_sentiment TEXT,
                 risk_level TEXT,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -94,6 +335,335 @@ def init_database():
         ''')
         
         conn.commit()
+    
+    apply_migrations()
+
+
+def run_write(fn):
+    """
+    Run fn (a function making database calls) as one unit of work
+
+    Without write-behind, or when already inside a db_session, fn runs in a
+    db_session on the calling thread. Otherwise it is queued for the
+    write-behind writer, which commits it together with other queued work;
+    CHAT_WRITE_BEHIND='commit' waits for that commit and returns fn's result,
+    'enqueue' returns None as soon as the work is queued.
+    """
+    if CHAT_WRITE_BEHIND == 'off' or _in_session():
+        with db_session():
+            return fn()
+
+    from write_behind import get_write_behind
+    future = get_write_behind().submit(fn)
+    if CHAT_WRITE_BEHIND == 'commit':
+        return future.result()
+    return None
+
+
+# Schema migrations, applied in order; PRAGMA user_version records the last one.
+# Each entry is (version, description, list of SQL statements).
+def _tag_rows_sql(row, table=''):
+    """
+    SELECT producing the chat_message_tags rows of chat_messages rows
+
+    Args:
+        row: alias of the chat_messages row ('NEW' in triggers, or a table alias)
+        table: 'chat_messages ' to select from the table itself under the alias
+    """
+    # User messages carry the turn's risk level in their sentiment column
+    risk_rank = (f"CASE {row}.sentiment "
+                 + ' '.join(f"WHEN '{level}' THEN {rank}" for level, rank in RISK_RANKS.items())
+                 + ' END')
+    selects = []
+    for kind, column in (('emotion', 'emotions'), ('topic', 'topics')):
+        selects.append(
+            f"""SELECT '{kind}', j.value, COALESCE({row}.timestamp, CURRENT_TIMESTAMP), {row}.id,
+                       {row}.user_id, {risk_rank}
+                FROM {table}{row + ', ' if table else ''}json_each(CASE WHEN json_valid({row}.{column}) AND json_type({row}.{column}) = 'array'
+                                    THEN {row}.{column} ELSE '[]' END) j
+                WHERE j.type = 'text'"""
+        )
+    return '\n UNION ALL '.join(selects)
+
+
+_TAG_COLUMNS = '(kind, name, created_at, message_id, user_id, risk_rank)'
+
+# Make sure a user has a user_report_stats row (conflict-free, like _CACHE_BUMP)
+_REPORT_STATS_ROW = '''INSERT INTO user_report_stats (user_id)
+               SELECT {user_id}
+               WHERE NOT EXISTS (SELECT 1 FROM user_report_stats WHERE user_id = {user_id})'''
+
+# Record a write to a cached row under the next cache_versions sequence number.
+# No conflict clauses: the outer statement's (e.g. an UPSERT) would override them.
+_CACHE_BUMP = '''UPDATE cache_versions SET seq = (SELECT MAX(seq) + 1 FROM cache_versions)
+               WHERE namespace = '{namespace}' AND key = {key};
+               INSERT INTO cache_versions (namespace, key, seq)
+               SELECT '{namespace}', {key}, (SELECT COALESCE(MAX(seq), 0) + 1 FROM cache_versions)
+               WHERE NOT EXISTS (SELECT 1 FROM cache_versions WHERE namespace = '{namespace}' AND key = {key})'''
+
+# Whether a chat_messages row is in the full-text index yet
+_SEARCH_INDEXED = '''({row}.id <= (SELECT last_id FROM search_backfill WHERE index_name = 'chat_messages_fts')
+                     OR {row}.id > (SELECT max_id FROM search_backfill WHERE index_name = 'chat_messages_fts'))'''
+
+MIGRATIONS = [
+    (1, 'Indexes for hot query paths and one chat_analysis row per user', [
+        'CREATE INDEX IF NOT EXISTS idx_chat_messages_user_timestamp ON chat_messages (user_id, timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_assessments_user_created ON assessments (user_id, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_users_email ON users (email)',
+        # Keep the newest analysis row of users that somehow got several
+        'DELETE FROM chat_analysis WHERE id NOT IN (SELECT MAX(id) FROM chat_analysis GROUP BY user_id)',
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_chat_analysis_user ON chat_analysis (user_id)',
+    ]),
+    (2, 'Chat history keyset pagination by message id', [
+        'CREATE INDEX IF NOT EXISTS idx_chat_messages_user_id ON chat_messages (user_id, id)',
+        'DROP INDEX IF EXISTS idx_chat_messages_user_timestamp',
+    ]),
+    (3, 'Per-user emotion and topic counters for chat analysis', [
+        '''CREATE TABLE IF NOT EXISTS chat_analysis_counts (
+               user_id INTEGER NOT NULL,
+               kind TEXT NOT NULL,
+               name TEXT NOT NULL,
+               count INTEGER NOT NULL DEFAULT 0,
+               first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+               last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+               PRIMARY KEY (user_id, kind, name)
+           ) WITHOUT ROWID''',
+        # Emotion frequencies are recovered from the stored user messages; like
+        # live writes, a message counts once per emotion even if listed twice
+        '''INSERT OR IGNORE INTO chat_analysis_counts (user_id, kind, name, count, first_seen, last_seen)
+           SELECT m.user_id, 'emotion', e.value, COUNT(DISTINCT m.id), MIN(m.timestamp), MAX(m.timestamp)
+           FROM chat_messages m, json_each(m.emotions) e
+           WHERE m.emotions IS NOT NULL AND json_valid(m.emotions) AND json_type(m.emotions) = 'array'
+           GROUP BY m.user_id, e.value''',
+        # Anything only known from the old JSON lists counts once
+        '''INSERT OR IGNORE INTO chat_analysis_counts (user_id, kind, name, count, first_seen, last_seen)
+           SELECT a.user_id, 'emotion', e.value, 1, a.updated_at, a.updated_at
+           FROM chat_analysis a, json_each(a.detected_emotions) e
+           WHERE json_valid(a.detected_emotions) AND json_type(a.detected_emotions) = 'array'
+           GROUP BY 1, 2, 3''',
+        '''INSERT OR IGNORE INTO chat_analysis_counts (user_id, kind, name, count, first_seen, last_seen)
+           SELECT a.user_id, 'topic', t.value, 1, a.updated_at, a.updated_at
+           FROM chat_analysis a, json_each(a.topics) t
+           WHERE json_valid(a.topics) AND json_type(a.topics) = 'array'
+           GROUP BY 1, 2, 3''',
+        # The JSON lists are superseded by the counters
+        'UPDATE chat_analysis SET detected_emotions = NULL, topics = NULL',
+    ]),
+    (4, 'Indexed emotion/topic/risk tags of chat messages for cohort queries', [
+        'ALTER TABLE chat_messages ADD COLUMN topics TEXT',
+        # One row per (emotion or topic, message); the primary key is the cohort
+        # index, and WITHOUT ROWID makes it cover every column
+        '''CREATE TABLE IF NOT EXISTS chat_message_tags (
+               kind TEXT NOT NULL,
+               name TEXT NOT NULL,
+               created_at TIMESTAMP NOT NULL,
+               message_id INTEGER NOT NULL,
+               user_id INTEGER NOT NULL,
+               risk_rank INTEGER,
+               PRIMARY KEY (kind, name, created_at, message_id)
+           ) WITHOUT ROWID''',
+        'CREATE INDEX IF NOT EXISTS idx_chat_message_tags_message ON chat_message_tags (message_id)',
+        f'''CREATE TRIGGER IF NOT EXISTS chat_message_tags_insert AFTER INSERT ON chat_messages
+           WHEN NEW.emotions IS NOT NULL OR NEW.topics IS NOT NULL
+           BEGIN
+               INSERT OR IGNORE INTO chat_message_tags {_TAG_COLUMNS}
+               {_tag_rows_sql('NEW')};
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS chat_message_tags_delete AFTER DELETE ON chat_messages
+           WHEN OLD.emotions IS NOT NULL OR OLD.topics IS NOT NULL
+           BEGIN
+               DELETE FROM chat_message_tags WHERE message_id = OLD.id;
+           END''',
+        f'''CREATE TRIGGER IF NOT EXISTS chat_message_tags_update
+           AFTER UPDATE OF user_id, timestamp, sentiment, emotions, topics ON chat_messages
+           BEGIN
+               DELETE FROM chat_message_tags WHERE message_id = OLD.id;
+               INSERT OR IGNORE INTO chat_message_tags {_TAG_COLUMNS}
+               {_tag_rows_sql('NEW')};
+           END''',
+        # Tag the existing messages
+        f'''INSERT OR IGNORE INTO chat_message_tags {_TAG_COLUMNS}
+           {_tag_rows_sql('m', table='chat_messages ')}''',
+    ]),
+    (5, 'Full-text search index over chat messages', [
+        # External content table: the text lives only in chat_messages. user_id is
+        # indexed too, so per-user searches intersect two posting lists.
+        '''CREATE VIRTUAL TABLE IF NOT EXISTS chat_messages_fts USING fts5(
+               content, user_id,
+               content='chat_messages', content_rowid='id',
+               tokenize='porter unicode61 remove_diacritics 2'
+           )''',
+        # Rank by the message text only
+        "INSERT INTO chat_messages_fts (chat_messages_fts, rank) VALUES ('rank', 'bm25(1.0, 0.0)')",
+        # Messages up to max_id existed before the index; backfill_chat_search()
+        # indexes them in small batches, advancing last_id
+        '''CREATE TABLE IF NOT EXISTS search_backfill (
+               index_name TEXT PRIMARY KEY,
+               last_id INTEGER NOT NULL,
+               max_id INTEGER NOT NULL
+           )''',
+        '''INSERT OR IGNORE INTO search_backfill (index_name, last_id, max_id)
+           VALUES ('chat_messages_fts', 0, COALESCE((SELECT MAX(id) FROM chat_messages), 0))''',
+        '''CREATE TRIGGER IF NOT EXISTS chat_messages_fts_insert AFTER INSERT ON chat_messages
+           BEGIN
+               INSERT INTO chat_messages_fts (rowid, content, user_id)
+               VALUES (NEW.id, NEW.content, NEW.user_id);
+           END''',
+        # Only rows already in the index may be removed from it
+        f'''CREATE TRIGGER IF NOT EXISTS chat_messages_fts_delete AFTER DELETE ON chat_messages
+           WHEN {_SEARCH_INDEXED.format(row='OLD')}
+           BEGIN
+               INSERT INTO chat_messages_fts (chat_messages_fts, rowid, content, user_id)
+               VALUES ('delete', OLD.id, OLD.content, OLD.user_id);
+           END''',
+        f'''CREATE TRIGGER IF NOT EXISTS chat_messages_fts_update AFTER UPDATE OF content, user_id ON chat_messages
+           WHEN {_SEARCH_INDEXED.format(row='OLD')}
+           BEGIN
+               INSERT INTO chat_messages_fts (chat_messages_fts, rowid, content, user_id)
+               VALUES ('delete', OLD.id, OLD.content, OLD.user_id);
+               INSERT INTO chat_messages_fts (rowid, content, user_id)
+               VALUES (NEW.id, NEW.content, NEW.user_id);
+           END''',
+    ]),
+    (6, 'Cache invalidation log for users and chat analysis', [
+        # One row per cached key; seq is a global counter bumped by every write
+        '''CREATE TABLE IF NOT EXISTS cache_versions (
+               namespace TEXT NOT NULL,
+               key INTEGER NOT NULL,
+               seq INTEGER NOT NULL,
+               PRIMARY KEY (namespace, key)
+           ) WITHOUT ROWID''',
+        'CREATE INDEX IF NOT EXISTS idx_cache_versions_seq ON cache_versions (seq)',
+    ] + [
+        f'''CREATE TRIGGER IF NOT EXISTS {table}_cache_{event.lower()} AFTER {event} ON {table}
+           BEGIN
+               {_CACHE_BUMP.format(namespace=namespace, key=f"{'OLD' if event == 'DELETE' else 'NEW'}.{column}")};
+           END'''
+        for table, namespace, column in (('users', 'user', 'id'), ('chat_analysis', 'chat_analysis', 'user_id'))
+        for event in ('INSERT', 'UPDATE', 'DELETE')
+    ]),
+    (7, 'Per-user report aggregates maintained by triggers', [
+        '''CREATE TABLE IF NOT EXISTS user_report_stats (
+               user_id INTEGER PRIMARY KEY,
+               message_count INTEGER NOT NULL DEFAULT 0,
+               user_message_count INTEGER NOT NULL DEFAULT 0,
+               first_message_at TIMESTAMP,
+               last_message_at TIMESTAMP,
+               assessment_count INTEGER NOT NULL DEFAULT 0,
+               latest_assessment_id INTEGER,
+               latest_assessment_type TEXT,
+               latest_risk_level TEXT,
+               latest_assessment_at TIMESTAMP
+           )''',
+        # Backfill from the existing rows (bare columns next to MAX(id) come from that row)
+        '''INSERT INTO user_report_stats (user_id, message_count, user_message_count,
+                                          first_message_at, last_message_at)
+           SELECT user_id, COUNT(*), SUM(role = 'user'), MIN(timestamp), MAX(timestamp)
+           FROM chat_messages
+           GROUP BY user_id''',
+        '''INSERT INTO user_report_stats (user_id, assessment_count, latest_assessment_id,
+                                          latest_assessment_type, latest_risk_level, latest_assessment_at)
+           SELECT user_id, COUNT(*), MAX(id), assessment_type, risk_level, created_at
+           FROM assessments
+           WHERE true
+           GROUP BY user_id
+           ON CONFLICT (user_id) DO UPDATE SET
+               assessment_count = excluded.assessment_count,
+               latest_assessment_id = excluded.latest_assessment_id,
+               latest_assessment_type = excluded.latest_assessment_type,
+               latest_risk_level = excluded.latest_risk_level,
+               latest_assessment_at = excluded.latest_assessment_at''',
+        f'''CREATE TRIGGER IF NOT EXISTS user_report_stats_message_insert AFTER INSERT ON chat_messages
+           BEGIN
+               {_REPORT_STATS_ROW.format(user_id='NEW.user_id')};
+               UPDATE user_report_stats SET
+                   message_count = message_count + 1,
+                   user_message_count = user_message_count + (NEW.role = 'user'),
+                   first_message_at = COALESCE(first_message_at, NEW.timestamp),
+                   last_message_at = NEW.timestamp
+               WHERE user_id = NEW.user_id;
+           END''',
+        # Deleting messages moves the first/last times to the remaining ones (index lookups)
+        '''CREATE TRIGGER IF NOT EXISTS user_report_stats_message_delete AFTER DELETE ON chat_messages
+           BEGIN
+               UPDATE user_report_stats SET
+                   message_count = message_count - 1,
+                   user_message_count = user_message_count - (OLD.role = 'user'),
+                   first_message_at = (SELECT timestamp FROM chat_messages
+                                       WHERE user_id = OLD.user_id ORDER BY id LIMIT 1),
+                   last_message_at = (SELECT timestamp FROM chat_messages
+                                      WHERE user_id = OLD.user_id ORDER BY id DESC LIMIT 1)
+               WHERE user_id = OLD.user_id;
+           END''',
+        f'''CREATE TRIGGER IF NOT EXISTS user_report_stats_assessment_insert AFTER INSERT ON assessments
+           BEGIN
+               {_REPORT_STATS_ROW.format(user_id='NEW.user_id')};
+               UPDATE user_report_stats SET
+                   assessment_count = assessment_count + 1,
+                   latest_assessment_id = NEW.id,
+                   latest_assessment_type = NEW.assessment_type,
+                   latest_risk_level = NEW.risk_level,
+                   latest_assessment_at = NEW.created_at
+               WHERE user_id = NEW.user_id;
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS user_report_stats_assessment_delete AFTER DELETE ON assessments
+           BEGIN
+               UPDATE user_report_stats SET assessment_count = assessment_count - 1
+               WHERE user_id = OLD.user_id;
+               UPDATE user_report_stats SET
+                   latest_assessment_id = latest.id,
+                   latest_assessment_type = latest.assessment_type,
+                   latest_risk_level = latest.risk_level,
+                   latest_assessment_at = latest.created_at
+               FROM (SELECT id, assessment_type, risk_level, created_at FROM assessments
+                     WHERE user_id = OLD.user_id ORDER BY id DESC LIMIT 1) AS latest
+               WHERE user_id = OLD.user_id;
+               UPDATE user_report_stats SET
+                   latest_assessment_id = NULL, latest_assessment_type = NULL,
+                   latest_risk_level = NULL, latest_assessment_at = NULL
+               WHERE user_id = OLD.user_id AND assessment_count = 0;
+           END''',
+    ]),
+]
+
+
+def get_schema_version():
+    """Get the version of the last applied migration"""
+    with get_db_connection() as conn:
+        return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def apply_migrations():
+    """
+    Apply pending schema migrations
+
+    Each migration runs in its own write transaction; the version is checked
+    again after taking the write lock, so several workers starting at once
+    apply each migration exactly once.
+
+    Returns:
+        list of applied migration versions
+    """
+    applied = []
+    with get_db_connection() as conn:
+        for version, description, statements in MIGRATIONS:
+            if conn.execute('PRAGMA user_version').fetchone()[0] >= version:
+                continue
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if conn.execute('PRAGMA user_version').fetchone()[0] >= version:
+                    conn.rollback()
+                    continue
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(f'PRAGMA user_version = {version}')
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            print(f"Applied database migration {version}: {description}")
+            applied.append(version)
+    return applied
 
 
 # User Operations
@@ -105,12 +675,19 @@ def create_user(name, email=None, age=None):
             'INSERT INTO users (name, email, age) VALUES (?, ?, ?)',
             (name, email, age)
         )
-        conn.commit()
+        _commit(conn)
+        # A miss for the new id may have been cached
+        _invalidate_cached('user', cursor.lastrowid)
         return cursor.lastrowid
 
 
 def get_user(user_id):
-    """Get user by ID"""
+    """Get user by ID (cached)"""
+    return _cached_read('user', user_id, lambda: _load_user(user_id))
+
+
+def _load_user(user_id):
+    """Read a user row from the database"""
     with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))
@@ -139,7 +716,8 @@ def update_user_activity(user_id):
             'UPDATE users SET last_active = ? WHERE id = ?',
             (datetime.now(), user_id)
         )
-        conn.commit()
+        _commit(conn)
+    _invalidate_cached('user', user_id)
 
 
 def get_all_users():
@@ -151,32 +729,74 @@ def get_all_users():
 
 
 # Chat Message Operations
-def save_chat_message(user_id, role, content, sentiment=None, emotions=None):
-    """Save a chat message"""
+def save_chat_message(user_id, role, content, sentiment=None, emotions=None, topics=None):
+    """
+    Save a chat message
+
+    Emotions and topics are stored as JSON lists; a trigger indexes them in
+    chat_message_tags for cohort queries.
+
+    With CHAT_WRITE_BEHIND enabled (and outside a db_session) the insert goes
+    through the write-behind queue; in 'enqueue' mode None is returned
+    instead of the message id.
+    """
+    if CHAT_WRITE_BEHIND != 'off' and not _in_session():
+        return run_write(lambda: save_chat_message(user_id, role, content, sentiment, emotions, topics))
+
     with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(
-            '''INSERT INTO chat_messages (user_id, role, content, sentiment, emotions)
-               VALUES (?, ?, ?, ?, ?)''',
-            (user_id, role, content, sentiment, json.dumps(emotions) if emotions else None)
+            '''INSERT INTO chat_messages (user_id, role, content, sentiment, emotions, topics)
+               VALUES (?, ?, ?, ?, ?, ?)''',
+            (user_id, role, content, sentiment,
+             json.dumps(emotions) if emotions else None,
+             json.dumps(topics) if topics else None)
         )
-        conn.commit()
+        _commit(conn)
         return cursor.lastrowid
 
 
-def get_chat_history(user_id, limit=50):
-    """Get chat history for a user"""
+def get_chat_history(user_id, limit=50, before=None, after=None):
+    """
+    Get a window of chat history for a user, oldest message first
+
+    Pages are found by message id (keyset pagination) on the (user_id, id)
+    index, so any page costs the same however long the history is.
+
+    Args:
+        user_id: user whose messages to read
+        limit: maximum number of messages
+        before: only messages with a smaller id (the newest ones before it)
+        after: only messages with a larger id (the oldest ones after it)
+
+    Returns:
+        list of messages in chronological order; without cursors, the most recent ones
+    """
+    if before is not None and after is not None:
+        raise ValueError("Use either before or after, not both")
+
     with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            '''SELECT * FROM chat_messages 
-               WHERE user_id = ? 
-               ORDER BY timestamp ASC 
-               LIMIT ?''',
-            (user_id, limit)
-        )
+        if after is not None:
+            rows = conn.execute(
+                '''SELECT * FROM chat_messages 
+                   WHERE user_id = ? AND id > ? 
+                   ORDER BY id ASC 
+                   LIMIT ?''',
+                (user_id, after, limit)
+            ).fetchall()
+        else:
+            # Newest N, then reversed into chronological order
+            rows = conn.execute(
+                '''SELECT * FROM chat_messages 
+                   WHERE user_id = ? AND id < ? 
+                   ORDER BY id DESC 
+                   LIMIT ?''',
+                (user_id, before if before is not None else MAX_ROWID, limit)
+            ).fetchall()
+            rows.reverse()
+
         messages = []
-        for row in cursor.fetchall():
+        for row in rows:
             msg = dict(row)
             if msg.get('emotions'):
                 msg['emotions'] = json.loads(msg['emotions'])
@@ -184,12 +804,215 @@ def get_chat_history(user_id, limit=50):
         return messages
 
 
+def get_chat_history_page(user_id, limit=50, before=None, after=None):
+    """
+    Get one page of chat history with cursors for the neighbouring pages
+
+    Returns:
+        dict with 'messages' (chronological), 'has_more' (more messages exist in
+        the paging direction) and 'cursors' ('before' = oldest id, 'after' = newest id)
+    """
+    # One extra row tells whether another page exists
+    messages = get_chat_history(user_id, limit + 1, before=before, after=after)
+    has_more = len(messages) > limit
+    if has_more:
+        messages = messages[:limit] if after is not None else messages[1:]
+    return {
+        'messages': messages,
+        'has_more': has_more,
+        'cursors': {
+            'before': messages[0]['id'] if messages else before,
+            'after': messages[-1]['id'] if messages else after
+        }
+    }
+
+
 def clear_chat_history(user_id):
     """Clear chat history for a user"""
     with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute('DELETE FROM chat_messages WHERE user_id = ?', (user_id,))
-        conn.commit()
+        _commit(conn)
+
+
+# Chat Search Operations
+SEARCH_MODES = ('words', 'phrase', 'raw')
+SEARCH_SORTS = ('relevance', 'recent')
+
+
+def _fts_query(text, mode):
+    """
+    Build an FTS5 query from search text
+
+    'words' matches messages containing every word (a trailing * makes a word
+    a prefix), 'phrase' matches the exact phrase and 'raw' passes FTS5 query
+    syntax through.
+    """
+    if mode == 'raw':
+        return text
+    if mode == 'phrase':
+        return '"' + text.replace('"', '""') + '"'
+    terms = []
+    for word in text.split():
+        prefix = word.endswith('*')
+        word = word.rstrip('*')
+        if word:
+            terms.append('"' + word.replace('"', '""') + '"' + ('*' if prefix else ''))
+    return ' '.join(terms)
+
+
+def _encode_cursor(values):
+    """Opaque pagination cursor for a list of values"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    """Decode a pagination cursor; raises ValueError if malformed"""
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def search_chat_messages(text, user_id=None, mode='words', sort='relevance', limit=20, cursor=None):
+    """
+    Full-text search over chat messages
+
+    Args:
+        text: words, phrase or FTS5 query (see mode)
+        user_id: only search this user's messages
+        mode: 'words' (all words), 'phrase' (exact phrase) or 'raw' (FTS5 syntax)
+        sort: 'relevance' (BM25, best first) or 'recent' (newest first)
+        limit: maximum number of results
+        cursor: next_cursor of the previous page
+
+    Returns:
+        dict with 'results' (id, user_id, role, timestamp, content, snippet with
+        **highlighted** matches and rank), 'has_more' and 'next_cursor'
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"mode must be one of {list(SEARCH_MODES)}")
+    if sort not in SEARCH_SORTS:
+        raise ValueError(f"sort must be one of {list(SEARCH_SORTS)}")
+    query = _fts_query(text, mode)
+    if not query.strip():
+        raise ValueError("Search text is empty")
+
+    conditions = ['chat_messages_fts MATCH ?']
+    if user_id is not None:
+        # The user_id column filter lets FTS5 intersect posting lists; the
+        # plain condition keeps raw queries from escaping the scope
+        query = f'content : ({query}) AND user_id : {int(user_id)}'
+        conditions.append('m.user_id = ?')
+    params = [query] + ([int(user_id)] if user_id is not None else [])
+
+    if sort == 'relevance':
+        order = 'f.rank, m.id'
+        if cursor is not None:
+            rank, last_id = _decode_cursor(cursor)
+            conditions.append('(f.rank > ? OR (f.rank = ? AND m.id > ?))')
+            params += [float(rank), float(rank), int(last_id)]
+    else:
+        order = 'f.rowid DESC'
+        if cursor is not None:
+            (last_id,) = _decode_cursor(cursor)
+            conditions.append('f.rowid < ?')
+            params.append(int(last_id))
+    params.append(limit + 1)
+
+    with get_db_connection() as conn:
+        try:
+            rows = conn.execute(
+                f'''SELECT m.id, m.user_id, m.role, m.timestamp, m.content,
+                          snippet(chat_messages_fts, 0, '**', '**', '...', 16) AS snippet,
+                          f.rank AS rank
+                   FROM chat_messages_fts f
+                   JOIN chat_messages m ON m.id = f.rowid
+                   WHERE {' AND '.join(conditions)}
+                   ORDER BY {order}
+                   LIMIT ?''',
+                params
+            ).fetchall()
+        except sqlite3.OperationalError as e:
+            # Malformed raw queries fail in FTS5's parser ('fts5: syntax error...',
+            # 'unterminated string', 'no such column'); locking errors do not
+            if 'locked' in str(e) or 'busy' in str(e):
+                raise
+            raise ValueError(f"Invalid search query: {e}")
+
+    results = [dict(row) for row in rows[:limit]]
+    has_more = len(rows) > limit
+    next_cursor = None
+    if has_more:
+        last = results[-1]
+        next_cursor = _encode_cursor([last['rank'], last['id']] if sort == 'relevance' else [last['id']])
+    return {'results': results, 'has_more': has_more, 'next_cursor': next_cursor}
+
+
+def get_search_index_status():
+    """
+    Get how much of the chat history the full-text index covers
+
+    Returns:
+        dict with 'complete' and 'pending' (messages still to be backfilled)
+    """
+    with get_db_connection() as conn:
+        row = conn.execute(
+            "SELECT last_id, max_id FROM search_backfill WHERE index_name = 'chat_messages_fts'"
+        ).fetchone()
+        pending = conn.execute(
+            'SELECT COUNT(*) FROM chat_messages WHERE id > ? AND id <= ?',
+            (row['last_id'], row['max_id'])
+        ).fetchone()[0]
+    return {'complete': pending == 0, 'pending': pending}
+
+
+def backfill_chat_search(batch_size=1000, pause_ms=10, progress=None):
+    """
+    Index chat messages written before the full-text index existed
+
+    Works through them in id order, one short write transaction per batch,
+    so live chat writes are only held up for one batch at a time. Progress
+    is committed with each batch; an interrupted backfill resumes where it
+    stopped.
+
+    Args:
+        batch_size: messages indexed per transaction
+        pause_ms: sleep between batches, leaving the write lock to live traffic
+        progress: optional callable receiving (indexed so far, last indexed id, max id)
+
+    Returns:
+        number of messages indexed
+    """
+    indexed = 0
+    while True:
+        with db_session():
+            with get_db_connection() as conn:
+                last_id, max_id = conn.execute(
+                    "SELECT last_id, max_id FROM search_backfill WHERE index_name = 'chat_messages_fts'"
+                ).fetchone()
+                if last_id >= max_id:
+                    return indexed
+                batch_end = conn.execute(
+                    '''SELECT MAX(id) FROM (
+                           SELECT id FROM chat_messages WHERE id > ? AND id <= ? ORDER BY id LIMIT ?
+                       )''',
+                    (last_id, max_id, batch_size)
+                ).fetchone()[0] or max_id
+                cursor = conn.execute(
+                    '''INSERT INTO chat_messages_fts (rowid, content, user_id)
+                       SELECT id, content, user_id FROM chat_messages WHERE id > ? AND id <= ?''',
+                    (last_id, batch_end)
+                )
+                indexed += cursor.rowcount
+                conn.execute(
+                    "UPDATE search_backfill SET last_id = ? WHERE index_name = 'chat_messages_fts'",
+                    (batch_end,)
+                )
+        if progress:
+            progress(indexed, batch_end, max_id)
+        if pause_ms:
+            time.sleep(pause_ms / 1000.0)
 
 
 # Assessment Operations
@@ -209,7 +1032,7 @@ def save_assessment(user_id, assessment_type, scores, risk_level, conditions=Non
                 json.dumps(recommendations) if recommendations else None
             )
         )
-        conn.commit()
+        _commit(conn)
         return cursor.lastrowid
 
 
@@ -237,64 +1060,253 @@ def get_user_assessments(user_id, limit=10):
         return assessments
 
 
+def get_user_report_stats(user_id):
+    """
+    Get a user's report aggregates (kept up to date by triggers)
+
+    Returns:
+        dict with message_count, user_message_count, first/last message times,
+        assessment_count and the latest assessment's id, type, risk level and time
+    """
+    with get_db_connection() as conn:
+        row = conn.execute('SELECT * FROM user_report_stats WHERE user_id = ?', (user_id,)).fetchone()
+    if row:
+        return dict(row)
+    return {
+        'user_id': user_id,
+        'message_count': 0,
+        'user_message_count': 0,
+        'first_message_at': None,
+        'last_message_at': None,
+        'assessment_count': 0,
+        'latest_assessment_id': None,
+        'latest_assessment_type': None,
+        'latest_risk_level': None,
+        'latest_assessment_at': None
+    }
+
+
+def iter_user_ids(batch_size=1000, active_since=None):
+    """
+    Yield every user id in ascending order, fetched in keyset batches
+
+    Args:
+        batch_size: ids fetched per query
+        active_since: only users active at or after this 'YYYY-MM-DD HH:MM:SS' time
+    """
+    last_id = 0
+    while True:
+        with get_db_connection() as conn:
+            if active_since is None:
+                rows = conn.execute(
+                    'SELECT id FROM users WHERE id > ? ORDER BY id LIMIT ?', (last_id, batch_size)
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    'SELECT id FROM users WHERE id > ? AND last_active >= ? ORDER BY id LIMIT ?',
+                    (last_id, active_since, batch_size)
+                ).fetchall()
+        if not rows:
+            return
+        for row in rows:
+            yield row[0]
+        last_id = rows[-1][0]
+
+
 # Chat Analysis Operations
-def save_chat_analysis(user_id, message_count, detected_emotions, topics, overall_sentiment, risk_level):
-    """Save or update chat analysis for a user"""
+def record_chat_analysis(user_id, emotions, topics, risk_level):
+    """
+    Add one chat message to a user's analysis with in-SQL increments
+
+    Emotion and topic counters are bumped (with first/last seen times), the
+    message count is incremented and the overall sentiment is re-derived
+    from the emotion counts, all without reading the analysis back into Python.
+
+    Args:
+        user_id: user who sent the message
+        emotions: emotions detected in the message
+        topics: topics detected in the message
+        risk_level: risk level of the message (becomes the current risk level)
+    """
+    rows = [(user_id, 'emotion', name) for name in set(emotions or [])]
+    rows += [(user_id, 'topic', name) for name in set(topics or [])]
+    positive = ', '.join('?' * len(CHAT_POSITIVE_EMOTIONS))
+    negative = ', '.join('?' * len(CHAT_NEGATIVE_EMOTIONS))
+
     with get_db_connection() as conn:
-        cursor = conn.cursor()
-        
-        # Check if analysis exists
-        cursor.execute('SELECT id FROM chat_analysis WHERE user_id = ?', (user_id,))
-        existing = cursor.fetchone()
-        
-        if existing:
-            cursor.execute(
-                '''UPDATE chat_analysis 
-                   SET message_count = ?, detected_emotions = ?, topics = ?, 
-                       overall_sentiment = ?, risk_level = ?, updated_at = ?
-                   WHERE user_id = ?''',
-                (
-                    message_count,
-                    json.dumps(detected_emotions),
-                    json.dumps(topics),
-                    overall_sentiment,
-                    risk_level,
-                    datetime.now(),
-                    user_id
-                )
-            )
-        else:
-            cursor.execute(
-                '''INSERT INTO chat_analysis 
-                   (user_id, message_count, detected_emotions, topics, overall_sentiment, risk_level)
-                   VALUES (?, ?, ?, ?, ?, ?)''',
-                (
-                    user_id,
-                    message_count,
-                    json.dumps(detected_emotions),
-                    json.dumps(topics),
-                    overall_sentiment,
-                    risk_level
-                )
-            )
-        conn.commit()
+        conn.executemany(
+            '''INSERT INTO chat_analysis_counts (user_id, kind, name, count)
+               VALUES (?, ?, ?, 1)
+               ON CONFLICT (user_id, kind, name) DO UPDATE SET
+                   count = count + 1,
+                   last_seen = CURRENT_TIMESTAMP''',
+            rows
+        )
+        conn.execute(
+            f'''INSERT INTO chat_analysis (user_id, message_count, overall_sentiment, risk_level)
+               SELECT ?, 1,
+                   CASE WHEN positive > negative THEN 'positive'
+                        WHEN negative > 0 THEN 'negative'
+                        ELSE 'neutral' END,
+                   ?
+               FROM (
+                   SELECT COALESCE(SUM(CASE WHEN name IN ({positive}) THEN count END), 0) AS positive,
+                          COALESCE(SUM(CASE WHEN name IN ({negative}) THEN count END), 0) AS negative
+                   FROM chat_analysis_counts
+                   WHERE user_id = ? AND kind = 'emotion'
+               ) WHERE true
+               ON CONFLICT (user_id) DO UPDATE SET
+                   message_count = message_count + 1,
+                   overall_sentiment = excluded.overall_sentiment,
+                   risk_level = excluded.risk_level,
+                   updated_at = ?''',
+            (user_id, risk_level, *CHAT_POSITIVE_EMOTIONS, *CHAT_NEGATIVE_EMOTIONS, user_id, datetime.now())
+        )
+        _commit(conn)
+    _invalidate_cached('chat_analysis', user_id)
 
 
 def get_chat_analysis(user_id):
-    """Get chat analysis for a user"""
+    """
+    Get chat analysis for a user (cached)
+
+    Returns:
+        dict with message_count, overall_sentiment and risk_level, the detected
+        emotions and topics (most frequent first) and their counts with first
+        and last seen times, or None if the user has no analysis
+    """
+    return _cached_read('chat_analysis', user_id, lambda: _load_chat_analysis(user_id))
+
+
+def _load_chat_analysis(user_id):
+    """Read a user's chat analysis from the database"""
     with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM chat_analysis WHERE user_id = ?', (user_id,))
-        row = cursor.fetchone()
-        if row:
-            analysis = dict(row)
-            if analysis.get('detected_emotions'):
-                analysis['detected_emotions'] = json.loads(analysis['detected_emotions'])
-            if analysis.get('topics'):
-                analysis['topics'] = json.loads(analysis['topics'])
-            return analysis
-        return None
+        row = conn.execute(
+            '''SELECT id, user_id, message_count, overall_sentiment, risk_level, updated_at
+               FROM chat_analysis WHERE user_id = ?''',
+            (user_id,)
+        ).fetchone()
+        if not row:
+            return None
+
+        analysis = dict(row)
+        counts = {'emotion': {}, 'topic': {}}
+        for kind, name, count, first_seen, last_seen in conn.execute(
+            '''SELECT kind, name, count, first_seen, last_seen
+               FROM chat_analysis_counts
+               WHERE user_id = ?
+               ORDER BY count DESC, name''',
+            (user_id,)
+        ):
+            counts[kind][name] = {'count': count, 'first_seen': first_seen, 'last_seen': last_seen}
+
+        analysis['detected_emotions'] = list(counts['emotion'])
+        analysis['topics'] = list(counts['topic'])
+        analysis['emotion_counts'] = counts['emotion']
+        analysis['topic_counts'] = counts['topic']
+        return analysis
+
+
+# Cohort Analytics
+def get_cohort(emotion=None, topic=None, min_risk=None, since=None, until=None, limit=100):
+    """
+    Find users whose messages carried an emotion and/or topic
+
+    Answered from the chat_message_tags index: a range scan over the
+    (kind, name, created_at) prefix, without decoding any JSON.
+
+    Args:
+        emotion: emotion the messages must carry
+        topic: topic the messages must carry (with emotion: on the same message)
+        min_risk: lowest risk level of the messages ('low', 'moderate' or 'high')
+        since: earliest message time, 'YYYY-MM-DD HH:MM:SS' UTC (inclusive)
+        until: latest message time, 'YYYY-MM-DD HH:MM:SS' UTC (exclusive)
+        limit: maximum number of users returned
+
+    Returns:
+        dict with 'users' (user_id, matches, first_seen, last_seen and
+        max_risk, most matches first), 'total_users' and 'total_matches'
+    """
+    if not emotion and not topic:
+        raise ValueError("emotion or topic is required")
+    if min_risk is not None and min_risk not in RISK_RANKS:
+        raise ValueError(f"min_risk must be one of {list(RISK_RANKS)}")
+
+    kind, name = ('emotion', emotion) if emotion else ('topic', topic)
+    joins = ''
+    conditions = ['t.kind = ?', 't.name = ?']
+    params = [kind, name]
+    if emotion and topic:
+        # Same message: a primary key lookup per emotion match
+        joins = ('JOIN chat_message_tags t2 ON t2.kind = \'topic\' AND t2.name = ? '
+                 'AND t2.created_at = t.created_at AND t2.message_id = t.message_id')
+        params.insert(0, topic)
+    if since is not None:
+        conditions.append('t.created_at >= ?')
+        params.append(since)
+    if until is not None:
+        conditions.append('t.created_at < ?')
+        params.append(until)
+    if min_risk is not None:
+        conditions.append('t.risk_rank >= ?')
+        params.append(RISK_RANKS[min_risk])
+    params.append(limit)
+
+    with get_db_connection() as conn:
+        rows = conn.execute(
+            f'''SELECT user_id, matches, first_seen, last_seen, max_risk,
+                      COUNT(*) OVER () AS total_users, SUM(matches) OVER () AS total_matches
+               FROM (
+                   SELECT t.user_id, COUNT(*) AS matches, MIN(t.created_at) AS first_seen,
+                          MAX(t.created_at) AS last_seen, MAX(t.risk_rank) AS max_risk
+                   FROM chat_message_tags t {joins}
+                   WHERE {' AND '.join(conditions)}
+                   GROUP BY t.user_id
+               )
+               ORDER BY matches DESC, user_id
+               LIMIT ?''',
+            params
+        ).fetchall()
+
+    risk_levels = {rank: level for level, rank in RISK_RANKS.items()}
+    return {
+        'users': [
+            {
+                'user_id': row['user_id'],
+                'matches': row['matches'],
+                'first_seen': row['first_seen'],
+                'last_seen': row['last_seen'],
+                'max_risk': risk_levels.get(row['max_risk'])
+            }
+            for row in rows
+        ],
+        'total_users': rows[0]['total_users'] if rows else 0,
+        'total_matches': rows[0]['total_matches'] if rows else 0
+    }
 
 
 # Initialize database on module import
 init_database()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Database maintenance')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    backfill = subparsers.add_parser(
+        'backfill-search',
+        help='Index chat messages written before full-text search existed (safe while the app runs)'
+    )
+    backfill.add_argument('--batch-size', type=int, default=1000, help='Messages indexed per transaction')
+    backfill.add_argument('--pause-ms', type=float, default=10, help='Sleep between batches')
+    args = parser.parse_args()
+
+    if args.command == 'backfill-search':
+        started = time.perf_counter()
+        total = backfill_chat_search(
+            batch_size=args.batch_size,
+            pause_ms=args.pause_ms,
+            progress=lambda done, last_id, max_id: print(f"Indexed {done} messages (through id {last_id} of {max_id})")
+        )
+        print(f"Search backfill complete: {total} messages indexed in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,224 @@
+"""
+Dataset Compaction Module
+
+This module finds near-duplicate texts in a training corpus with MinHash and
+locality-sensitive hashing (LSH), in sub-quadratic time:
+- Texts are reduced to word shingles and MinHash signatures (NumPy, batched)
+- Signatures are split into bands; texts sharing a band bucket are candidates
+- Candidates are confirmed by estimated Jaccard similarity and merged into clusters
+
+Clusters can be compacted to one representative each (resolving label
+conflicts by a policy) or used as groups so duplicates never straddle the
+train/test split.
+"""
+import re
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+CONFLICT_POLICIES = ['majority', 'max_risk', 'drop']
+RISK_ORDER = {'low': 0, 'moderate': 1, 'high': 2}
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def _mix64(x):
+    """SplitMix64 finalizer: a fast, well-distributed 64-bit hash (wrapping arithmetic)"""
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _shingles(text, k):
+    """Word k-shingles of a normalized text (the whole text if it is shorter than k words)"""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= k:
+        return [' '.join(words)]
+    return [' '.join(words[i:i + k]) for i in range(len(words) - k + 1)]
+
+
+def _choose_bands(num_perm, threshold):
+    """Pick (bands, rows) with bands * rows == num_perm whose LSH threshold is closest"""
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        lsh_threshold = (1.0 / bands) ** (1.0 / rows)
+        error = abs(lsh_threshold - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+def minhash_signatures(texts, num_perm=64, shingle_size=3, batch_elements=4_000_000, seed=42):
+    """
+    Compute MinHash signatures for texts
+
+    Args:
+        texts: list of strings
+        num_perm: number of hash permutations (signature length)
+        shingle_size: words per shingle
+        batch_elements: cap on num_perm * shingles processed per batch (memory bound)
+        seed: random seed for the permutations
+
+    Returns:
+        ndarray of shape (len(texts), num_perm), dtype uint64
+    """
+    rng = np.random.default_rng(seed)
+    seeds = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)[:, None]
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint64)
+
+    start = 0
+    while start < len(texts):
+        # Gather shingles for as many texts as fit in one batch
+        hashes = []
+        lengths = []
+        total = 0
+        end = start
+        while end < len(texts) and (total == 0 or (total * num_perm) < batch_elements):
+            shingles = _shingles(texts[end], shingle_size)
+            hashes.extend(shingles)
+            lengths.append(len(shingles))
+            total += len(shingles)
+            end += 1
+
+        shingle_hashes = pd.util.hash_array(np.array(hashes, dtype=object))
+        offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        permuted = _mix64(shingle_hashes[None, :] ^ seeds)
+        signatures[start:end] = np.minimum.reduceat(permuted, offsets, axis=1).T
+        start = end
+
+    return signatures
+
+
+class _UnionFind:
+    """Disjoint sets over 0..n-1 with path halving"""
+
+    def __init__(self, n):
+        self.parent = np.arange(n)
+
+    def find(self, x):
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            # Keep the smaller index as root so the earliest text represents the cluster
+            if root_a < root_b:
+                self.parent[root_b] = root_a
+            else:
+                self.parent[root_a] = root_b
+
+
+def find_near_duplicate_groups(texts, threshold=0.8, num_perm=64, shingle_size=3):
+    """
+    Cluster near-duplicate texts
+
+    Args:
+        texts: list of strings
+        threshold: estimated Jaccard similarity above which texts are duplicates
+        num_perm: MinHash signature length
+        shingle_size: words per shingle
+
+    Returns:
+        ndarray of group ids (the index of each cluster's first text)
+    """
+    n = len(texts)
+    if n == 0:
+        return np.array([], dtype=np.int64)
+
+    signatures = minhash_signatures(texts, num_perm, shingle_size)
+    bands, rows = _choose_bands(num_perm, threshold)
+    union_find = _UnionFind(n)
+
+    for band in range(bands):
+        block = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        keys = block.view(np.dtype((np.void, block.dtype.itemsize * rows))).ravel()
+        _, bucket = np.unique(keys, return_inverse=True)
+
+        # Only buckets holding two or more texts can contain duplicates
+        shared = np.flatnonzero(np.bincount(bucket)[bucket] > 1)
+        if not len(shared):
+            continue
+        order = shared[np.argsort(bucket[shared], kind='stable')]
+        boundaries = np.flatnonzero(np.diff(bucket[order])) + 1
+        for members in np.split(order, boundaries):
+            # Confirm candidates against the bucket's first member
+            first = members[0]
+            agreement = (signatures[members[1:]] == signatures[first]).mean(axis=1)
+            for member in members[1:][agreement >= threshold]:
+                union_find.union(first, member)
+
+    return np.array([union_find.find(i) for i in range(n)])
+
+
+def _resolve_label(labels, policy):
+    """Pick a cluster label according to the conflict policy (None drops the cluster)"""
+    if len(set(labels)) == 1:
+        return labels[0]
+    if policy == 'drop':
+        return None
+    if policy == 'max_risk':
+        return max(labels, key=lambda label: RISK_ORDER.get(label, 0))
+    # Majority vote; ties go to the higher risk label
+    counts = Counter(labels)
+    return max(counts, key=lambda label: (counts[label], RISK_ORDER.get(label, 0)))
+
+
+def compact_dataset(texts, labels, threshold=0.8, conflict_policy='majority', num_perm=64):
+    """
+    Keep one representative text per near-duplicate cluster
+
+    Args:
+        texts: list of text samples
+        labels: list of labels
+        threshold: estimated Jaccard similarity above which texts are duplicates
+        conflict_policy: 'majority', 'max_risk' or 'drop' for clusters with mixed labels
+        num_perm: MinHash signature length
+
+    Returns:
+        tuple: (texts, labels, stats dict)
+    """
+    if conflict_policy not in CONFLICT_POLICIES:
+        raise ValueError(f"Unknown conflict policy: {conflict_policy}")
+    if len(texts) != len(labels):
+        raise ValueError("Number of texts must match number of labels")
+
+    groups = find_near_duplicate_groups(texts, threshold, num_perm)
+
+    members = {}
+    for index, group in enumerate(groups):
+        members.setdefault(group, []).append(index)
+
+    compact_texts = []
+    compact_labels = []
+    conflicts = 0
+    dropped = 0
+    for group, indices in members.items():
+        cluster_labels = [labels[i] for i in indices]
+        if len(set(cluster_labels)) > 1:
+            conflicts += 1
+        label = _resolve_label(cluster_labels, conflict_policy)
+        if label is None:
+            dropped += 1
+            continue
+        compact_texts.append(texts[group])
+        compact_labels.append(label)
+
+    stats = {
+        'input_samples': len(texts),
+        'clusters': len(members),
+        'duplicate_clusters': sum(1 for indices in members.values() if len(indices) > 1),
+        'conflicting_clusters': conflicts,
+        'dropped_clusters': dropped,
+        'output_samples': len(compact_texts)
+    }
+    return compact_texts, compact_labels, stats
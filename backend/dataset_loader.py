@@ -0,0 +1,206 @@
+"""
+Dataset Loader Module
+
+This module streams labeled training data from disk in chunks:
+- CSV/TSV, JSONL, JSON (array of records) and Parquet files, optionally
+  gzip-compressed
+- Sharded inputs given as several paths or glob patterns
+- Vectorized label validation and normalization with pandas
+- Exact duplicate removal across all chunks
+- Rejected rows are counted instead of printed one by one
+
+Chunks can be collected in memory (load_dataset) or fed one at a time to
+out-of-core training (iter_dataset_chunks).
+"""
+import glob
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+VALID_LABELS = ['low', 'moderate', 'high']
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+def expand_paths(paths):
+    """Expand a path, glob pattern or list of them into a sorted list of files"""
+    if isinstance(paths, str):
+        paths = [paths]
+    files = []
+    for pattern in paths:
+        matches = sorted(glob.glob(pattern))
+        if not matches:
+            raise FileNotFoundError(f"No files match '{pattern}'")
+        files.extend(matches)
+    return files
+
+
+def _file_format(path):
+    """Detect the file format from its extension, ignoring a .gz suffix"""
+    name = path.lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    for suffix, fmt in (('.csv', 'csv'), ('.tsv', 'tsv'), ('.jsonl', 'jsonl'),
+                        ('.ndjson', 'jsonl'), ('.json', 'json'), ('.parquet', 'parquet')):
+        if name.endswith(suffix):
+            return fmt
+    raise ValueError(f"Unsupported dataset format: {path}")
+
+
+def _iter_raw_chunks(path, chunksize):
+    """Yield raw DataFrames with 'text' and 'label' columns from one file"""
+    fmt = _file_format(path)
+
+    if fmt in ('csv', 'tsv'):
+        reader = pd.read_csv(
+            path,
+            sep='\t' if fmt == 'tsv' else ',',
+            usecols=lambda column: column in ('text', 'label'),
+            dtype=str,
+            keep_default_na=False,
+            chunksize=chunksize,
+            compression='infer'
+        )
+        for chunk in reader:
+            yield chunk
+    elif fmt == 'jsonl':
+        reader = pd.read_json(path, lines=True, dtype=False, chunksize=chunksize, compression='infer')
+        for chunk in reader:
+            yield chunk
+    elif fmt == 'json':
+        # A JSON array cannot be streamed; convert large files to JSONL instead
+        frame = pd.read_json(path, orient='records', dtype=False, compression='infer')
+        for start in range(0, len(frame), chunksize):
+            yield frame.iloc[start:start + chunksize]
+    else:
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Reading Parquet files requires the 'pyarrow' package")
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=['text', 'label']):
+            yield batch.to_pandas()
+
+
+class LoadStats:
+    """Counters describing what happened to the rows of a dataset"""
+
+    def __init__(self):
+        self.files = 0
+        self.rows_read = 0
+        self.invalid_label = 0
+        self.empty_text = 0
+        self.duplicates = 0
+        self.loaded = 0
+        self.invalid_label_values = Counter()
+
+    def to_dict(self):
+        return {
+            'files': self.files,
+            'rows_read': self.rows_read,
+            'invalid_label': self.invalid_label,
+            'empty_text': self.empty_text,
+            'duplicates': self.duplicates,
+            'loaded': self.loaded,
+            'top_invalid_labels': dict(self.invalid_label_values.most_common(5))
+        }
+
+
+def clean_chunk(chunk, stats, seen=None):
+    """
+    Validate, normalize and deduplicate one chunk
+
+    Args:
+        chunk: DataFrame with 'text' and 'label' columns
+        stats: LoadStats to update
+        seen: set of row hashes already loaded (None disables deduplication)
+
+    Returns:
+        tuple: (texts, labels) as lists
+    """
+    if 'text' not in chunk.columns or 'label' not in chunk.columns:
+        raise ValueError("Dataset must have 'text' and 'label' columns")
+
+    stats.rows_read += len(chunk)
+    text = chunk['text'].fillna('').astype(str).str.strip()
+    label = chunk['label'].fillna('').astype(str).str.strip().str.lower()
+
+    valid_label = label.isin(VALID_LABELS)
+    non_empty = text.str.len() > 0
+
+    stats.invalid_label += int((~valid_label).sum())
+    stats.empty_text += int((valid_label & ~non_empty).sum())
+    if not valid_label.all():
+        stats.invalid_label_values.update(label[~valid_label].value_counts().head(5).to_dict())
+
+    keep = valid_label & non_empty
+    text = text[keep]
+    label = label[keep]
+
+    if seen is not None and len(text):
+        hashes = pd.util.hash_pandas_object(
+            pd.DataFrame({'text': text, 'label': label}), index=False
+        ).to_numpy()
+        unique = ~pd.Series(hashes).duplicated().to_numpy()
+        unseen = np.fromiter((h not in seen for h in hashes), dtype=bool, count=len(hashes))
+        keep = unique & unseen
+        seen.update(hashes[keep].tolist())
+        stats.duplicates += int((~keep).sum())
+        text = text[keep]
+        label = label[keep]
+
+    stats.loaded += len(text)
+    return text.tolist(), label.tolist()
+
+
+def iter_dataset_chunks(paths, chunksize=DEFAULT_CHUNK_SIZE, dedupe=True, stats=None):
+    """
+    Stream cleaned (texts, labels) chunks from one or more dataset files
+
+    Args:
+        paths: file path, glob pattern, or list of them
+        chunksize: rows per chunk
+        dedupe: drop exact duplicate (text, label) rows across all files
+        stats: LoadStats to update (optional)
+
+    Yields:
+        tuple: (texts, labels) lists for each non-empty chunk
+    """
+    stats = stats if stats is not None else LoadStats()
+    seen = set() if dedupe else None
+
+    for path in expand_paths(paths):
+        stats.files += 1
+        for chunk in _iter_raw_chunks(path, chunksize):
+            texts, labels = clean_chunk(chunk, stats, seen)
+            if texts:
+                yield texts, labels
+
+
+def load_dataset(paths, chunksize=DEFAULT_CHUNK_SIZE, dedupe=True):
+    """
+    Load a whole dataset into memory
+
+    Returns:
+        tuple: (texts, labels, stats dict)
+    """
+    stats = LoadStats()
+    texts = []
+    labels = []
+    for chunk_texts, chunk_labels in iter_dataset_chunks(paths, chunksize, dedupe, stats):
+        texts.extend(chunk_texts)
+        labels.extend(chunk_labels)
+    return texts, labels, stats.to_dict()
+
+
+def print_load_stats(stats):
+    """Print a one-block summary of a dataset load"""
+    print(f"Loaded {stats['loaded']} samples from {stats['files']} file(s) "
+          f"({stats['rows_read']} rows read)")
+    rejected = stats['invalid_label'] + stats['empty_text'] + stats['duplicates']
+    if rejected:
+        print(f"  Skipped: {stats['invalid_label']} invalid label, "
+              f"{stats['empty_text']} empty text, {stats['duplicates']} duplicate")
+    if stats['top_invalid_labels']:
+        values = ', '.join(f"'{k}' x{v}" for k, v in stats['top_invalid_labels'].items())
+        print(f"  Most common invalid labels: {values} (must be {', '.join(VALID_LABELS)})")
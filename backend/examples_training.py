@@ -83,7 +83,8 @@ def example_3_comparing_models():
     
     model_types = ['logistic_regression', 'random_forest', 'gradient_boosting']
     
-    print("Training and comparing all three model types...\n")
+    print("Training and comparing all three model types...")
+    print("(TF-IDF features are fitted once and reused from the feature cache)\n")
     
     for model_type in model_types:
         model = MentalHealthMLModel()
@@ -93,6 +94,7 @@ def example_3_comparing_models():
         print(f"  Accuracy: {results['accuracy']:.2%}")
         print(f"  F1 Score: {results['f1_score']:.4f}")
         print(f"  Cross-val Mean: {results['cross_val_mean']:.4f}")
+        print(f"  Feature Cache: {results['feature_cache']}")
         print()
 
 
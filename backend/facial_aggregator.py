@@ -0,0 +1,251 @@
+"""
+Facial Emotion Aggregation Module
+
+This module keeps rolling per-session aggregates of the emotion labels the
+browser detects frame by frame:
+- Frames arrive in small batches of (emotion, confidence, timestamp)
+- Each session holds a fixed-size state: exponentially decayed confidence per
+  emotion, a decayed frame weight and a decayed count of label switches
+- Updating costs O(1) per frame and memory is constant per session
+- Idle sessions expire and the number of sessions is bounded (least recently used)
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Labels produced by face-api.js expression detection
+EMOTIONS = ['neutral', 'happy', 'sad', 'angry', 'fearful', 'disgusted', 'surprised']
+NEGATIVE_EMOTIONS = ['sad', 'fearful', 'angry']
+POSITIVE_EMOTIONS = ['happy']
+
+FACIAL_DECAY_HALF_LIFE_S = float(os.environ.get('FACIAL_DECAY_HALF_LIFE_S', '30'))
+FACIAL_SESSION_TTL_S = float(os.environ.get('FACIAL_SESSION_TTL_S', '1800'))
+FACIAL_MAX_SESSIONS = int(os.environ.get('FACIAL_MAX_SESSIONS', '10000'))
+MAX_SESSION_ID_LENGTH = 128
+
+_EMOTION_INDEX = {emotion: i for i, emotion in enumerate(EMOTIONS)}
+
+
+class _SessionState:
+    """Constant-size rolling aggregate of one session's frames"""
+
+    __slots__ = ('weights', 'total', 'switches', 'transitions', 'frames',
+                 'last_emotion', 'last_time', 'clock_offset', 'updated_at')
+
+    def __init__(self):
+        self.weights = [0.0] * len(EMOTIONS)
+        self.total = 0.0
+        self.switches = 0.0
+        self.transitions = 0.0
+        self.frames = 0
+        self.last_emotion = None
+        self.last_time = None
+        # Server time minus client time, fixed at the first timestamped frame
+        self.clock_offset = None
+        self.updated_at = time.time()
+
+    def frame_time(self, client_time, received_at):
+        """
+        Place a frame on the session clock (server time)
+
+        Client timestamps keep their spacing but are anchored to the server
+        receive time of the session's first timestamped frame, so they can be
+        mixed with untimestamped frames, which use the receive time.
+        """
+        if client_time is None:
+            return received_at
+        if self.clock_offset is None:
+            self.clock_offset = received_at - client_time
+        return client_time + self.clock_offset
+
+    def add(self, index, confidence, timestamp, half_life):
+        """Decay the aggregate to the frame's time and add the frame"""
+        if self.last_time is not None and timestamp < self.last_time:
+            # Late frame: weigh it by its age instead of rewinding the aggregate;
+            # it is not adjacent to the newest frame, so it is no transition
+            weight = confidence * 0.5 ** ((self.last_time - timestamp) / half_life)
+            self.weights[index] += weight
+            self.total += weight
+            self.frames += 1
+            return
+
+        if self.last_time is not None:
+            factor = 0.5 ** ((timestamp - self.last_time) / half_life)
+            weights = self.weights
+            for i in range(len(weights)):
+                weights[i] *= factor
+            self.total *= factor
+            self.switches *= factor
+            self.transitions *= factor
+
+        self.weights[index] += confidence
+        self.total += confidence
+        if self.last_emotion is not None:
+            self.transitions += 1.0
+            if index != self.last_emotion:
+                self.switches += 1.0
+
+        self.frames += 1
+        self.last_emotion = index
+        self.last_time = timestamp
+
+
+class FacialEmotionAggregator:
+    """
+    Rolling per-session aggregates of streamed facial emotion frames.
+    """
+
+    def __init__(self, half_life_s=FACIAL_DECAY_HALF_LIFE_S, session_ttl_s=FACIAL_SESSION_TTL_S,
+                 max_sessions=FACIAL_MAX_SESSIONS):
+        """
+        Initialize the aggregator
+
+        Args:
+            half_life_s: seconds after which a frame counts half as much
+            session_ttl_s: idle seconds after which a session is forgotten
+            max_sessions: maximum number of sessions kept (least recently used are dropped)
+        """
+        if half_life_s <= 0:
+            raise ValueError("half_life_s must be positive")
+        self.half_life_s = half_life_s
+        self.session_ttl_s = session_ttl_s
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _parse_frame(frame):
+        """
+        Normalize a frame given as a dict or an [emotion, confidence, timestamp_ms] list
+
+        Returns:
+            tuple: (emotion index, confidence, timestamp in seconds or None), or None if invalid
+        """
+        if isinstance(frame, dict):
+            emotion = frame.get('emotion')
+            confidence = frame.get('confidence', 1.0)
+            timestamp = frame.get('timestamp')
+        elif isinstance(frame, (list, tuple)) and 1 <= len(frame) <= 3:
+            emotion = frame[0]
+            confidence = frame[1] if len(frame) > 1 else 1.0
+            timestamp = frame[2] if len(frame) > 2 else None
+        else:
+            return None
+
+        index = _EMOTION_INDEX.get(emotion)
+        if index is None:
+            return None
+        try:
+            confidence = min(1.0, max(0.0, float(confidence)))
+            timestamp = float(timestamp) / 1000.0 if timestamp is not None else None
+        except (TypeError, ValueError):
+            return None
+        return index, confidence, timestamp
+
+    def _expire(self, now):
+        """Drop idle sessions from the least recently used end"""
+        while self._sessions:
+            session_id, state = next(iter(self._sessions.items()))
+            if now - state.updated_at <= self.session_ttl_s:
+                break
+            del self._sessions[session_id]
+
+    def add_frames(self, session_id, frames):
+        """
+        Add a batch of frames to a session
+
+        Args:
+            session_id: client-chosen session identifier
+            frames: list of {'emotion', 'confidence', 'timestamp' (ms)} dicts or
+                [emotion, confidence, timestamp_ms] lists
+
+        Returns:
+            dict with the session summary and the number of rejected frames
+        """
+        if not isinstance(session_id, str) or not session_id or len(session_id) > MAX_SESSION_ID_LENGTH:
+            raise ValueError(f"session_id must be a non-empty string of at most {MAX_SESSION_ID_LENGTH} characters")
+        if not isinstance(frames, list):
+            raise ValueError("frames must be a list")
+
+        now = time.time()
+        parsed = [self._parse_frame(frame) for frame in frames]
+        accepted = [frame for frame in parsed if frame is not None]
+
+        with self._lock:
+            self._expire(now)
+            state = self._sessions.get(session_id)
+            if state is None:
+                state = _SessionState()
+                self._sessions[session_id] = state
+                if len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+
+            for index, confidence, timestamp in accepted:
+                state.add(index, confidence, state.frame_time(timestamp, now), self.half_life_s)
+            state.updated_at = now
+            summary = self._summarize(session_id, state)
+
+        summary['accepted'] = len(accepted)
+        summary['rejected'] = len(frames) - len(accepted)
+        return summary
+
+    def get_summary(self, session_id):
+        """
+        Get the current aggregate of a session
+
+        Returns:
+            dict with distribution, dominant emotion and volatility, or None if unknown
+        """
+        with self._lock:
+            self._expire(time.time())
+            state = self._sessions.get(session_id)
+            if state is None:
+                return None
+            return self._summarize(session_id, state)
+
+    def clear_session(self, session_id):
+        """Forget a session; returns True if it existed"""
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def _summarize(self, session_id, state):
+        """Build the JSON-serializable summary of a session state"""
+        if state.total > 0:
+            distribution = {emotion: round(state.weights[i] / state.total, 4)
+                            for i, emotion in enumerate(EMOTIONS)}
+            dominant = max(distribution, key=distribution.get)
+        else:
+            distribution = {emotion: 0.0 for emotion in EMOTIONS}
+            dominant = None
+
+        return {
+            'session_id': session_id,
+            'frames': state.frames,
+            'distribution': distribution,
+            'dominant_emotion': dominant,
+            'dominant_share': distribution[dominant] if dominant else 0.0,
+            # Share of recent consecutive frames whose label changed
+            'volatility': round(state.switches / state.transitions, 4) if state.transitions else 0.0,
+            'last_emotion': EMOTIONS[state.last_emotion] if state.last_emotion is not None else None,
+            'updated_at': state.updated_at
+        }
+
+    def get_stats(self):
+        """Get the number of tracked sessions"""
+        with self._lock:
+            return {'sessions': len(self._sessions), 'max_sessions': self.max_sessions}
+
+
+# Global aggregator instance
+_aggregator_instance = None
+
+
+def get_facial_aggregator():
+    """Get or create the global facial emotion aggregator"""
+    global _aggregator_instance
+    if _aggregator_instance is None:
+        _aggregator_instance = FacialEmotionAggregator()
+    return _aggregator_instance
@@ -0,0 +1,186 @@
+"""
+Featurized Dataset Cache Module
+
+This module caches fitted TF-IDF vectorizers and their sparse feature matrices
+on disk so repeated training runs skip tokenization:
+- Entries are content-addressed by a hash of the texts and the vectorizer config
+- The CSR matrix is stored as .npy arrays and loaded memory-mapped
+- Changing the data or the config changes the key, so stale entries are never used
+- Least recently used entries are evicted beyond a maximum count
+"""
+import copy
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+import joblib
+import sklearn
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+FEATURE_CACHE_DIR = os.environ.get(
+    'FEATURE_CACHE_DIR',
+    os.path.join(os.environ.get('MODEL_DIR', 'models'), 'feature_cache')
+)
+FEATURE_CACHE_MAX_ENTRIES = int(os.environ.get('FEATURE_CACHE_MAX_ENTRIES', '8'))
+
+
+def dataset_hash(texts):
+    """Hash a list of texts (order-sensitive, length-prefixed to avoid ambiguity)"""
+    digest = hashlib.sha256()
+    for text in texts:
+        data = text.encode('utf-8')
+        digest.update(len(data).to_bytes(8, 'little'))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def cache_key(texts, params):
+    """Build the cache key from the dataset hash, vectorizer config and library version"""
+    config = json.dumps(params, sort_keys=True, default=str)
+    digest = hashlib.sha256()
+    digest.update(dataset_hash(texts).encode('ascii'))
+    digest.update(config.encode('utf-8'))
+    digest.update(sklearn.__version__.encode('ascii'))
+    return digest.hexdigest()[:32]
+
+
+class FeatureCache:
+    """
+    Content-addressed on-disk cache of fitted vectorizers and CSR matrices.
+    """
+
+    def __init__(self, cache_dir=FEATURE_CACHE_DIR, max_entries=FEATURE_CACHE_MAX_ENTRIES):
+        """
+        Initialize the cache
+
+        Args:
+            cache_dir: directory holding one subdirectory per entry
+            max_entries: maximum number of entries kept on disk
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, key):
+        """
+        Load a cached entry
+
+        Returns:
+            tuple: (vectorizer, X) with X memory-mapped, or None if not cached
+        """
+        entry = self._entry_dir(key)
+        meta_path = os.path.join(entry, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            vectorizer = joblib.load(os.path.join(entry, 'vectorizer.joblib'))
+            data = np.load(os.path.join(entry, 'data.npy'), mmap_mode='r')
+            indices = np.load(os.path.join(entry, 'indices.npy'), mmap_mode='r')
+            indptr = np.load(os.path.join(entry, 'indptr.npy'), mmap_mode='r')
+            X = sparse.csr_matrix((data, indices, indptr), shape=tuple(meta['shape']), copy=False)
+        except Exception as e:
+            print(f"Ignoring unreadable feature cache entry {key}: {e}")
+            return None
+
+        # Touch the entry so eviction keeps recently used data
+        os.utime(meta_path, None)
+        return vectorizer, X
+
+    def save(self, key, vectorizer, X):
+        """Write an entry atomically (to a temporary directory, then rename)"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        X = sparse.csr_matrix(X)
+        tmp_dir = tempfile.mkdtemp(prefix=f'.{key}-', dir=self.cache_dir)
+        try:
+            # stop_words_ is only needed for introspection and can be large;
+            # strip it from a shallow copy so the caller's vectorizer is untouched
+            if getattr(vectorizer, 'stop_words_', None) is not None:
+                vectorizer = copy.copy(vectorizer)
+                vectorizer.stop_words_ = None
+            joblib.dump(vectorizer, os.path.join(tmp_dir, 'vectorizer.joblib'))
+            np.save(os.path.join(tmp_dir, 'data.npy'), X.data)
+            np.save(os.path.join(tmp_dir, 'indices.npy'), X.indices)
+            np.save(os.path.join(tmp_dir, 'indptr.npy'), X.indptr)
+            with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump({'shape': list(X.shape), 'nnz': int(X.nnz)}, f)
+            try:
+                os.replace(tmp_dir, self._entry_dir(key))
+            except OSError:
+                # Another process stored the same entry first
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        self._evict()
+
+    def _evict(self):
+        """Remove least recently used entries beyond max_entries"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            meta_path = os.path.join(self.cache_dir, name, 'meta.json')
+            if not name.startswith('.') and os.path.exists(meta_path):
+                entries.append((os.path.getmtime(meta_path), name))
+        entries.sort(reverse=True)
+        for _, name in entries[self.max_entries:]:
+            shutil.rmtree(self._entry_dir(name), ignore_errors=True)
+
+    def get_or_fit(self, texts, params):
+        """
+        Return a fitted vectorizer and feature matrix for texts, from cache when possible
+
+        Args:
+            texts: list of text samples
+            params: TfidfVectorizer keyword arguments
+
+        Returns:
+            tuple: (vectorizer, X, hit) where hit is True if served from cache
+        """
+        key = cache_key(texts, params)
+        cached = self.load(key)
+        if cached is not None:
+            with self._lock:
+                self.hits += 1
+            return cached[0], cached[1], True
+
+        vectorizer = TfidfVectorizer(**params)
+        X = vectorizer.fit_transform(texts)
+        try:
+            self.save(key, vectorizer, X)
+        except Exception as e:
+            print(f"Could not write feature cache entry: {e}")
+        with self._lock:
+            self.misses += 1
+        return vectorizer, X, False
+
+    def clear(self):
+        """Remove every cached entry"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def get_stats(self):
+        """Get cache hit/miss counters"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'cache_dir': self.cache_dir}
+
+
+# Global cache instance
+_cache_instance = None
+
+
+def get_feature_cache():
+    """Get or create the global feature cache"""
+    global _cache_instance
+    if _cache_instance is None:
+        _cache_instance = FeatureCache()
+    return _cache_instance
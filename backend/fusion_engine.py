@@ -0,0 +1,251 @@
+"""
+Multimodal Fusion Engine Module
+
+This module fuses questionnaire, text and facial results into an overall risk
+level and confidence:
+- Each modality is reduced to one risk score (0 = low .. 2 = high, NaN if absent)
+- Scores are combined with configurable per-modality weights
+- Risk thresholds and the sources needed for each confidence level are configurable
+- Many assessments are scored in one vectorized NumPy call, so stored combined
+  assessments can be re-evaluated when the fusion rules change
+
+With the default configuration the results match the original unweighted average.
+"""
+import os
+
+import numpy as np
+
+MODALITIES = ['questionnaire', 'text', 'facial']
+# Combined-analysis result keys that feed a modality score
+FUSED_RESULT_KEYS = ('questionnaire', 'text_analysis', 'facial_summary', 'facial_emotion')
+RISK_LEVELS = ['low', 'moderate', 'high']
+CONFIDENCE_LEVELS = ['low', 'medium', 'high']
+RISK_SCORES = {'low': 0, 'moderate': 1, 'high': 2}
+
+FACIAL_NEGATIVE_EMOTIONS = ['sad', 'fearful', 'angry']
+FACIAL_POSITIVE_EMOTIONS = ['happy']
+
+DEFAULT_WEIGHTS = {'questionnaire': 1.0, 'text': 1.0, 'facial': 1.0}
+# Minimum fused score for each risk level above 'low'
+DEFAULT_RISK_THRESHOLDS = {'moderate': 0.8, 'high': 1.5}
+# Minimum number of contributing sources for each confidence level above 'low'
+DEFAULT_CONFIDENCE_SOURCES = {'medium': 2, 'high': 3}
+
+
+def _parse_weights(value):
+    """Parse 'questionnaire=2,text=1,facial=0.5' into a weights dict"""
+    weights = dict(DEFAULT_WEIGHTS)
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        name, _, weight = item.partition('=')
+        if name not in weights:
+            raise ValueError(f"Unknown fusion modality: {name}")
+        weights[name] = float(weight)
+    return weights
+
+
+def facial_risk_score(results):
+    """
+    Risk score of the facial modality of a results dict
+
+    An aggregated frame distribution ('facial_summary') scores the negative share
+    of negative + happy frames; a single 'facial_emotion' label scores 1 for
+    negative emotions and 0 for happy. Other expressions carry no signal (None).
+    """
+    facial = results.get('facial_summary')
+    if facial:
+        distribution = facial.get('distribution', {})
+        negative = sum(distribution.get(e, 0.0) for e in FACIAL_NEGATIVE_EMOTIONS)
+        positive = sum(distribution.get(e, 0.0) for e in FACIAL_POSITIVE_EMOTIONS)
+        if negative + positive > 0:
+            return negative / (negative + positive)
+        return None
+
+    emotion = results.get('facial_emotion')
+    if emotion in FACIAL_NEGATIVE_EMOTIONS:
+        return 1.0
+    if emotion in FACIAL_POSITIVE_EMOTIONS:
+        return 0.0
+    return None
+
+
+def extract_features(results):
+    """
+    Reduce a combined-analysis results dict to one risk score per modality
+
+    Args:
+        results: dict with 'questionnaire', 'text_analysis', 'facial_summary'
+            and/or 'facial_emotion' keys
+
+    Returns:
+        list of floats in MODALITIES order (NaN for absent modalities)
+    """
+    features = [np.nan, np.nan, np.nan]
+    questionnaire = results.get('questionnaire')
+    if questionnaire and 'risk_level' in questionnaire:
+        features[0] = RISK_SCORES.get(questionnaire['risk_level'], 0)
+    text_analysis = results.get('text_analysis')
+    if text_analysis and 'risk_level' in text_analysis:
+        features[1] = RISK_SCORES.get(text_analysis['risk_level'], 0)
+    facial = facial_risk_score(results)
+    if facial is not None:
+        features[2] = facial
+    return features
+
+
+class FusionEngine:
+    """
+    Weighted, rule-configurable fusion of modality risk scores.
+    """
+
+    def __init__(self, weights=None, risk_thresholds=None, confidence_sources=None):
+        """
+        Initialize the engine
+
+        Args:
+            weights: dict of modality -> weight (missing modalities use 1.0; 0 disables one)
+            risk_thresholds: dict with minimum fused scores for 'moderate' and 'high'
+            confidence_sources: dict with minimum contributing sources for 'medium' and 'high'
+        """
+        weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        unknown = set(weights) - set(MODALITIES)
+        if unknown:
+            raise ValueError(f"Unknown fusion modalities: {sorted(unknown)}")
+        if any(w < 0 for w in weights.values()):
+            raise ValueError("Fusion weights must be non-negative")
+
+        self.weights = weights
+        self.risk_thresholds = {**DEFAULT_RISK_THRESHOLDS, **(risk_thresholds or {})}
+        self.confidence_sources = {**DEFAULT_CONFIDENCE_SOURCES, **(confidence_sources or {})}
+        self._weights_list = [float(weights[m]) for m in MODALITIES]
+        self._weight_vector = np.array(self._weights_list)
+
+    def get_config(self):
+        """Get the weights and rules in use"""
+        return {
+            'weights': dict(self.weights),
+            'risk_thresholds': dict(self.risk_thresholds),
+            'confidence_sources': dict(self.confidence_sources)
+        }
+
+    def features_matrix(self, results_list):
+        """Stack the modality scores of many results dicts into an (N, 3) matrix"""
+        if not results_list:
+            return np.empty((0, len(MODALITIES)))
+        return np.array([extract_features(results) for results in results_list], dtype=float)
+
+    def score_batch(self, features, missing_counts=None):
+        """
+        Fuse many assessments at once
+
+        Args:
+            features: (N, 3) array of modality risk scores in MODALITIES order (NaN = absent)
+            missing_counts: optional length-N array of requested sources that did not
+                arrive; any missing source lowers confidence one step
+
+        Returns:
+            dict of length-N arrays: 'score' (NaN without sources), 'sources',
+            'overall_risk' and 'confidence'
+        """
+        features = np.asarray(features, dtype=float)
+        if features.ndim != 2 or features.shape[1] != len(MODALITIES):
+            raise ValueError(f"features must have shape (N, {len(MODALITIES)})")
+
+        weights = np.where(np.isnan(features), 0.0, self._weight_vector)
+        weight_sum = weights.sum(axis=1)
+        sources = (weights > 0).sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            score = np.where(weight_sum > 0,
+                             (np.nan_to_num(features) * weights).sum(axis=1) / weight_sum,
+                             np.nan)
+
+        risk = np.zeros(len(features), dtype=np.int8)
+        risk[score >= self.risk_thresholds['moderate']] = 1
+        risk[score >= self.risk_thresholds['high']] = 2
+
+        confidence = np.zeros(len(features), dtype=np.int8)
+        confidence[sources >= self.confidence_sources['medium']] = 1
+        confidence[sources >= self.confidence_sources['high']] = 2
+        # Without any source the assessment keeps its neutral default
+        confidence[sources == 0] = 1
+        if missing_counts is not None:
+            confidence = np.maximum(0, confidence - (np.asarray(missing_counts) > 0))
+
+        return {
+            'score': score,
+            'sources': sources,
+            'overall_risk': np.array(RISK_LEVELS)[risk],
+            'confidence': np.array(CONFIDENCE_LEVELS)[confidence]
+        }
+
+    def score(self, features, missing_count=0):
+        """
+        Fuse one assessment (plain Python; NumPy call overhead dominates for a single row)
+
+        Returns:
+            dict with 'score' (None without sources), 'sources', 'overall_risk' and 'confidence'
+        """
+        weighted = 0.0
+        weight_sum = 0.0
+        sources = 0
+        for value, weight in zip(features, self._weights_list):
+            if value != value or not weight:  # NaN or disabled modality
+                continue
+            weighted += value * weight
+            weight_sum += weight
+            sources += 1
+
+        score = weighted / weight_sum if weight_sum else None
+        risk = 0
+        if score is not None:
+            if score >= self.risk_thresholds['high']:
+                risk = 2
+            elif score >= self.risk_thresholds['moderate']:
+                risk = 1
+
+        if not sources:
+            confidence = 1
+        elif sources >= self.confidence_sources['high']:
+            confidence = 2
+        elif sources >= self.confidence_sources['medium']:
+            confidence = 1
+        else:
+            confidence = 0
+        if missing_count:
+            confidence = max(0, confidence - 1)
+
+        return {
+            'score': round(score, 4) if score is not None else None,
+            'sources': sources,
+            'overall_risk': RISK_LEVELS[risk],
+            'confidence': CONFIDENCE_LEVELS[confidence]
+        }
+
+    def rescore(self, results_list, missing_counts=None):
+        """
+        Re-evaluate stored combined-analysis results with the current rules
+
+        Returns:
+            list of dicts with 'score', 'overall_risk' and 'confidence' per result
+        """
+        fused = self.score_batch(self.features_matrix(results_list), missing_counts)
+        scores = np.round(fused['score'], 4)
+        return [
+            {
+                'score': None if np.isnan(score) else float(score),
+                'overall_risk': str(risk),
+                'confidence': str(confidence)
+            }
+            for score, risk, confidence in zip(scores, fused['overall_risk'], fused['confidence'])
+        ]
+
+
+# Global engine instance
+_engine_instance = None
+
+
+def get_fusion_engine():
+    """Get or create the global fusion engine (weights from FUSION_WEIGHTS)"""
+    global _engine_instance
+    if _engine_instance is None:
+        _engine_instance = FusionEngine(weights=_parse_weights(os.environ.get('FUSION_WEIGHTS', '')))
+    return _engine_instance
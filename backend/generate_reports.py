@@ -0,0 +1,130 @@
+"""
+Bulk Report Generator
+
+Writes the report of every user (or every recently active user) as JSON
+Lines, e.g. for the weekly clinician digest. User ids are read in keyset
+batches and each batch is built by a pool of worker processes; finished
+batches are written in user id order. At most a few batches per worker are
+in flight at a time, so memory stays bounded however many users there are.
+Output ending in .gz is gzipped.
+
+Usage:
+    python generate_reports.py --output reports.jsonl [--workers 4] [--batch-size 200]
+    python generate_reports.py --output digest.jsonl.gz --active-days 7
+"""
+import os
+
+# Each report reads every row once; the read cache would only add overhead
+os.environ.setdefault('READ_CACHE_MAX_ENTRIES', '0')
+
+import argparse
+import gzip
+import json
+import sys
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from itertools import islice
+from multiprocessing import Pool
+
+from database import iter_user_ids
+from reports import build_user_report
+
+# Batches queued or built per worker before the writer catches up
+IN_FLIGHT_PER_WORKER = 2
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Generate user reports as JSON Lines')
+    parser.add_argument('--output', required=True, help="Output file (.jsonl or .jsonl.gz), or '-' for stdout")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Worker processes (1 builds reports in this process)')
+    parser.add_argument('--batch-size', type=int, default=200, help='Users per worker task')
+    parser.add_argument('--active-days', type=float,
+                        help='Only users active in the last N days')
+    return parser.parse_args()
+
+
+def build_batch(user_ids):
+    """Build the reports of a batch of users as one block of JSON lines"""
+    lines = []
+    for user_id in user_ids:
+        report = build_user_report(user_id)
+        if report is not None:
+            lines.append(json.dumps(report, default=str))
+    return len(lines), ''.join(line + '\n' for line in lines)
+
+
+def batches(iterable, size):
+    """Split an iterable into lists of at most size items"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def ordered_results(pool, tasks, window):
+    """
+    Build batches on a pool, yielding results in task order
+
+    Unlike Pool.imap, which consumes the whole task iterator up front, at
+    most `window` batches are submitted and not yet written at any time.
+    """
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.apply_async(build_batch, (task,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def open_output(path):
+    """Open the output stream (gzip for .gz paths)"""
+    if path == '-':
+        return sys.stdout
+    if path.endswith('.gz'):
+        return gzip.open(path, 'wt', encoding='utf-8')
+    return open(path, 'w', encoding='utf-8')
+
+
+def main():
+    args = parse_args()
+    if args.workers < 1 or args.batch_size < 1:
+        raise SystemExit('--workers and --batch-size must be at least 1')
+
+    active_since = None
+    if args.active_days is not None:
+        # last_active is stored in local time
+        active_since = (datetime.now() - timedelta(days=args.active_days)).strftime('%Y-%m-%d %H:%M:%S')
+
+    started = time.perf_counter()
+    written = 0
+    tasks = batches(iter_user_ids(batch_size=args.batch_size, active_since=active_since), args.batch_size)
+    output = open_output(args.output)
+    pool = Pool(args.workers) if args.workers > 1 else None
+    try:
+        # Workers run up to IN_FLIGHT_PER_WORKER batches ahead of the writer
+        results = ordered_results(pool, tasks, args.workers * IN_FLIGHT_PER_WORKER) if pool \
+            else map(build_batch, tasks)
+        for count, block in results:
+            output.write(block)
+            written += count
+            if args.output != '-':
+                print(f"\rReports written: {written}", end='', file=sys.stderr, flush=True)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+        if output is not sys.stdout:
+            output.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"\n{written} reports written to {args.output} in {elapsed:.1f}s "
+          f"({written / elapsed if elapsed else 0:,.0f}/s, {args.workers} workers)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
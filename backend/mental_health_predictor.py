@@ -4,7 +4,26 @@ Mental Health Predictor Module
 This module implements machine learning models for predicting mental health risk
 based on questionnaire responses and other behavioral data.
 """
+import csv
+import hashlib
+import io
+import itertools
 import json
+from types import MappingProxyType
+import numpy as np
+import pandas as pd
+
+from fusion_engine import FACIAL_NEGATIVE_EMOTIONS, extract_features, get_fusion_engine
+
+PHQ9_ITEMS = 9
+GAD7_ITEMS = 7
+MAX_ITEM_SCORE = 3
+RISK_LEVELS = ['low', 'moderate', 'high']
+
+# Share of recent frames an emotion needs before it is reported
+FACIAL_CONCERN_SHARE = 0.25
+# Share of frames switching label above which expressions count as unstable
+FACIAL_VOLATILITY_CONCERN = 0.5
 
 
 class MentalHealthPredictor:
@@ -13,8 +32,15 @@ class MentalHealthPredictor:
     and machine learning-based risk assessment.
     """
     
-    def __init__(self):
-        """Initialize the predictor with scoring thresholds"""
+    def __init__(self, fusion_engine=None):
+        """
+        Initialize the predictor with scoring thresholds
+
+        Args:
+            fusion_engine: FusionEngine for combined assessments (global engine if None)
+        """
+        self.fusion_engine = fusion_engine or get_fusion_engine()
+
         # PHQ-9 Depression Severity Thresholds
         self.phq9_thresholds = {
             'minimal': (0, 4),
@@ -40,6 +66,15 @@ class MentalHealthPredictor:
             'moderately_severe': 'high',
             'severe': 'high'
         }
+        
+        # Threshold lower edges for vectorized severity lookup (searchsorted)
+        self._phq9_levels = list(self.phq9_thresholds)
+        self._phq9_edges = np.array([low for low, _ in self.phq9_thresholds.values()])
+        self._gad7_levels = list(self.gad7_thresholds)
+        self._gad7_edges = np.array([low for low, _ in self.gad7_thresholds.values()])
+
+        # Recommendation content never changes at runtime, so it is built once
+        self._recommendation_tables = self._compile_recommendations()
     
     def calculate_phq9_score(self, responses):
         """
@@ -146,6 +181,206 @@ class MentalHealthPredictor:
         
         return result
     
+    def _check_matrix_shape(self, matrix, n_items, name):
+        """
+        Check that a response matrix is a list of N rows of n_items answers
+        (or a 2D NumPy array), raising ValueError otherwise
+        """
+        if isinstance(matrix, np.ndarray):
+            well_formed = matrix.ndim == 2 and matrix.shape[1] == n_items
+        else:
+            well_formed = isinstance(matrix, (list, tuple)) and all(
+                isinstance(row, (list, tuple)) and len(row) == n_items for row in matrix
+            )
+        if not well_formed:
+            raise ValueError(f"{name} responses must be an N x {n_items} matrix")
+    
+    def _validate_matrix(self, matrix, n_items, name):
+        """
+        Validate an N x n_items response matrix in bulk
+        
+        A numeric NumPy array is checked as is. Any other matrix (e.g. parsed
+        JSON) must hold real integers: numeric strings, booleans and floats
+        make their row invalid. The shape is checked by _check_matrix_shape.
+        
+        Returns:
+            tuple: (float matrix, boolean mask of valid rows)
+        """
+        if isinstance(matrix, np.ndarray) and matrix.dtype.kind in 'iuf':
+            values = matrix.astype(float)
+        else:
+            values = np.array(
+                [[value if type(value) is int else np.nan for value in row] for row in matrix],
+                dtype=float
+            ).reshape(len(matrix), n_items)
+        valid = (
+            np.isfinite(values).all(axis=1) &
+            (values == np.round(values)).all(axis=1) &
+            ((values >= 0) & (values <= MAX_ITEM_SCORE)).all(axis=1)
+        )
+        return values, valid
+    
+    def score_questionnaires_batch(self, phq9=None, gad7=None):
+        """
+        Score many questionnaire submissions at once
+        
+        Args:
+            phq9: N x 9 matrix of PHQ-9 responses (optional)
+            gad7: N x 7 matrix of GAD-7 responses (optional)
+        
+        Returns:
+            list of N result dicts in the predict_from_questionnaire format;
+            rows with out-of-range or missing answers get an 'error' key
+        """
+        if phq9 is None and gad7 is None:
+            raise ValueError("Provide phq9 and/or gad7 responses")
+        # Reject numbers, objects and ragged rows before anything takes len() of them
+        if phq9 is not None:
+            self._check_matrix_shape(phq9, PHQ9_ITEMS, 'PHQ-9')
+        if gad7 is not None:
+            self._check_matrix_shape(gad7, GAD7_ITEMS, 'GAD-7')
+        
+        n = len(phq9) if phq9 is not None else len(gad7)
+        if phq9 is not None and gad7 is not None and len(gad7) != n:
+            raise ValueError("phq9 and gad7 must have the same number of rows")
+        if n == 0:
+            return []
+        
+        valid = np.ones(n, dtype=bool)
+        risk = np.zeros(n, dtype=int)
+        outputs = {}
+        
+        for name, matrix, n_items, edges, levels, condition in (
+            ('PHQ-9', phq9, PHQ9_ITEMS, self._phq9_edges, self._phq9_levels, 'depression'),
+            ('GAD-7', gad7, GAD7_ITEMS, self._gad7_edges, self._gad7_levels, 'anxiety')
+        ):
+            if matrix is None:
+                continue
+            values, row_valid = self._validate_matrix(matrix, n_items, name)
+            valid &= row_valid
+            
+            totals = np.where(row_valid, np.nan_to_num(values).sum(axis=1), 0).astype(int)
+            severity_idx = np.searchsorted(edges, totals, side='right') - 1
+            risk_codes = np.array([RISK_LEVELS.index(self.risk_mapping[level]) for level in levels])
+            risk = np.maximum(risk, risk_codes[severity_idx])
+            # Moderate severity and above counts as a detected condition
+            detected = severity_idx >= levels.index('moderate')
+            outputs[condition] = (totals, severity_idx, levels, detected)
+        
+        priorities_cache = {}
+        results = []
+        for i in range(n):
+            if not valid[i]:
+                results.append({'error': f'Responses must be integers from 0 to {MAX_ITEM_SCORE}'})
+                continue
+            
+            result = {
+                'scores': {},
+                'severity': {},
+                'risk_level': RISK_LEVELS[risk[i]],
+                'conditions_detected': []
+            }
+            for condition, (totals, severity_idx, levels, detected) in outputs.items():
+                result['scores'][condition] = int(totals[i])
+                result['severity'][condition] = levels[severity_idx[i]]
+                if detected[i]:
+                    result['conditions_detected'].append(condition)
+            
+            key = (result['risk_level'], tuple(result['conditions_detected']))
+            if key not in priorities_cache:
+                priorities_cache[key] = self._get_priority_recommendations(result)
+            result['recommendations_priority'] = list(priorities_cache[key])
+            results.append(result)
+        
+        return results
+    
+    def iter_questionnaire_csv(self, stream, chunk_size=1000):
+        """
+        Score questionnaires from a CSV stream as CSV result lines
+        
+        Input columns: phq9_1..phq9_9 and/or gad7_1..gad7_7, plus an optional 'id'.
+        The header and first chunk are read and checked before this returns,
+        so a malformed upload fails before any output is produced.
+        
+        Args:
+            stream: text file-like object with CSV content
+            chunk_size: rows scored per vectorized batch
+        
+        Returns:
+            iterator of CSV lines (header first)
+        
+        Raises:
+            ValueError: if the CSV is empty or lacks the questionnaire columns
+        """
+        phq9_columns = [f'phq9_{i}' for i in range(1, PHQ9_ITEMS + 1)]
+        gad7_columns = [f'gad7_{i}' for i in range(1, GAD7_ITEMS + 1)]
+        
+        try:
+            reader = pd.read_csv(stream, chunksize=chunk_size)
+            first = next(reader)
+        except StopIteration:
+            raise ValueError("CSV has no rows")
+        except pd.errors.EmptyDataError:
+            raise ValueError("CSV is empty")
+        has_phq9 = all(column in first.columns for column in phq9_columns)
+        has_gad7 = all(column in first.columns for column in gad7_columns)
+        if not has_phq9 and not has_gad7:
+            raise ValueError("CSV must have phq9_1..phq9_9 and/or gad7_1..gad7_7 columns")
+        
+        return self._iter_questionnaire_lines(
+            itertools.chain([first], reader),
+            phq9_columns if has_phq9 else None,
+            gad7_columns if has_gad7 else None
+        )
+    
+    def _iter_questionnaire_lines(self, chunks, phq9_columns, gad7_columns):
+        """Yield the CSV result lines for validated questionnaire chunks"""
+        header = ['id', 'depression_score', 'depression_severity', 'anxiety_score',
+                  'anxiety_severity', 'risk_level', 'conditions', 'error']
+        
+        def to_line(row):
+            buffer = io.StringIO()
+            csv.writer(buffer).writerow(row)
+            return buffer.getvalue()
+        
+        yield to_line(header)
+        
+        row_number = 0
+        while True:
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                return
+            except ValueError as e:
+                # The response is already streaming: report the bad input in-band
+                yield to_line(['', '', '', '', '', '', '', f'Malformed CSV after row {row_number}: {e}'])
+                return
+            
+            ids = chunk['id'].tolist() if 'id' in chunk.columns else \
+                list(range(row_number + 1, row_number + len(chunk) + 1))
+            row_number += len(chunk)
+            
+            results = self.score_questionnaires_batch(
+                phq9=chunk[phq9_columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+                if phq9_columns else None,
+                gad7=chunk[gad7_columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+                if gad7_columns else None
+            )
+            for row_id, result in zip(ids, results):
+                if 'error' in result:
+                    yield to_line([row_id, '', '', '', '', '', '', result['error']])
+                    continue
+                yield to_line([
+                    row_id,
+                    result['scores'].get('depression', ''),
+                    result['severity'].get('depression', ''),
+                    result['scores'].get('anxiety', ''),
+                    result['severity'].get('anxiety', ''),
+                    result['risk_level'],
+                    ';'.join(result['conditions_detected']),
+                    ''
+                ])
+    
     def _compare_risk(self, risk1, risk2):
         """Compare two risk levels"""
         risk_order = {'low': 0, 'moderate': 1, 'high': 2}
@@ -173,12 +408,16 @@ class MentalHealthPredictor:
         
         return priorities
     
-    def generate_combined_assessment(self, results):
+    def generate_combined_assessment(self, results, missing_sources=None):
         """
         Generate a combined assessment from multiple analysis sources
         
         Args:
             results: dict with 'questionnaire', 'text_analysis', and/or 'facial_emotion' keys
+                ('facial_summary', an aggregated frame distribution, takes precedence
+                over 'facial_emotion')
+            missing_sources: analyzers that were requested but did not finish in time;
+                confidence is lowered one step and the sources are listed
         
         Returns:
             dict with overall assessment
@@ -191,21 +430,15 @@ class MentalHealthPredictor:
             'summary': ''
         }
         
-        risk_scores = []
-        
         # Process questionnaire results
         if 'questionnaire' in results:
             q = results['questionnaire']
-            if 'risk_level' in q:
-                risk_scores.append(self._risk_to_score(q['risk_level']))
             if 'conditions_detected' in q:
                 assessment['concerns'].extend(q['conditions_detected'])
         
         # Process text analysis
         if 'text_analysis' in results:
             ta = results['text_analysis']
-            if 'risk_level' in ta:
-                risk_scores.append(self._risk_to_score(ta['risk_level']))
             if 'sentiment' in ta:
                 sent = ta['sentiment']
                 if sent.get('polarity', 0) > 0.2:
@@ -213,43 +446,42 @@ class MentalHealthPredictor:
                 elif sent.get('polarity', 0) < -0.2:
                     assessment['concerns'].append('negative_language')
         
+        # Process aggregated facial emotion frames (preferred over a single label)
+        if results.get('facial_summary'):
+            facial = results['facial_summary']
+            distribution = facial.get('distribution', {})
+            positive = distribution.get('happy', 0.0)
+            for emotion in FACIAL_NEGATIVE_EMOTIONS:
+                if distribution.get(emotion, 0.0) >= FACIAL_CONCERN_SHARE:
+                    assessment['concerns'].append(f'{emotion}_facial_expression')
+            if positive >= FACIAL_CONCERN_SHARE:
+                assessment['positive_indicators'].append('positive_facial_expression')
+            if facial.get('volatility', 0.0) >= FACIAL_VOLATILITY_CONCERN:
+                assessment['concerns'].append('unstable_facial_expression')
+        
         # Process facial emotion
-        if 'facial_emotion' in results:
+        elif 'facial_emotion' in results:
             emotion = results['facial_emotion']
-            if emotion in ['sad', 'fearful', 'angry']:
-                risk_scores.append(1)  # moderate indicator
+            if emotion in FACIAL_NEGATIVE_EMOTIONS:
                 assessment['concerns'].append(f'{emotion}_facial_expression')
             elif emotion in ['happy']:
-                risk_scores.append(0)
                 assessment['positive_indicators'].append('positive_facial_expression')
         
-        # Calculate overall risk
-        if risk_scores:
-            avg_risk = sum(risk_scores) / len(risk_scores)
-            if avg_risk >= 1.5:
-                assessment['overall_risk'] = 'high'
-            elif avg_risk >= 0.8:
-                assessment['overall_risk'] = 'moderate'
-            else:
-                assessment['overall_risk'] = 'low'
-            
-            # Confidence based on number of data sources
-            if len(risk_scores) >= 3:
-                assessment['confidence'] = 'high'
-            elif len(risk_scores) >= 2:
-                assessment['confidence'] = 'medium'
-            else:
-                assessment['confidence'] = 'low'
+        # Overall risk and confidence from the weighted per-modality risk scores;
+        # a degraded result (missing sources) is reported as less certain
+        fused = self.fusion_engine.score(
+            extract_features(results), missing_count=len(missing_sources or [])
+        )
+        assessment['overall_risk'] = fused['overall_risk']
+        assessment['confidence'] = fused['confidence']
+        if missing_sources:
+            assessment['missing_sources'] = list(missing_sources)
         
         # Generate summary
         assessment['summary'] = self._generate_summary(assessment)
         
         return assessment
     
-    def _risk_to_score(self, risk_level):
-        """Convert risk level to numeric score"""
-        return {'low': 0, 'moderate': 1, 'high': 2}.get(risk_level, 0)
-    
     def _generate_summary(self, assessment):
         """Generate a human-readable summary of the assessment"""
         risk = assessment['overall_risk']
@@ -276,6 +508,41 @@ class MentalHealthPredictor:
         
         return summary
     
+    def _recommendation_key(self, data):
+        """
+        Canonical form of a recommendation request
+
+        The content only depends on whether the risk is high and on which of
+        depression/anxiety are present, so every request maps to one of eight keys.
+        """
+        risk_level = data.get('risk_level', 'low')
+        conditions = data.get('conditions') or []
+        return (risk_level == 'high', 'depression' in conditions, 'anxiety' in conditions)
+
+    def _compile_recommendations(self):
+        """Build every recommendation table once, as serialized bytes with a strong ETag"""
+        tables = {}
+        for key in itertools.product((False, True), repeat=3):
+            high, depression, anxiety = key
+            conditions = [name for name, present in (('depression', depression), ('anxiety', anxiety))
+                          if present]
+            content = self._build_recommendations('high' if high else 'low', conditions)
+            payload = json.dumps(content, sort_keys=True, separators=(',', ':')).encode('utf-8')
+            tables[key] = (payload, hashlib.sha256(payload).hexdigest()[:32])
+        return MappingProxyType(tables)
+
+    def get_recommendations_payload(self, data):
+        """
+        Get the precompiled recommendations for assessment data
+
+        Args:
+            data: dict with risk_level, conditions, and scores
+
+        Returns:
+            tuple: (JSON bytes, ETag) shared by every request with the same canonical key
+        """
+        return self._recommendation_tables[self._recommendation_key(data)]
+
     def get_recommendations(self, data):
         """
         Get detailed recommendations based on assessment data
@@ -284,8 +551,13 @@ class MentalHealthPredictor:
             data: dict with risk_level, conditions, and scores
         
         Returns:
-            dict with categorized recommendations
+            dict with categorized recommendations (a fresh copy the caller may modify)
         """
+        payload, _ = self.get_recommendations_payload(data)
+        return json.loads(payload)
+
+    def _build_recommendations(self, risk_level, conditions):
+        """Assemble the recommendation content for a risk level and list of conditions"""
         recommendations = {
             'immediate_actions': [],
             'self_care': [],
@@ -294,9 +566,6 @@ class MentalHealthPredictor:
             'lifestyle_changes': []
         }
         
-        risk_level = data.get('risk_level', 'low')
-        conditions = data.get('conditions', [])
-        
         # High risk recommendations
         if risk_level == 'high':
             recommendations['immediate_actions'] = [
@@ -0,0 +1,152 @@
+"""
+Micro-Batching Module for ML Model Inference
+
+This module collects concurrent prediction requests and runs them through the
+model as a single sparse-matrix batch:
+- Requests are queued and grouped for up to a short wait or a maximum batch size
+- One predict_batch call serves the whole group
+- Each caller receives its own result through a Future
+- Batch size and queue wait time histograms are recorded
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# Histogram bucket upper bounds
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128]
+WAIT_MS_BUCKETS = [0.1, 0.5, 1, 2, 5, 10, 50, 100]
+
+
+def _new_histogram(buckets):
+    """Create an empty histogram with one counter per bucket plus overflow"""
+    histogram = {f'<={bound}': 0 for bound in buckets}
+    histogram[f'>{buckets[-1]}'] = 0
+    return histogram
+
+
+def _observe(histogram, buckets, value):
+    """Record a value in the first bucket whose upper bound contains it"""
+    for bound in buckets:
+        if value <= bound:
+            histogram[f'<={bound}'] += 1
+            return
+    histogram[f'>{buckets[-1]}'] += 1
+
+
+class MicroBatcher:
+    """
+    Groups concurrent predictions into batches for a predict_batch function.
+    """
+
+    def __init__(self, predict_batch_fn, max_batch_size=32, max_wait_ms=2.0):
+        """
+        Initialize the batcher
+
+        Args:
+            predict_batch_fn: callable taking a list of texts and returning a list of results
+            max_batch_size: maximum number of requests per batch
+            max_wait_ms: maximum time the first request in a batch waits for others
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+
+        self.predict_batch_fn = predict_batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+
+        self._batches = 0
+        self._requests = 0
+        self._batch_size_histogram = _new_histogram(BATCH_SIZE_BUCKETS)
+        self._wait_ms_histogram = _new_histogram(WAIT_MS_BUCKETS)
+
+    def _ensure_worker(self):
+        """Start the worker thread lazily (and again after a fork)"""
+        if self._worker is not None and self._worker.is_alive() and self._worker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive() or self._worker_pid != os.getpid():
+                self._queue = queue.Queue()
+                self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                self._worker_pid = os.getpid()
+                self._worker.start()
+
+    def submit(self, text):
+        """
+        Queue a text for prediction
+
+        Returns:
+            concurrent.futures.Future resolving to the prediction result
+        """
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def predict(self, text, timeout=None):
+        """Predict a single text through the batcher and wait for the result"""
+        return self.submit(text).result(timeout=timeout)
+
+    def _collect(self):
+        """Block for the first request, then gather more until the batch is full or the wait expires"""
+        batch = [self._queue.get()]
+        deadline = batch[0][2] + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        # Take anything already queued without waiting further
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        """Worker loop: collect a batch, run inference, resolve futures"""
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            texts = [text for text, _, _ in batch]
+
+            try:
+                results = self.predict_batch_fn(texts)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+
+            with self._lock:
+                self._batches += 1
+                self._requests += len(batch)
+                _observe(self._batch_size_histogram, BATCH_SIZE_BUCKETS, len(batch))
+                for _, _, enqueued in batch:
+                    _observe(self._wait_ms_histogram, WAIT_MS_BUCKETS, (started - enqueued) * 1000)
+
+    def get_stats(self):
+        """Get batch size and wait time histograms"""
+        with self._lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'batches': self._batches,
+                'requests': self._requests,
+                'mean_batch_size': round(self._requests / self._batches, 2) if self._batches else 0.0,
+                'batch_size_histogram': dict(self._batch_size_histogram),
+                'wait_ms_histogram': dict(self._wait_ms_histogram)
+            }
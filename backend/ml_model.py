@@ -9,20 +9,37 @@ This module provides functionality for:
 import os
 import json
 import pickle
+import time
+import hashlib
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.metrics import classification_report, accuracy_score, f1_score
+from sklearn.model_selection import train_test_split, cross_val_score, GroupShuffleSplit, GroupKFold
+from sklearn.metrics import classification_report, accuracy_score, f1_score, log_loss
 from sklearn.pipeline import Pipeline
 import joblib
 
+from feature_cache import get_feature_cache, dataset_hash
+
 # Model storage path
 MODEL_DIR = os.environ.get('MODEL_DIR', 'models')
 MODEL_PATH = os.path.join(MODEL_DIR, 'mental_health_model.joblib')
 VECTORIZER_PATH = os.path.join(MODEL_DIR, 'vectorizer.joblib')
 
+# Share of the training split held out for gradient boosting early stopping
+VALIDATION_SIZE = 0.1
+
+# TF-IDF settings shared by every model trained on text
+VECTORIZER_PARAMS = {
+    'max_features': 5000,
+    'ngram_range': (1, 2),
+    'stop_words': 'english',
+    'min_df': 1,
+    'max_df': 0.95
+}
+
 
 class MentalHealthMLModel:
     """
@@ -59,13 +76,17 @@ class MentalHealthMLModel:
     def _save_model(self):
         """Save trained model to disk"""
         try:
+            # Served predictions are single-row; never persist a parallel estimator
+            if 'n_jobs' in self.model.get_params():
+                self.model.set_params(n_jobs=1)
             joblib.dump(self.model, MODEL_PATH)
             joblib.dump(self.vectorizer, VECTORIZER_PATH)
             print(f"Model saved to {MODEL_PATH}")
         except Exception as e:
             print(f"Error saving model: {e}")
     
-    def create_sample_dataset(self):
+    @staticmethod
+    def create_sample_dataset():
         """
         Create a sample dataset for training.
         In production, this should be replaced with real mental health datasets
@@ -138,7 +159,9 @@ class MentalHealthMLModel:
         
         return texts, labels
     
-    def train(self, texts=None, labels=None, model_type='logistic_regression', test_size=0.2):
+    def train(self, texts=None, labels=None, model_type='logistic_regression', test_size=0.2,
+              use_cache=True, checkpoint_dir=None, checkpoint_every=10,
+              early_stopping_patience=None, groups=None):
         """
         Train the machine learning model
         
@@ -147,6 +170,15 @@ class MentalHealthMLModel:
             labels: list of labels ('low', 'moderate', 'high')
             model_type: 'logistic_regression', 'random_forest', or 'gradient_boosting'
             test_size: proportion of data for testing
+            use_cache: reuse the fitted vectorizer and feature matrix from the
+                feature cache when the same texts were featurized before
+            checkpoint_dir: directory for gradient boosting checkpoints and the
+                training log; an interrupted run with the same data resumes from it
+            checkpoint_every: number of boosting stages between checkpoints
+            early_stopping_patience: stop gradient boosting after this many
+                checkpoints without validation loss improvement (None disables)
+            groups: optional group id per sample (e.g. near-duplicate clusters);
+                samples of one group never straddle the train/test split or CV folds
         
         Returns:
             dict with training results and metrics
@@ -162,23 +194,29 @@ class MentalHealthMLModel:
         if len(texts) < 10:
             raise ValueError("Need at least 10 samples for training")
         
-        # Create TF-IDF vectorizer
-        self.vectorizer = TfidfVectorizer(
-            max_features=5000,
-            ngram_range=(1, 2),
-            stop_words='english',
-            min_df=1,
-            max_df=0.95
-        )
-        
-        # Transform texts
-        X = self.vectorizer.fit_transform(texts)
+        # Create TF-IDF vectorizer and transform texts (cached by dataset + config)
+        if use_cache:
+            self.vectorizer, X, cache_hit = get_feature_cache().get_or_fit(texts, VECTORIZER_PARAMS)
+            feature_cache = 'hit' if cache_hit else 'miss'
+        else:
+            self.vectorizer = TfidfVectorizer(**VECTORIZER_PARAMS)
+            X = self.vectorizer.fit_transform(texts)
+            feature_cache = 'disabled'
         y = np.array(labels)
         
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=test_size, random_state=42, stratify=y
-        )
+        # Split data (group-aware when groups are given)
+        if groups is not None:
+            if len(groups) != len(texts):
+                raise ValueError("Number of groups must match number of texts")
+            groups = np.asarray(groups)
+            splitter = GroupShuffleSplit(n_splits=1, test_size=test_size, random_state=42)
+            train_idx, test_idx = next(splitter.split(X, y, groups))
+            X_train, X_test, y_train, y_test = X[train_idx], X[test_idx], y[train_idx], y[test_idx]
+            train_groups = groups[train_idx]
+        else:
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=test_size, random_state=42, stratify=y
+            )
         
         # Create model based on type
         if model_type == 'logistic_regression':
@@ -203,7 +241,32 @@ class MentalHealthMLModel:
             raise ValueError(f"Unknown model type: {model_type}")
         
         # Train model
-        self.model.fit(X_train, y_train)
+        checkpointed = model_type == 'gradient_boosting' and checkpoint_dir is not None
+        if checkpointed:
+            run_key = hashlib.sha256(
+                (dataset_hash(texts) + dataset_hash(list(labels)) +
+                 json.dumps(self.model.get_params(), sort_keys=True, default=str) +
+                 str(test_size) + str(VALIDATION_SIZE)).encode('utf-8')
+            ).hexdigest()
+            # Early stopping watches a validation split carved out of the
+            # training data; the test split stays unseen until evaluation
+            if groups is not None:
+                splitter = GroupShuffleSplit(n_splits=1, test_size=VALIDATION_SIZE, random_state=42)
+                fit_idx, val_idx = next(splitter.split(X_train, y_train, train_groups))
+                X_fit, X_val = X_train[fit_idx], X_train[val_idx]
+                y_fit, y_val = y_train[fit_idx], y_train[val_idx]
+            else:
+                # At least one validation sample per class for the stratified split
+                n_val = max(int(round(VALIDATION_SIZE * len(y_train))), len(set(y_train)))
+                X_fit, X_val, y_fit, y_val = train_test_split(
+                    X_train, y_train, test_size=n_val, random_state=42, stratify=y_train
+                )
+            self._fit_checkpointed(
+                X_fit, y_fit, X_val, y_val,
+                checkpoint_dir, checkpoint_every, early_stopping_patience, run_key
+            )
+        else:
+            self.model.fit(X_train, y_train)
         
         # Evaluate
         y_pred = self.model.predict(X_test)
@@ -212,8 +275,17 @@ class MentalHealthMLModel:
         accuracy = accuracy_score(y_test, y_pred)
         f1 = f1_score(y_test, y_pred, average='weighted', zero_division=0)
         
-        # Cross-validation
-        cv_scores = cross_val_score(self.model, X, y, cv=min(5, len(set(y))))
+        # Cross-validation (skipped for checkpointed runs, where refitting
+        # every fold from scratch would defeat the point of checkpointing)
+        if checkpointed:
+            cv_scores = None
+        else:
+            n_folds = min(5, len(set(y)))
+            if groups is not None:
+                cv = GroupKFold(n_splits=min(n_folds, len(set(groups))))
+                cv_scores = cross_val_score(self.model, X, y, groups=groups, cv=cv, n_jobs=-1)
+            else:
+                cv_scores = cross_val_score(self.model, X, y, cv=n_folds, n_jobs=-1)
         
         # Classification report
         report = classification_report(y_test, y_pred, output_dict=True, zero_division=0)
@@ -229,12 +301,178 @@ class MentalHealthMLModel:
             'model_type': model_type,
             'accuracy': round(accuracy, 4),
             'f1_score': round(f1, 4),
-            'cross_val_mean': round(cv_scores.mean(), 4),
-            'cross_val_std': round(cv_scores.std(), 4),
+            'cross_val_mean': round(cv_scores.mean(), 4) if cv_scores is not None else None,
+            'cross_val_std': round(cv_scores.std(), 4) if cv_scores is not None else None,
             'classification_report': report,
             'training_samples': X_train.shape[0],
-            'test_samples': X_test.shape[0]
+            'test_samples': X_test.shape[0],
+            'feature_cache': feature_cache
+        }
+    
+    def train_streaming(self, chunks, test_size=0.2, max_test_samples=100_000):
+        """
+        Train out-of-core on a stream of (texts, labels) chunks
+        
+        Uses a stateless HashingVectorizer and an SGD logistic regression
+        updated with partial_fit, so memory stays bounded by the chunk size.
+        A deterministic hash-based share of rows is held out for evaluation.
+        
+        Args:
+            chunks: iterable of (texts, labels) list pairs
+            test_size: proportion of rows held out for testing
+            max_test_samples: cap on the number of held-out rows kept in memory
+        
+        Returns:
+            dict with training results and metrics
+        """
+        vectorizer = HashingVectorizer(
+            n_features=2 ** 20,
+            ngram_range=VECTORIZER_PARAMS['ngram_range'],
+            stop_words=VECTORIZER_PARAMS['stop_words'],
+            alternate_sign=False
+        )
+        model = SGDClassifier(loss='log_loss', alpha=1e-5, random_state=42)
+        classes = np.array(self.classes)
+        
+        test_texts = []
+        test_labels = []
+        training_samples = 0
+        vectorize_seconds = 0.0
+        partial_fit_seconds = 0.0
+        threshold = int(test_size * 100)
+        
+        for chunk_number, (texts, labels) in enumerate(chunks, start=1):
+            # Stable per-text split so reruns hold out the same rows
+            holdout = pd.util.hash_array(np.array(texts, dtype=object)) % 100 < threshold
+            labels = np.array(labels)
+            train_texts = [t for t, h in zip(texts, holdout) if not h]
+            
+            if train_texts:
+                start = time.perf_counter()
+                X_chunk = vectorizer.transform(train_texts)
+                vectorized = time.perf_counter()
+                model.partial_fit(X_chunk, labels[~holdout], classes=classes)
+                fitted = time.perf_counter()
+                vectorize_seconds += vectorized - start
+                partial_fit_seconds += fitted - vectorized
+                training_samples += len(train_texts)
+                print(f"Chunk {chunk_number}: {len(train_texts)} rows, "
+                      f"vectorize {vectorized - start:.3f}s, partial_fit {fitted - vectorized:.3f}s")
+            
+            room = max_test_samples - len(test_texts)
+            if room > 0:
+                test_texts.extend([t for t, h in zip(texts, holdout) if h][:room])
+                test_labels.extend(labels[holdout][:room].tolist())
+        
+        if training_samples == 0:
+            raise ValueError("No training samples in the stream")
+        
+        self.vectorizer = vectorizer
+        self.model = model
+        self.model_type = 'sgd_streaming'
+        self.is_trained = True
+        self._save_model()
+        
+        results = {
+            'success': True,
+            'model_type': self.model_type,
+            'accuracy': None,
+            'f1_score': None,
+            'cross_val_mean': None,
+            'cross_val_std': None,
+            'classification_report': {},
+            'training_samples': training_samples,
+            'test_samples': len(test_texts),
+            'vectorize_seconds': round(vectorize_seconds, 4),
+            'partial_fit_seconds': round(partial_fit_seconds, 4)
         }
+        if test_texts:
+            y_pred = model.predict(vectorizer.transform(test_texts))
+            results['accuracy'] = round(accuracy_score(test_labels, y_pred), 4)
+            results['f1_score'] = round(f1_score(test_labels, y_pred, average='weighted', zero_division=0), 4)
+            results['classification_report'] = classification_report(
+                test_labels, y_pred, output_dict=True, zero_division=0
+            )
+        return results
+    
+    def _fit_checkpointed(self, X_train, y_train, X_val, y_val, checkpoint_dir,
+                          checkpoint_every, patience, run_key):
+        """
+        Fit gradient boosting in warm-start increments, checkpointing as it goes
+        
+        Every checkpoint_every stages the partial model and training state are
+        saved, per-stage training loss and timing plus the validation loss are
+        appended to training_log.jsonl, and training stops early once the
+        validation loss has not improved for `patience` checkpoints.
+        """
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        checkpoint_path = os.path.join(checkpoint_dir, 'gb_checkpoint.joblib')
+        log_path = os.path.join(checkpoint_dir, 'training_log.jsonl')
+        total_stages = self.model.n_estimators
+        
+        state = {'run_key': run_key, 'model': None, 'best_loss': None, 'stale_checkpoints': 0}
+        if os.path.exists(checkpoint_path):
+            try:
+                saved = joblib.load(checkpoint_path)
+                if saved.get('run_key') == run_key:
+                    state = saved
+                    print(f"Resuming from checkpoint at stage {state['model'].n_estimators_}")
+                else:
+                    print("Ignoring checkpoint from a different dataset or configuration")
+            except Exception as e:
+                print(f"Could not load checkpoint: {e}")
+        
+        if state['model'] is not None:
+            self.model = state['model']
+        else:
+            self.model.set_params(warm_start=True)
+        
+        def log(entry):
+            with open(log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+        
+        stage = getattr(self.model, 'n_estimators_', 0)
+        while stage < total_stages:
+            target = min(stage + checkpoint_every, total_stages)
+            
+            # One warm-start stage per fit, so every stage is timed on its own
+            elapsed = 0.0
+            while stage < target:
+                self.model.set_params(n_estimators=stage + 1)
+                start = time.perf_counter()
+                self.model.fit(X_train, y_train)
+                stage_seconds = time.perf_counter() - start
+                elapsed += stage_seconds
+                log({'event': 'stage', 'stage': stage + 1,
+                     'train_loss': round(float(self.model.train_score_[stage]), 6),
+                     'seconds': round(stage_seconds, 6)})
+                stage += 1
+            
+            val_loss = log_loss(y_val, self.model.predict_proba(X_val), labels=self.model.classes_)
+            if state['best_loss'] is None or val_loss < state['best_loss'] - 1e-4:
+                state['best_loss'] = val_loss
+                state['stale_checkpoints'] = 0
+            else:
+                state['stale_checkpoints'] += 1
+            
+            # Write the checkpoint atomically so a kill mid-write cannot corrupt it
+            state['model'] = self.model
+            tmp_path = checkpoint_path + '.tmp'
+            joblib.dump(state, tmp_path)
+            os.replace(tmp_path, checkpoint_path)
+            
+            log({'event': 'checkpoint', 'stage': stage, 'val_loss': round(float(val_loss), 6),
+                 'seconds': round(elapsed, 4)})
+            print(f"Stage {stage}/{total_stages}: validation loss {val_loss:.4f}")
+            
+            if patience is not None and state['stale_checkpoints'] >= patience:
+                print(f"Validation loss plateaued; stopping early at stage {stage}")
+                log({'event': 'early_stop', 'stage': stage})
+                break
+        
+        # Training finished: the checkpoint is no longer needed
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
     
     def predict(self, text):
         """
@@ -246,50 +484,59 @@ class MentalHealthMLModel:
         Returns:
             dict with prediction results
         """
+        return self.predict_batch([text])[0]
+    
+    def predict_batch(self, texts):
+        """
+        Predict mental health risk for multiple texts
+        
+        All texts are vectorized into one sparse matrix and scored with a
+        single predict_proba call, so per-call overhead is paid once per batch.
+        
+        Args:
+            texts: list of strings
+        
+        Returns:
+            list of prediction results
+        """
         if not self.is_trained:
-            return {
+            return [{
                 'error': 'Model not trained. Please train the model first.',
                 'fallback': True,
                 'risk_level': 'unknown'
-            }
+            } for _ in texts]
+        
+        if not texts:
+            return []
         
         try:
-            # Transform text
-            X = self.vectorizer.transform([text])
-            
-            # Get prediction and probabilities
-            prediction = self.model.predict(X)[0]
-            probabilities = self.model.predict_proba(X)[0]
-            
-            # Create probability dict
-            prob_dict = {}
-            for i, cls in enumerate(self.model.classes_):
-                prob_dict[cls] = round(float(probabilities[i]), 4)
-            
-            return {
-                'risk_level': prediction,
-                'confidence': round(float(max(probabilities)), 4),
-                'probabilities': prob_dict,
-                'model_type': self.model_type
-            }
+            # Transform texts and get probabilities in one pass
+            X = self.vectorizer.transform(texts)
+            probabilities = self.model.predict_proba(X)
         except Exception as e:
-            return {
+            return [{
                 'error': str(e),
                 'fallback': True,
                 'risk_level': 'unknown'
-            }
-    
-    def predict_batch(self, texts):
-        """
-        Predict mental health risk for multiple texts
+            } for _ in texts]
         
-        Args:
-            texts: list of strings
+        classes = self.model.classes_
+        best = probabilities.argmax(axis=1)
         
-        Returns:
-            list of prediction results
-        """
-        return [self.predict(text) for text in texts]
+        results = []
+        for row, best_index in zip(probabilities, best):
+            # Create probability dict
+            prob_dict = {}
+            for i, cls in enumerate(classes):
+                prob_dict[str(cls)] = round(float(row[i]), 4)
+            
+            results.append({
+                'risk_level': str(classes[best_index]),
+                'confidence': round(float(row[best_index]), 4),
+                'probabilities': prob_dict,
+                'model_type': self.model_type
+            })
+        return results
     
     def get_model_info(self):
         """Get information about the current model"""
@@ -335,7 +582,9 @@ class MentalHealthMLModel:
             all_texts = sample_texts + new_texts
             all_labels = sample_labels + new_labels
         
-        # Retrain
+        # Retrain (a streamed model is retrained the same way, as a single chunk)
+        if self.model_type == 'sgd_streaming':
+            return self.train_streaming([(all_texts, all_labels)])
         return self.train(all_texts, all_labels, model_type=self.model_type or 'logistic_regression')
 
 
@@ -0,0 +1,200 @@
+"""
+Model Evaluation Module
+
+This module evaluates the saved model artifact on a labeled holdout set:
+- Streams the holdout through batched inference (one transform + predict_proba per batch)
+- Quality: accuracy, confusion matrix, per-class precision/recall/F1
+- Calibration: expected calibration error, reliability bins and Brier score
+- Speed: texts/sec, single-text latency percentiles
+- Memory: memory allocated while loading the artifact and peak process RSS
+
+The result is a JSON-serializable dict so model promotion can be gated on
+both quality and speed.
+"""
+import resource
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from dataset_loader import iter_dataset_chunks, DEFAULT_CHUNK_SIZE
+from ml_model import MentalHealthMLModel
+
+CALIBRATION_BINS = 10
+
+
+def _peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 2)
+
+
+def evaluate_model(paths, batch_size=1024, chunksize=DEFAULT_CHUNK_SIZE, latency_samples=200,
+                   model=None):
+    """
+    Evaluate a model artifact on a labeled holdout file
+
+    Args:
+        paths: holdout file path(s) or glob pattern(s) (any format the dataset loader reads)
+        batch_size: texts per inference batch
+        chunksize: rows read per chunk
+        latency_samples: number of texts used to measure single-text latency
+        model: MentalHealthMLModel to evaluate (loads the saved artifact if None)
+
+    Returns:
+        dict with quality, calibration, speed and memory results
+    """
+    load_memory_mb = None
+    load_seconds = None
+    if model is None:
+        tracemalloc.start()
+        start = time.perf_counter()
+        model = MentalHealthMLModel()
+        load_seconds = time.perf_counter() - start
+        _, load_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        load_memory_mb = round(load_peak / (1024 * 1024), 2)
+
+    if not model.is_trained:
+        raise ValueError("Model not trained. Please train the model first.")
+
+    classes = [str(cls) for cls in model.model.classes_]
+    class_index = {cls: i for i, cls in enumerate(classes)}
+    n_model_classes = len(classes)
+
+    true_idx = []
+    pred_idx = []
+    confidences = []
+    brier_sum = 0.0
+    inference_seconds = 0.0
+    latency_pool = []
+
+    for texts, labels in iter_dataset_chunks(paths, chunksize=chunksize, dedupe=False):
+        # Labels the model never saw get their own column in the confusion matrix
+        for label in labels:
+            if label not in class_index:
+                class_index[label] = len(classes)
+                classes.append(label)
+
+        if len(latency_pool) < latency_samples:
+            latency_pool.extend(texts[:latency_samples - len(latency_pool)])
+
+        for offset in range(0, len(texts), batch_size):
+            batch_texts = texts[offset:offset + batch_size]
+            batch_true = np.array([class_index[label] for label in labels[offset:offset + batch_size]])
+
+            start = time.perf_counter()
+            probabilities = model.model.predict_proba(model.vectorizer.transform(batch_texts))
+            inference_seconds += time.perf_counter() - start
+
+            best = probabilities.argmax(axis=1)
+            true_idx.append(batch_true)
+            pred_idx.append(best)
+            confidences.append(probabilities[np.arange(len(best)), best])
+
+            one_hot = np.zeros_like(probabilities)
+            known = batch_true < n_model_classes
+            one_hot[np.flatnonzero(known), batch_true[known]] = 1.0
+            brier_sum += float(((probabilities - one_hot) ** 2).sum())
+
+    if not true_idx:
+        raise ValueError("Holdout set contains no valid samples")
+
+    y_true = np.concatenate(true_idx)
+    y_pred = np.concatenate(pred_idx)
+    confidence = np.concatenate(confidences)
+    n = len(y_true)
+    k = len(classes)
+
+    confusion = np.bincount(y_true * k + y_pred, minlength=k * k).reshape(k, k)
+    per_class = {}
+    for i, cls in enumerate(classes):
+        tp = int(confusion[i, i])
+        predicted = int(confusion[:, i].sum())
+        actual = int(confusion[i, :].sum())
+        precision = tp / predicted if predicted else 0.0
+        recall = tp / actual if actual else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        per_class[cls] = {
+            'precision': round(precision, 4),
+            'recall': round(recall, 4),
+            'f1_score': round(f1, 4),
+            'support': actual
+        }
+
+    # Calibration of the top-class confidence
+    correct = y_pred == y_true
+    bins = np.minimum((confidence * CALIBRATION_BINS).astype(int), CALIBRATION_BINS - 1)
+    reliability = []
+    ece = 0.0
+    for b in range(CALIBRATION_BINS):
+        in_bin = bins == b
+        count = int(in_bin.sum())
+        if not count:
+            continue
+        bin_confidence = float(confidence[in_bin].mean())
+        bin_accuracy = float(correct[in_bin].mean())
+        ece += count / n * abs(bin_accuracy - bin_confidence)
+        reliability.append({
+            'bin': f'{b / CALIBRATION_BINS:.1f}-{(b + 1) / CALIBRATION_BINS:.1f}',
+            'count': count,
+            'mean_confidence': round(bin_confidence, 4),
+            'accuracy': round(bin_accuracy, 4)
+        })
+
+    # Single-text latency through the full predict path
+    latencies = []
+    for text in latency_pool:
+        start = time.perf_counter()
+        model.predict(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+    percentiles = np.percentile(latencies, [50, 90, 99]) if latencies else [0.0, 0.0, 0.0]
+
+    return {
+        'model_type': model.model_type,
+        'samples': n,
+        'accuracy': round(float(correct.mean()), 4),
+        'classes': classes,
+        'confusion_matrix': confusion.tolist(),
+        'per_class': per_class,
+        'calibration': {
+            'expected_calibration_error': round(ece, 4),
+            'brier_score': round(brier_sum / n, 4),
+            'reliability': reliability
+        },
+        'speed': {
+            'batch_size': batch_size,
+            'texts_per_second': round(n / inference_seconds, 1) if inference_seconds else None,
+            'latency_ms': {
+                'p50': round(float(percentiles[0]), 4),
+                'p90': round(float(percentiles[1]), 4),
+                'p99': round(float(percentiles[2]), 4)
+            }
+        },
+        'memory': {
+            'artifact_load_mb': load_memory_mb,
+            'artifact_load_seconds': round(load_seconds, 4) if load_seconds is not None else None,
+            'peak_rss_mb': _peak_rss_mb()
+        }
+    }
+
+
+def check_gates(results, min_accuracy=None, min_throughput=None, max_p99_ms=None):
+    """
+    Check evaluation results against promotion thresholds
+
+    Returns:
+        list of failure messages (empty if every gate passed)
+    """
+    failures = []
+    if min_accuracy is not None and results['accuracy'] < min_accuracy:
+        failures.append(f"accuracy {results['accuracy']:.4f} < {min_accuracy}")
+    throughput = results['speed']['texts_per_second'] or 0.0
+    if min_throughput is not None and throughput < min_throughput:
+        failures.append(f"throughput {throughput} texts/sec < {min_throughput}")
+    p99 = results['speed']['latency_ms']['p99']
+    if max_p99_ms is not None and p99 > max_p99_ms:
+        failures.append(f"p99 latency {p99} ms > {max_p99_ms}")
+    return failures
@@ -0,0 +1,188 @@
+"""
+Model Comparison and Hyperparameter Search Module
+
+This module evaluates several model types on shared TF-IDF features:
+- compare: each model type with its default parameters, trained in parallel
+- search: successive-halving grid search per model type, parallel across cores
+- A report of accuracy vs training time vs inference latency vs model size
+- The best candidate can be published as the active model
+"""
+import pickle
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import (
+    HalvingGridSearchCV, GridSearchCV, GroupKFold, GroupShuffleSplit, train_test_split
+)
+from sklearn.metrics import accuracy_score, f1_score
+
+from ml_model import VECTORIZER_PARAMS
+from feature_cache import get_feature_cache
+
+# Base estimators and parameter grids per model type
+SEARCH_SPACE = {
+    'logistic_regression': (
+        LogisticRegression(max_iter=1000, solver='lbfgs', random_state=42),
+        {'C': [0.1, 1.0, 10.0]}
+    ),
+    'random_forest': (
+        RandomForestClassifier(n_estimators=100, max_depth=10, random_state=42),
+        {'n_estimators': [100, 300], 'max_depth': [10, None]}
+    ),
+    'gradient_boosting': (
+        GradientBoostingClassifier(n_estimators=100, max_depth=5, random_state=42),
+        {'n_estimators': [50, 100], 'max_depth': [3, 5], 'learning_rate': [0.05, 0.1]}
+    )
+}
+
+# Below this many training samples successive halving has too few
+# resources per round, so a plain grid search is used instead
+MIN_SAMPLES_FOR_HALVING = 200
+
+
+def _measure(model_type, estimator, params, X_train, y_train, X_test, y_test, cv_score=None):
+    """Fit one candidate and measure quality, training time, latency and size"""
+    estimator = clone(estimator).set_params(**params)
+
+    start = time.perf_counter()
+    estimator.fit(X_train, y_train)
+    train_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    y_pred = estimator.predict(X_test)
+    batch_time = time.perf_counter() - start
+
+    # Single-row latency on a few test rows
+    single_times = []
+    for i in range(min(20, X_test.shape[0])):
+        start = time.perf_counter()
+        estimator.predict_proba(X_test[i])
+        single_times.append(time.perf_counter() - start)
+
+    return {
+        'model_type': model_type,
+        'params': params,
+        'cv_score': round(float(cv_score), 4) if cv_score is not None else None,
+        'accuracy': round(accuracy_score(y_test, y_pred), 4),
+        'f1_score': round(f1_score(y_test, y_pred, average='weighted', zero_division=0), 4),
+        'train_time_s': round(train_time, 4),
+        'batch_latency_ms_per_text': round(batch_time / X_test.shape[0] * 1000, 4),
+        'single_latency_ms': round(float(np.median(single_times)) * 1000, 4),
+        'model_size_bytes': len(pickle.dumps(estimator)),
+        'estimator': estimator
+    }
+
+
+def _search(model_type, X_train, y_train, n_jobs, cv, groups=None):
+    """Run a successive-halving (or plain) grid search for one model type"""
+    estimator, grid = SEARCH_SPACE[model_type]
+
+    if X_train.shape[0] >= MIN_SAMPLES_FOR_HALVING:
+        search = HalvingGridSearchCV(
+            estimator, grid, factor=3, cv=cv, n_jobs=n_jobs, random_state=42, refit=False
+        )
+    else:
+        search = GridSearchCV(estimator, grid, cv=cv, n_jobs=n_jobs, refit=False)
+    search.fit(X_train, y_train, groups=groups)
+    return search.best_params_, search.best_score_
+
+
+def run_model_search(texts, labels, mode='compare', model_types=None, test_size=0.2,
+                     n_jobs=-1, use_cache=True, groups=None):
+    """
+    Compare model types (or search their parameter grids) on shared features
+
+    Args:
+        texts: list of text samples
+        labels: list of labels ('low', 'moderate', 'high')
+        mode: 'compare' (default parameters) or 'search' (grid search)
+        model_types: model types to evaluate (all in SEARCH_SPACE if None)
+        test_size: proportion of data held out for the report
+        n_jobs: number of parallel jobs (-1 uses all cores)
+        use_cache: take the TF-IDF features from the feature cache
+        groups: optional group id per sample (e.g. near-duplicate clusters);
+            samples of one group never straddle the train/test split or CV folds
+
+    Returns:
+        dict with the candidate report (best first), the fitted vectorizer
+        and the best fitted estimator
+    """
+    if mode not in ('compare', 'search'):
+        raise ValueError(f"Unknown search mode: {mode}")
+    model_types = model_types or list(SEARCH_SPACE)
+    for model_type in model_types:
+        if model_type not in SEARCH_SPACE:
+            raise ValueError(f"Unknown model type: {model_type}")
+
+    # Featurize once and share the matrix across every candidate
+    if use_cache:
+        vectorizer, X, _ = get_feature_cache().get_or_fit(texts, VECTORIZER_PARAMS)
+    else:
+        vectorizer = TfidfVectorizer(**VECTORIZER_PARAMS)
+        X = vectorizer.fit_transform(texts)
+    y = np.array(labels)
+
+    train_groups = None
+    if groups is not None:
+        if len(groups) != len(texts):
+            raise ValueError("Number of groups must match number of texts")
+        groups = np.asarray(groups)
+        splitter = GroupShuffleSplit(n_splits=1, test_size=test_size, random_state=42)
+        train_idx, test_idx = next(splitter.split(X, y, groups))
+        X_train, X_test, y_train, y_test = X[train_idx], X[test_idx], y[train_idx], y[test_idx]
+        train_groups = groups[train_idx]
+        cv = GroupKFold(n_splits=max(2, min(5, len(set(train_groups.tolist())))))
+    else:
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=test_size, random_state=42, stratify=y
+        )
+        # Stratified folds need at least one sample of each class per fold
+        smallest_class = int(np.unique(y_train, return_counts=True)[1].min())
+        cv = max(2, min(5, smallest_class))
+
+    if mode == 'search':
+        # Each search parallelizes its own candidates and folds
+        chosen = []
+        for model_type in model_types:
+            params, score = _search(model_type, X_train, y_train, n_jobs, cv, train_groups)
+            chosen.append((model_type, params, score))
+        candidates = [
+            _measure(model_type, SEARCH_SPACE[model_type][0], params,
+                     X_train, y_train, X_test, y_test, score)
+            for model_type, params, score in chosen
+        ]
+    else:
+        candidates = Parallel(n_jobs=n_jobs)(
+            delayed(_measure)(model_type, SEARCH_SPACE[model_type][0], {},
+                              X_train, y_train, X_test, y_test)
+            for model_type in model_types
+        )
+
+    # Best accuracy first; faster inference breaks ties
+    candidates.sort(key=lambda c: (-c['accuracy'], c['single_latency_ms']))
+    best = candidates[0]
+
+    return {
+        'mode': mode,
+        'training_samples': X_train.shape[0],
+        'test_samples': X_test.shape[0],
+        'candidates': [{k: v for k, v in c.items() if k != 'estimator'} for c in candidates],
+        'best': {k: v for k, v in best.items() if k != 'estimator'},
+        'vectorizer': vectorizer,
+        'best_estimator': best['estimator']
+    }
+
+
+def publish_best(model, search_result):
+    """Make the best candidate of a search the active, saved model"""
+    model.vectorizer = search_result['vectorizer']
+    model.model = search_result['best_estimator']
+    model.model_type = search_result['best']['model_type']
+    model.is_trained = True
+    model._save_model()
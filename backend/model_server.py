@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+Model Server Module (sidecar process)
+
+This module lets a single process own the MentalHealthMLModel and serve
+predictions to every web worker over a local Unix socket:
+- ModelServer: threaded Unix socket server with cross-client micro-batching
+- ModelServerClient: thin client with connection pooling and fallback to
+  in-process inference when the sidecar is unavailable
+
+Wire protocol (all integers big-endian):
+    frame    = uint32 body length + body
+    request  = uint8 op + payload
+        OP_PREDICT payload = uint16 count + count * (uint32 length + utf-8 text)
+                             (at most MAX_TEXTS_PER_REQUEST texts; the client splits larger batches)
+        OP_INFO / OP_RELOAD payload = empty
+    response = uint8 status (0 ok, 1 error) + payload
+        error payload   = uint16 length + utf-8 message
+        OP_PREDICT      = uint8 class count + classes (uint8 length + name)
+                          + uint8 length + model type
+                          + uint16 count + count * result
+        result          = uint8 0 + uint8 best class + class count * float32 probability
+                          | uint8 1 + uint16 length + utf-8 error message
+        OP_INFO/RELOAD  = utf-8 JSON
+
+Usage:
+    python model_server.py --socket /tmp/mental-health-model.sock
+"""
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+from ml_model import get_model, MentalHealthMLModel
+from micro_batcher import MicroBatcher
+
+DEFAULT_SOCKET_PATH = os.environ.get('MODEL_SERVER_SOCKET', '/tmp/mental-health-model.sock')
+
+OP_PREDICT = 1
+OP_INFO = 2
+OP_RELOAD = 3
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+# Text and result counts are encoded as uint16
+MAX_TEXTS_PER_REQUEST = 0xFFFF
+
+
+class ModelServerError(Exception):
+    """Raised when the model server cannot be reached or returns an error"""
+
+
+# =====================================================
+# FRAMING AND ENCODING
+# =====================================================
+
+def _recv_exact(sock, size):
+    """Read exactly size bytes from a socket"""
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError('Connection closed by peer')
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def send_frame(sock, body):
+    """Send a length-prefixed frame"""
+    sock.sendall(struct.pack('>I', len(body)) + body)
+
+
+def recv_frame(sock):
+    """Receive a length-prefixed frame"""
+    (size,) = struct.unpack('>I', _recv_exact(sock, 4))
+    if size > MAX_FRAME_SIZE:
+        raise ConnectionError(f'Frame of {size} bytes exceeds limit')
+    return _recv_exact(sock, size)
+
+
+def _pack_str(value, length_format):
+    """Encode a length-prefixed utf-8 string"""
+    data = value.encode('utf-8')
+    return struct.pack(length_format, len(data)) + data
+
+
+def _unpack_str(body, offset, length_format):
+    """Decode a length-prefixed utf-8 string, returning (value, new offset)"""
+    (length,) = struct.unpack_from(length_format, body, offset)
+    offset += struct.calcsize(length_format)
+    return body[offset:offset + length].decode('utf-8'), offset + length
+
+
+def encode_predict_request(texts):
+    """Encode an OP_PREDICT request body"""
+    if len(texts) > MAX_TEXTS_PER_REQUEST:
+        raise ValueError(f"At most {MAX_TEXTS_PER_REQUEST} texts per request")
+    parts = [struct.pack('>BH', OP_PREDICT, len(texts))]
+    parts.extend(_pack_str(text, '>I') for text in texts)
+    return b''.join(parts)
+
+
+def decode_predict_request(body):
+    """Decode the texts of an OP_PREDICT request body"""
+    (count,) = struct.unpack_from('>H', body, 1)
+    offset = 3
+    texts = []
+    for _ in range(count):
+        text, offset = _unpack_str(body, offset, '>I')
+        texts.append(text)
+    return texts
+
+
+def encode_predict_response(results, classes, model_type):
+    """Encode prediction result dicts into an OP_PREDICT response body"""
+    if len(results) > MAX_TEXTS_PER_REQUEST:
+        raise ValueError(f"At most {MAX_TEXTS_PER_REQUEST} results per response")
+    parts = [struct.pack('>BB', STATUS_OK, len(classes))]
+    parts.extend(_pack_str(cls, '>B') for cls in classes)
+    parts.append(_pack_str(model_type or '', '>B'))
+    parts.append(struct.pack('>H', len(results)))
+
+    prob_format = f'>{len(classes)}f'
+    for result in results:
+        if 'error' in result:
+            parts.append(struct.pack('>B', 1) + _pack_str(result['error'], '>H'))
+            continue
+        probabilities = [result['probabilities'].get(cls, 0.0) for cls in classes]
+        parts.append(struct.pack('>BB', 0, classes.index(result['risk_level'])))
+        parts.append(struct.pack(prob_format, *probabilities))
+    return b''.join(parts)
+
+
+def decode_predict_response(body):
+    """Decode an OP_PREDICT response body into prediction result dicts"""
+    if body[0] != STATUS_OK:
+        message, _ = _unpack_str(body, 1, '>H')
+        raise ModelServerError(message)
+
+    n_classes = body[1]
+    offset = 2
+    classes = []
+    for _ in range(n_classes):
+        cls, offset = _unpack_str(body, offset, '>B')
+        classes.append(cls)
+    model_type, offset = _unpack_str(body, offset, '>B')
+    (count,) = struct.unpack_from('>H', body, offset)
+    offset += 2
+
+    prob_format = f'>{n_classes}f'
+    prob_size = struct.calcsize(prob_format)
+    results = []
+    for _ in range(count):
+        flag = body[offset]
+        offset += 1
+        if flag:
+            message, offset = _unpack_str(body, offset, '>H')
+            results.append({'error': message, 'fallback': True, 'risk_level': 'unknown'})
+            continue
+        best = body[offset]
+        probabilities = struct.unpack_from(prob_format, body, offset + 1)
+        offset += 1 + prob_size
+        results.append({
+            'risk_level': classes[best],
+            'confidence': round(float(probabilities[best]), 4),
+            'probabilities': {cls: round(float(p), 4) for cls, p in zip(classes, probabilities)},
+            'model_type': model_type or None
+        })
+    return results
+
+
+def _encode_error(message):
+    """Encode an error response body"""
+    return struct.pack('>B', STATUS_ERROR) + _pack_str(message[:1000], '>H')
+
+
+def _encode_json(payload):
+    """Encode a JSON response body"""
+    return struct.pack('>B', STATUS_OK) + json.dumps(payload).encode('utf-8')
+
+
+# =====================================================
+# SERVER
+# =====================================================
+
+class _ModelRequestHandler(socketserver.BaseRequestHandler):
+    """Serves framed requests on one persistent client connection"""
+
+    def handle(self):
+        while True:
+            try:
+                body = recv_frame(self.request)
+            except (ConnectionError, OSError, struct.error):
+                return
+            try:
+                response = self.server.dispatch(body)
+            except Exception as e:
+                response = _encode_error(str(e))
+            try:
+                send_frame(self.request, response)
+            except OSError:
+                return
+
+
+class ModelServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Unix socket server owning the ML model.
+    Requests from all clients share one micro-batcher.
+    """
+    daemon_threads = True
+
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH, model=None,
+                 max_batch_size=64, max_wait_ms=2.0):
+        """
+        Initialize the server
+
+        Args:
+            socket_path: filesystem path of the Unix socket
+            model: MentalHealthMLModel instance (global model if None)
+            max_batch_size: maximum texts per inference batch
+            max_wait_ms: maximum time a request waits for a batch to fill
+        """
+        self.socket_path = socket_path
+        self.model = model or get_model()
+        # Reloads swap self.model under this lock; a batch always runs on one model
+        self._model_lock = threading.Lock()
+        self.batcher = MicroBatcher(self._predict_batch, max_batch_size, max_wait_ms)
+
+        # Remove a stale socket left by a previous run
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, _ModelRequestHandler)
+        os.chmod(socket_path, 0o660)
+
+    @staticmethod
+    def _classes(model):
+        """Class names in the order of a model's probability outputs"""
+        return tuple(str(cls) for cls in getattr(model.model, 'classes_', model.classes))
+
+    def _predict_batch(self, texts):
+        """Batcher callback: predict with one model and tag each result with its classes"""
+        with self._model_lock:
+            model = self.model
+        classes = self._classes(model)
+        return [(result, classes, model.model_type) for result in model.predict_batch(texts)]
+
+    def dispatch(self, body):
+        """Handle one request body and return the response body"""
+        op = body[0]
+        if op == OP_PREDICT:
+            texts = decode_predict_request(body)
+            if not texts:
+                return encode_predict_response([], list(self._classes(self.model)), self.model.model_type)
+            futures = [self.batcher.submit(text) for text in texts]
+            tagged = [future.result() for future in futures]
+            if len({(classes, model_type) for _, classes, model_type in tagged}) > 1:
+                # A reload landed between this request's batches: answer it all from one model
+                tagged = self._predict_batch(texts)
+            _, classes, model_type = tagged[0]
+            return encode_predict_response([result for result, _, _ in tagged], list(classes), model_type)
+        if op == OP_INFO:
+            info = self.model.get_model_info()
+            info['batcher'] = self.batcher.get_stats()
+            return _encode_json(info)
+        if op == OP_RELOAD:
+            # Load off to the side, then swap: in-flight batches keep the old model
+            model = MentalHealthMLModel()
+            with self._model_lock:
+                self.model = model
+            return _encode_json({'reloaded': True, 'is_trained': model.is_trained})
+        return _encode_error(f'Unknown op: {op}')
+
+    def server_close(self):
+        """Close the server and remove its socket file"""
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+# =====================================================
+# CLIENT
+# =====================================================
+
+class ModelServerClient:
+    """
+    Thin client for the model server with connection pooling.
+    Falls back to in-process inference if the sidecar is down.
+    """
+
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH, pool_size=4, timeout=2.0,
+                 retry_interval=5.0, fallback_factory=get_model):
+        """
+        Initialize the client
+
+        Args:
+            socket_path: filesystem path of the server's Unix socket
+            pool_size: maximum number of idle connections kept open
+            timeout: socket timeout in seconds
+            retry_interval: seconds to wait before retrying a sidecar that failed
+            fallback_factory: callable returning an in-process model, loaded on first use
+        """
+        self.socket_path = socket_path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.fallback_factory = fallback_factory
+
+        self._pool = queue.LifoQueue()
+        self._pool_pid = os.getpid()
+        self._down_until = 0.0
+        self._fallback_model = None
+        self._info = None
+        self._info_checked = 0.0
+
+    @property
+    def fallback_model(self):
+        """In-process model, only loaded when the sidecar cannot be used"""
+        if self._fallback_model is None:
+            self._fallback_model = self.fallback_factory()
+        return self._fallback_model
+
+    def _acquire(self):
+        """Get a pooled connection or open a new one"""
+        if self._pool_pid != os.getpid():
+            # Never share sockets inherited across a fork
+            self._pool = queue.LifoQueue()
+            self._pool_pid = os.getpid()
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            return sock
+
+    def _release(self, sock):
+        """Return a healthy connection to the pool"""
+        if self._pool.qsize() < self.pool_size:
+            self._pool.put(sock)
+        else:
+            sock.close()
+
+    def _request(self, body):
+        """Send a request to the sidecar and return the response body"""
+        if time.monotonic() < self._down_until:
+            raise ModelServerError('Model server marked unavailable')
+        try:
+            sock = self._acquire()
+        except OSError as e:
+            self._down_until = time.monotonic() + self.retry_interval
+            raise ModelServerError(f'Cannot connect to model server: {e}')
+        try:
+            send_frame(sock, body)
+            response = recv_frame(sock)
+        except (OSError, ConnectionError, struct.error) as e:
+            sock.close()
+            self._down_until = time.monotonic() + self.retry_interval
+            raise ModelServerError(f'Model server request failed: {e}')
+        self._release(sock)
+        return response
+
+    def _request_json(self, op):
+        """Send a payload-less request and decode its JSON response"""
+        response = self._request(struct.pack('>B', op))
+        if response[0] != STATUS_OK:
+            message, _ = _unpack_str(response, 1, '>H')
+            raise ModelServerError(message)
+        return json.loads(response[1:].decode('utf-8'))
+
+    def predict_batch(self, texts):
+        """Predict risk for multiple texts via the sidecar, or in-process on failure"""
+        try:
+            results = []
+            # The protocol caps texts per request; larger batches are split
+            for start in range(0, len(texts), MAX_TEXTS_PER_REQUEST):
+                chunk = texts[start:start + MAX_TEXTS_PER_REQUEST]
+                results.extend(decode_predict_response(self._request(encode_predict_request(chunk))))
+            return results
+        except ModelServerError:
+            return self.fallback_model.predict_batch(texts)
+
+    def predict(self, text):
+        """Predict risk for a single text"""
+        return self.predict_batch([text])[0]
+
+    def get_model_info(self):
+        """Get model information from the sidecar, or from the in-process model"""
+        try:
+            info = self._request_json(OP_INFO)
+            info['served_by'] = 'model_server'
+        except ModelServerError:
+            info = self.fallback_model.get_model_info()
+            info['served_by'] = 'in_process'
+        self._info = info
+        self._info_checked = time.monotonic()
+        return info
+
+    @property
+    def is_trained(self):
+        """Whether a trained model is available (sidecar info cached briefly)"""
+        if self._info is None or time.monotonic() - self._info_checked > self.retry_interval:
+            self.get_model_info()
+        return bool(self._info.get('is_trained'))
+
+    def reload(self):
+        """Ask the sidecar to reload the model from disk"""
+        try:
+            return self._request_json(OP_RELOAD)
+        except ModelServerError as e:
+            return {'reloaded': False, 'error': str(e)}
+
+    def train(self, *args, **kwargs):
+        """Train in-process, save to disk, then have the sidecar reload the new model"""
+        result = self.fallback_model.train(*args, **kwargs)
+        self.reload()
+        self._info = None
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the mental health ML model over a Unix socket')
+    parser.add_argument('--socket', '-s', default=DEFAULT_SOCKET_PATH,
+                        help=f'Unix socket path (default: {DEFAULT_SOCKET_PATH})')
+    parser.add_argument('--max-batch-size', type=int, default=64,
+                        help='Maximum texts per inference batch (default: 64)')
+    parser.add_argument('--max-wait-ms', type=float, default=2.0,
+                        help='Maximum time to wait for a batch to fill (default: 2.0)')
+    args = parser.parse_args()
+
+    server = ModelServer(args.socket, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    print(f"Model server listening on {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
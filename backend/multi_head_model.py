@@ -0,0 +1,301 @@
+"""
+Multi-Head Condition Model Module
+
+This module predicts overall risk plus per-condition severities from a single
+TF-IDF transform:
+- One linear head per output (risk, depression, anxiety, stress)
+- All heads stored together as one coefficient block
+- One sparse matrix multiply produces the scores for every output
+- A retrained model is swapped in with a single assignment, so concurrent
+  predictions see either the old or the new model, never a mix
+
+Per-condition labels can be supplied with the training data. When they are
+missing, they are derived from the keyword-based TextAnalyzer.
+"""
+import os
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split, GroupShuffleSplit
+from sklearn.metrics import accuracy_score
+import joblib
+
+from ml_model import MODEL_DIR, VECTORIZER_PARAMS, MentalHealthMLModel
+from feature_cache import get_feature_cache
+from text_analyzer import TextAnalyzer
+
+MULTI_HEAD_MODEL_PATH = os.path.join(MODEL_DIR, 'multi_head_model.joblib')
+
+RISK_CLASSES = ['low', 'moderate', 'high']
+CONDITIONS = ['depression', 'anxiety', 'stress']
+CONDITION_LEVELS = ['none', 'mild', 'moderate', 'high']
+
+
+def _softmax(scores):
+    """Row-wise softmax of a 2D score array"""
+    scores = scores - scores.max(axis=1, keepdims=True)
+    exp = np.exp(scores)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+class _FittedHeads:
+    """
+    The fitted vectorizer and coefficient block of a trained model.
+
+    Never modified after construction; training builds a new instance.
+    """
+
+    def __init__(self, vectorizer, coef, intercept, heads):
+        self.vectorizer = vectorizer
+        self.coef = coef            # (n_features, total_classes) coefficient block
+        self.intercept = intercept  # (total_classes,) intercepts
+        self.heads = heads          # list of (name, start, end, classes)
+
+
+class MultiHeadConditionModel:
+    """
+    Multi-output linear model for overall risk and per-condition severity.
+    """
+
+    def __init__(self):
+        """Initialize the model and load a saved one if available"""
+        self._fitted = None
+
+        os.makedirs(MODEL_DIR, exist_ok=True)
+        self._load_model()
+
+    @property
+    def is_trained(self):
+        """Whether a fitted model is loaded"""
+        return self._fitted is not None
+
+    def _load_model(self):
+        """Load pre-trained model if available"""
+        try:
+            if os.path.exists(MULTI_HEAD_MODEL_PATH):
+                state = joblib.load(MULTI_HEAD_MODEL_PATH)
+                self._fitted = _FittedHeads(
+                    state['vectorizer'], state['coef'], state['intercept'], state['heads']
+                )
+        except Exception as e:
+            print(f"Could not load multi-head model: {e}")
+            self._fitted = None
+
+    def _save_model(self, fitted):
+        """Save a fitted model to disk"""
+        try:
+            joblib.dump({
+                'vectorizer': fitted.vectorizer,
+                'coef': fitted.coef,
+                'intercept': fitted.intercept,
+                'heads': fitted.heads
+            }, MULTI_HEAD_MODEL_PATH)
+            print(f"Multi-head model saved to {MULTI_HEAD_MODEL_PATH}")
+        except Exception as e:
+            print(f"Error saving multi-head model: {e}")
+
+    def _derive_condition_labels(self, texts):
+        """Derive per-condition levels for each text from the keyword analyzer"""
+        analyzer = TextAnalyzer()
+        labels = {condition: [] for condition in CONDITIONS}
+        for text in texts:
+            indicators = analyzer._detect_indicators(analyzer._preprocess(text))
+            for condition in CONDITIONS:
+                labels[condition].append(indicators[condition]['level'])
+        return labels
+
+    def _fit_head(self, X, y, classes):
+        """
+        Fit one head and return its (coef, intercept) columns for the given classes
+
+        Classes absent from the training data get a large negative intercept so
+        they are never predicted.
+        """
+        coef = np.zeros((X.shape[1], len(classes)))
+        intercept = np.full(len(classes), -1e3)
+        present = sorted(set(y), key=classes.index)
+
+        if len(present) == 1:
+            intercept[classes.index(present[0])] = 0.0
+            return coef, intercept
+
+        clf = LogisticRegression(max_iter=1000, solver='lbfgs', random_state=42)
+        clf.fit(X, y)
+        fitted_classes = list(clf.classes_)
+
+        if len(fitted_classes) == 2:
+            # Binary logistic regression stores one column; softmax over
+            # [0, w] reproduces the sigmoid probabilities
+            positive = classes.index(fitted_classes[1])
+            coef[:, positive] = clf.coef_[0]
+            intercept[positive] = clf.intercept_[0]
+            intercept[classes.index(fitted_classes[0])] = 0.0
+        else:
+            for i, cls in enumerate(fitted_classes):
+                index = classes.index(cls)
+                coef[:, index] = clf.coef_[i]
+                intercept[index] = clf.intercept_[i]
+        return coef, intercept
+
+    def train(self, texts=None, labels=None, condition_labels=None, test_size=0.2, use_cache=True,
+              groups=None):
+        """
+        Train all heads on one shared TF-IDF featurization
+
+        Args:
+            texts: list of text samples (optional, uses sample data if None)
+            labels: list of overall risk labels ('low', 'moderate', 'high')
+            condition_labels: dict mapping condition name to a list of levels
+                ('none', 'mild', 'moderate', 'high'); derived from keywords if None
+            test_size: proportion of data for testing
+            use_cache: reuse a cached vectorizer and feature matrix for these texts
+            groups: optional group id per sample (e.g. near-duplicate clusters);
+                samples of one group never straddle the train/test split
+
+        Returns:
+            dict with training results and per-head accuracy
+        """
+        if texts is None or labels is None:
+            texts, labels = MentalHealthMLModel.create_sample_dataset()
+
+        if len(texts) != len(labels):
+            raise ValueError("Number of texts must match number of labels")
+        if len(texts) < 10:
+            raise ValueError("Need at least 10 samples for training")
+
+        if condition_labels is None:
+            condition_labels = self._derive_condition_labels(texts)
+        for condition in CONDITIONS:
+            if len(condition_labels.get(condition, [])) != len(texts):
+                raise ValueError(f"Condition labels for '{condition}' must match number of texts")
+
+        targets = {'risk': np.array(labels)}
+        for condition in CONDITIONS:
+            targets[condition] = np.array(condition_labels[condition])
+
+        if use_cache:
+            vectorizer, X, _ = get_feature_cache().get_or_fit(texts, VECTORIZER_PARAMS)
+        else:
+            vectorizer = TfidfVectorizer(**VECTORIZER_PARAMS)
+            X = vectorizer.fit_transform(texts)
+
+        indices = np.arange(len(texts))
+        if groups is not None:
+            if len(groups) != len(texts):
+                raise ValueError("Number of groups must match number of texts")
+            splitter = GroupShuffleSplit(n_splits=1, test_size=test_size, random_state=42)
+            train_idx, test_idx = next(splitter.split(indices, groups=np.asarray(groups)))
+        else:
+            train_idx, test_idx = train_test_split(
+                indices, test_size=test_size, random_state=42, stratify=targets['risk']
+            )
+
+        coef_blocks = []
+        intercept_blocks = []
+        heads = []
+        start = 0
+        for name in ['risk'] + CONDITIONS:
+            classes = RISK_CLASSES if name == 'risk' else CONDITION_LEVELS
+            coef, intercept = self._fit_head(X[train_idx], targets[name][train_idx], classes)
+            coef_blocks.append(coef)
+            intercept_blocks.append(intercept)
+            heads.append((name, start, start + len(classes), classes))
+            start += len(classes)
+
+        fitted = _FittedHeads(vectorizer, np.hstack(coef_blocks), np.concatenate(intercept_blocks), heads)
+
+        # Evaluate every head from one batched prediction
+        outputs = self._predict_heads(fitted, X[test_idx])
+        accuracy = {}
+        for name, _, _, classes in heads:
+            predicted = np.array(classes)[outputs[name].argmax(axis=1)]
+            accuracy[name] = round(accuracy_score(targets[name][test_idx], predicted), 4)
+
+        self._save_model(fitted)
+        # One assignment: predictions in flight keep using the old model
+        self._fitted = fitted
+
+        return {
+            'success': True,
+            'model_type': 'multi_head_logistic_regression',
+            'heads': [name for name, _, _, _ in heads],
+            'accuracy': accuracy,
+            'training_samples': len(train_idx),
+            'test_samples': len(test_idx)
+        }
+
+    @staticmethod
+    def _predict_heads(fitted, X):
+        """Score all heads with one sparse matrix multiply and return per-head probabilities"""
+        scores = np.asarray(X @ fitted.coef) + fitted.intercept
+        return {name: _softmax(scores[:, start:end]) for name, start, end, _ in fitted.heads}
+
+    def predict_batch(self, texts):
+        """
+        Predict overall risk and per-condition levels for multiple texts
+
+        Args:
+            texts: list of strings
+
+        Returns:
+            list of prediction results
+        """
+        # Read the model once so a concurrent retrain cannot swap it mid-prediction
+        fitted = self._fitted
+        if fitted is None:
+            return [{
+                'error': 'Multi-head model not trained. Please train the model first.',
+                'fallback': True,
+                'risk_level': 'unknown'
+            } for _ in texts]
+
+        if not texts:
+            return []
+
+        outputs = self._predict_heads(fitted, fitted.vectorizer.transform(texts))
+
+        results = []
+        for row in range(len(texts)):
+            result = {'conditions': {}}
+            for name, _, _, classes in fitted.heads:
+                probs = outputs[name][row]
+                best = int(probs.argmax())
+                head = {
+                    'level': classes[best],
+                    'confidence': round(float(probs[best]), 4),
+                    'probabilities': {cls: round(float(p), 4) for cls, p in zip(classes, probs)}
+                }
+                if name == 'risk':
+                    result['risk_level'] = head['level']
+                    result['confidence'] = head['confidence']
+                    result['probabilities'] = head['probabilities']
+                else:
+                    result['conditions'][name] = head
+            results.append(result)
+        return results
+
+    def predict(self, text):
+        """Predict overall risk and per-condition levels for one text"""
+        return self.predict_batch([text])[0]
+
+    def get_model_info(self):
+        """Get information about the current model"""
+        fitted = self._fitted
+        return {
+            'is_trained': fitted is not None,
+            'heads': {name: classes for name, _, _, classes in fitted.heads} if fitted else {},
+            'feature_count': int(fitted.coef.shape[0]) if fitted else 0,
+            'model_path': MULTI_HEAD_MODEL_PATH if self.is_trained else None
+        }
+
+
+# Global model instance
+_multi_head_instance = None
+
+
+def get_multi_head_model():
+    """Get or create the global multi-head model instance"""
+    global _multi_head_instance
+    if _multi_head_instance is None:
+        _multi_head_instance = MultiHeadConditionModel()
+    return _multi_head_instance
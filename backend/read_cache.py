@@ -0,0 +1,116 @@
+"""
+Read-Through Cache Module
+
+This module provides a small in-process cache for hot database reads:
+- Values are loaded through a loader function on a miss (read-through)
+- Entries are bounded (least recently used are evicted) and expire after a TTL
+- Writers invalidate keys; a load that overlaps an invalidation is returned
+  but not cached, so a stale read cannot be stored after the write
+- Hits, misses, evictions, expirations and invalidations are counted
+"""
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class ReadThroughCache:
+    """
+    Bounded LRU + TTL read-through cache.
+    """
+
+    def __init__(self, name, max_entries=10000, ttl_s=30.0, copy=None):
+        """
+        Initialize the cache
+
+        Args:
+            name: name shown in statistics
+            max_entries: maximum cached keys (0 disables caching)
+            ttl_s: seconds an entry may be served before it is reloaded
+            copy: optional function applied to values handed out, so callers
+                cannot modify the cached value
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._copy = copy
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every invalidation; a load only fills the cache if it did not move
+        self._epoch = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    def get(self, key, loader):
+        """
+        Get a value, loading and caching it on a miss
+
+        Args:
+            key: cache key
+            loader: function of no arguments returning the value (None is cached too)
+
+        Returns:
+            the cached or loaded value
+        """
+        if self.max_entries <= 0:
+            return loader()
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return self._copy(value) if self._copy and value is not None else value
+                del self._entries[key]
+                self._expirations += 1
+            self._misses += 1
+            epoch = self._epoch
+
+        value = loader()
+
+        with self._lock:
+            if self._epoch == epoch:
+                self._entries[key] = (value, time.monotonic() + self.ttl_s)
+                self._entries.move_to_end(key)
+                if len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._evictions += 1
+        return self._copy(value) if self._copy and value is not None else value
+
+    def invalidate(self, key):
+        """Drop a key; loads already in flight will not be cached"""
+        with self._lock:
+            self._epoch += 1
+            self._invalidations += 1
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+
+    def get_stats(self):
+        """Get hit ratio and entry counters"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'name': self.name,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / lookups, 4) if lookups else 0.0,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'invalidations': self._invalidations,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_s': self.ttl_s
+            }
@@ -0,0 +1,112 @@
+"""
+User Report Module
+
+This module builds the user report served by /api/report/<user_id> and
+written in bulk by generate_reports.py:
+- Message and assessment counts and the latest risk come from the
+  trigger-maintained user_report_stats row, so the cost of a report does
+  not grow with a user's history
+- The emotion/topic summary comes from the (cached) chat analysis
+- Recommendations are built once per combination of the signals they
+  depend on
+"""
+from datetime import datetime
+from functools import lru_cache
+
+from database import get_user, get_chat_analysis, get_user_assessments, get_user_report_stats
+
+DEFAULT_RECOMMENDATIONS = (
+    'Continue practicing self-awareness',
+    'Maintain healthy lifestyle habits',
+    'Build and nurture supportive relationships'
+)
+
+RECENT_ASSESSMENTS = 3
+
+
+@lru_cache(maxsize=None)
+def _recommendations(anxious, sad, stressed, elevated_risk):
+    """Recommendations for one combination of report signals"""
+    recommendations = []
+    if anxious:
+        recommendations.append('Practice daily relaxation techniques such as deep breathing')
+        recommendations.append('Consider limiting caffeine intake')
+    if sad:
+        recommendations.append('Engage in activities that bring you joy')
+        recommendations.append('Maintain social connections')
+    if stressed:
+        recommendations.append('Break tasks into smaller manageable steps')
+        recommendations.append('Schedule regular breaks')
+    if elevated_risk:
+        recommendations.insert(0, 'Consider speaking with a mental health professional')
+    return tuple(recommendations) or DEFAULT_RECOMMENDATIONS
+
+
+def get_report_recommendations(analysis):
+    """
+    Get recommendations for a chat analysis
+
+    Args:
+        analysis: dict from get_chat_analysis, or None
+
+    Returns:
+        list of recommendation strings
+    """
+    if not analysis:
+        return list(DEFAULT_RECOMMENDATIONS)
+    emotions = analysis.get('detected_emotions', [])
+    return list(_recommendations(
+        'anxious' in emotions,
+        'sad' in emotions or 'depressed' in emotions,
+        'stressed' in emotions,
+        analysis.get('risk_level', 'low') in ('moderate', 'high')
+    ))
+
+
+def build_user_report(user_id):
+    """
+    Build a user's report
+
+    Args:
+        user_id: user to report on
+
+    Returns:
+        report dict, or None if the user does not exist
+    """
+    user = get_user(user_id)
+    if not user:
+        return None
+
+    analysis = get_chat_analysis(user_id)
+    stats = get_user_report_stats(user_id)
+    assessments = get_user_assessments(user_id, limit=RECENT_ASSESSMENTS) if stats['assessment_count'] else []
+
+    return {
+        'user': {
+            'id': user['id'],
+            'name': user['name'],
+            'email': user.get('email'),
+            'age': user.get('age')
+        },
+        'summary': {
+            'total_messages': stats['user_message_count'],
+            'total_assessments': stats['assessment_count'],
+            'first_message_at': stats['first_message_at'],
+            'last_message_at': stats['last_message_at'],
+            'latest_assessment': {
+                'id': stats['latest_assessment_id'],
+                'assessment_type': stats['latest_assessment_type'],
+                'risk_level': stats['latest_risk_level'],
+                'created_at': stats['latest_assessment_at']
+            } if stats['latest_assessment_id'] else None,
+            'detected_emotions': analysis.get('detected_emotions', []) if analysis else [],
+            'topics_discussed': analysis.get('topics', []) if analysis else [],
+            'emotion_counts': analysis.get('emotion_counts', {}) if analysis else {},
+            'topic_counts': analysis.get('topic_counts', {}) if analysis else {},
+            'overall_sentiment': analysis.get('overall_sentiment', 'neutral') if analysis else 'neutral',
+            'risk_level': analysis.get('risk_level', 'low') if analysis else 'low'
+        },
+        'recent_assessments': assessments,
+        'recommendations': get_report_recommendations(analysis),
+        'generated_at': datetime.now().isoformat()
+    }
@@ -0,0 +1,143 @@
+"""
+Deadline-Bounded Stage Runner Module
+
+This module runs the independent analyzers of one request concurrently on a
+shared thread pool:
+- Every stage starts at once, so latency is the slowest stage instead of the sum
+- Required stages are always waited for
+- Optional stages that miss the request deadline are dropped and reported as missing
+- A stage may emit several results (e.g. lexicon analysis, then a model prediction
+  that reuses it); each result is timed on its own
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class Stage:
+    """One unit of work: a callable that emits results for its declared keys"""
+
+    def __init__(self, keys, fn, required=False):
+        """
+        Args:
+            keys: result keys the stage produces, in the order it emits them
+            fn: callable receiving an emit(key, value) function
+            required: wait for the stage even past the deadline (errors propagate)
+        """
+        self.keys = [keys] if isinstance(keys, str) else list(keys)
+        self.fn = fn
+        self.required = required
+
+
+class _Collector:
+    """Thread-safe sink for the results of one run; closes at the deadline"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._closed = False
+        self.outputs = {}
+        self.timings_ms = {}
+
+    def emitter(self, required):
+        last = [time.perf_counter()]
+
+        def emit(key, value):
+            now = time.perf_counter()
+            with self._lock:
+                # Late optional results are discarded; the response is already built
+                if self._closed and not required:
+                    return
+                self.outputs[key] = value
+                self.timings_ms[key] = round((now - last[0]) * 1000, 3)
+            last[0] = now
+
+        return emit
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            return dict(self.outputs), dict(self.timings_ms)
+
+
+class StageRunner:
+    """
+    Runs request stages concurrently under a deadline on a shared executor.
+    """
+
+    def __init__(self, max_workers=8):
+        """
+        Initialize the runner
+
+        Args:
+            max_workers: threads in the shared pool
+        """
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+
+    def _get_executor(self):
+        """Create the pool lazily (and again after a fork, whose threads are gone)"""
+        if self._executor is None or self._executor_pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._executor_pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix='analysis'
+                    )
+                    self._executor_pid = os.getpid()
+        return self._executor
+
+    def run(self, stages, deadline_ms):
+        """
+        Run stages concurrently
+
+        Args:
+            stages: list of Stage
+            deadline_ms: time budget for optional stages, from the start of the run
+
+        Returns:
+            dict with 'outputs' (key -> value), 'timings_ms' (key -> ms),
+            'missing' (keys of optional stages that were late or failed),
+            'errors' (key -> message) and 'total_ms'
+        """
+        start = time.perf_counter()
+        executor = self._get_executor()
+        collector = _Collector()
+
+        futures = {}
+        for stage in stages:
+            future = executor.submit(stage.fn, collector.emitter(stage.required))
+            futures[future] = stage
+
+        required = [f for f, stage in futures.items() if stage.required]
+        optional = [f for f, stage in futures.items() if not stage.required]
+
+        if optional:
+            wait(optional, timeout=max(0.0, deadline_ms / 1000.0 - (time.perf_counter() - start)))
+        if required:
+            wait(required)
+            for future in required:
+                # Required stage failures fail the request, as before
+                future.result()
+
+        outputs, timings_ms = collector.close()
+
+        missing = []
+        errors = {}
+        for future, stage in futures.items():
+            if stage.required:
+                continue
+            error = future.exception() if future.done() else None
+            for key in stage.keys:
+                if key not in outputs:
+                    missing.append(key)
+                    errors[key] = str(error) if error is not None else 'deadline exceeded'
+
+        return {
+            'outputs': outputs,
+            'timings_ms': timings_ms,
+            'missing': missing,
+            'errors': errors,
+            'total_ms': round((time.perf_counter() - start) * 1000, 3)
+        }
@@ -0,0 +1,58 @@
+"""
+Shared test setup
+
+The backend modules use flat imports and read their configuration from the
+environment at import time, so the backend directory is put on sys.path and
+the database and model paths are pointed at a scratch directory before any
+test module imports them.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRATCH_DIR = tempfile.mkdtemp(prefix='mental-health-tests-')
+
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault('DATABASE_PATH', os.path.join(SCRATCH_DIR, 'test.db'))
+os.environ.setdefault('MODEL_DIR', os.path.join(SCRATCH_DIR, 'models'))
+
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    """
+    Point the database module at an empty file for one test
+
+    The schema is not created; call init_database() (or build an older
+    schema first to test migrations). Read caches start empty.
+    """
+    import database
+
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'test.db'))
+    monkeypatch.setattr(database, '_cache_seq', None)
+    monkeypatch.setattr(database, '_cache_next_sync', 0.0)
+    for cache in database._read_caches.values():
+        cache.clear()
+    yield database
+    database.close_db_connection()
+    for cache in database._read_caches.values():
+        cache.clear()
+
+
+@pytest.fixture
+def db(fresh_db):
+    """An empty database with the current schema"""
+    fresh_db.init_database()
+    return fresh_db
+
+
+@pytest.fixture
+def api(db, monkeypatch):
+    """Flask test client on an empty database, with ADMIN_API_TOKEN 'secret'"""
+    import app as app_module
+
+    monkeypatch.setattr(app_module, 'ADMIN_API_TOKEN', 'secret')
+    return app_module.app.test_client()
+
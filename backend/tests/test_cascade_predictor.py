@@ -0,0 +1,60 @@
+"""Tests for the lexicon/model cascade"""
+from cascade_predictor import CascadePredictor
+
+
+class StubModel:
+    """Stands in for MentalHealthMLModel: always predicts 'moderate'"""
+    is_trained = True
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, text):
+        self.calls += 1
+        return {'risk_level': 'moderate', 'confidence': 0.6}
+
+    def predict_batch(self, texts):
+        return [self.predict(text) for text in texts]
+
+
+def test_crisis_text_is_decided_by_lexicon():
+    model = StubModel()
+    cascade = CascadePredictor(ml_model=model)
+    result = cascade.predict("I want to kill myself, I can't go on")
+    assert result['decided_by'] == 'lexicon'
+    assert result['risk_level'] == 'high'
+    assert model.calls == 0
+
+
+def test_ambiguous_text_goes_to_model_and_is_counted():
+    cascade = CascadePredictor(ml_model=StubModel())
+    result = cascade.predict('I went to the store and then came home')
+    assert result['decided_by'] == 'model'
+    stats = cascade.get_stats()
+    assert stats['total'] == 1
+    assert stats['model'] == 1
+
+
+def test_evaluate_leaves_live_counters_untouched():
+    cascade = CascadePredictor(ml_model=StubModel())
+    cascade.predict('I went to the store and then came home')
+    before = cascade.get_stats()
+
+    report = cascade.evaluate(
+        ['I went to the store', "I want to kill myself, I can't go on"],
+        ['moderate', 'high']
+    )
+
+    assert report['samples'] == 2
+    assert report['cascade_accuracy'] == 1.0
+    assert cascade.get_stats() == before
+
+
+def test_precomputed_model_prediction_replaces_model_call():
+    model = StubModel()
+    cascade = CascadePredictor(ml_model=model)
+    result = cascade.predict('I went to the store and then came home',
+                             model_prediction={'risk_level': 'low', 'confidence': 0.7})
+    assert result['decided_by'] == 'model'
+    assert result['risk_level'] == 'low'
+    assert model.calls == 0
@@ -0,0 +1,55 @@
+"""Tests for keyset-paginated chat history"""
+import pytest
+
+
+@pytest.fixture
+def history(db):
+    user_id = db.create_user('Ann')
+    other_id = db.create_user('Bo')
+    ids = []
+    for i in range(23):
+        ids.append(db.save_chat_message(user_id, 'user', f'message {i}'))
+        # Interleaved messages of another user must not leak into the pages
+        db.save_chat_message(other_id, 'user', f'other {i}')
+    return db, user_id, ids
+
+
+def test_paging_backwards_visits_every_message_once(history):
+    db, user_id, ids = history
+    seen = []
+    page = db.get_chat_history_page(user_id, limit=5)
+    seen = [m['id'] for m in page['messages']] + seen
+    while page['has_more']:
+        page = db.get_chat_history_page(user_id, limit=5, before=page['cursors']['before'])
+        seen = [m['id'] for m in page['messages']] + seen
+
+    assert seen == ids
+
+
+def test_paging_forwards_visits_every_message_once(history):
+    db, user_id, ids = history
+    seen = []
+    page = {'has_more': True, 'cursors': {'after': 0}}
+    while page['has_more']:
+        page = db.get_chat_history_page(user_id, limit=4, after=page['cursors']['after'])
+        seen += [m['id'] for m in page['messages']]
+
+    assert seen == ids
+
+
+def test_new_messages_do_not_shift_older_pages(history):
+    db, user_id, ids = history
+    first = db.get_chat_history_page(user_id, limit=5)
+    db.save_chat_message(user_id, 'user', 'arrived while paging')
+    second = db.get_chat_history_page(user_id, limit=5, before=first['cursors']['before'])
+
+    assert [m['id'] for m in second['messages']] == ids[-10:-5]
+    newer = db.get_chat_history_page(user_id, limit=5, after=first['cursors']['after'])
+    assert [m['content'] for m in newer['messages']] == ['arrived while paging']
+    assert not newer['has_more']
+
+
+def test_before_and_after_together_are_rejected(history):
+    db, user_id, _ = history
+    with pytest.raises(ValueError):
+        db.get_chat_history(user_id, before=10, after=1)
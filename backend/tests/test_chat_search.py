@@ -0,0 +1,83 @@
+"""Tests for full-text chat search"""
+import pytest
+
+import app as app_module
+
+ADMIN_HEADERS = {'Authorization': 'Bearer secret'}
+
+
+@pytest.fixture
+def corpus(db):
+    ann = db.create_user('Ann')
+    bo = db.create_user('Bo')
+    ids = []
+    for i in range(17):
+        # Varying lengths give varying BM25 ranks, with ties among equal texts
+        text = 'sleep ' + 'badly ' * (i % 4) + f'night {i}'
+        ids.append(db.save_chat_message(ann if i % 3 else bo, 'user', text))
+    db.save_chat_message(ann, 'user', 'work deadlines again')
+    return db, ann, bo, ids
+
+
+def _walk(db, **kwargs):
+    seen = []
+    cursor = None
+    while True:
+        page = db.search_chat_messages('sleep', limit=4, cursor=cursor, **kwargs)
+        seen += page['results']
+        if not page['has_more']:
+            return seen
+        cursor = page['next_cursor']
+
+
+def test_relevance_pages_are_continuous(corpus):
+    db, _, _, ids = corpus
+    seen = _walk(db, sort='relevance')
+
+    assert sorted(r['id'] for r in seen) == ids
+    ranks = [(r['rank'], r['id']) for r in seen]
+    assert ranks == sorted(ranks)
+
+
+def test_recent_pages_are_continuous(corpus):
+    db, _, _, ids = corpus
+    assert [r['id'] for r in _walk(db, sort='recent')] == ids[::-1]
+
+
+def test_search_scoped_to_a_user(corpus):
+    db, ann, _, ids = corpus
+    seen = _walk(db, sort='recent', user_id=ann)
+    assert {r['user_id'] for r in seen} == {ann}
+    assert len(seen) == len([i for i in range(17) if i % 3])
+
+
+def test_search_modes_and_snippets(corpus):
+    db, _, _, _ = corpus
+    assert db.search_chat_messages('work deadlines', mode='phrase')['results'][0]['snippet'] == \
+        '**work deadlines** again'
+    assert len(db.search_chat_messages('deadl*')['results']) == 1
+    assert db.search_chat_messages('deadlines work', mode='phrase')['results'] == []
+    # Deleted messages leave the index
+    db.clear_chat_history(corpus[1])
+    assert db.search_chat_messages('deadlines')['results'] == []
+
+
+@pytest.mark.parametrize('query', ['"unterminated', 'content : (', 'nosuchcolumn : x'])
+def test_malformed_raw_query_is_a_value_error(corpus, query):
+    with pytest.raises(ValueError):
+        corpus[0].search_chat_messages(query, mode='raw')
+
+
+def test_search_endpoint(api, corpus):
+    response = api.get('/api/chat/search?q=sleep&sort=recent&limit=5', headers=ADMIN_HEADERS)
+    body = response.get_json()
+    assert response.status_code == 200
+    assert len(body['results']) == 5 and body['next_cursor']
+
+    assert api.get('/api/chat/search?q=sleep').status_code == 401
+    assert api.get('/api/chat/search?q=%22x&mode=raw', headers=ADMIN_HEADERS).status_code == 400
+
+
+def test_search_endpoint_is_disabled_without_configured_token(api, corpus, monkeypatch):
+    monkeypatch.setattr(app_module, 'ADMIN_API_TOKEN', '')
+    assert api.get('/api/chat/search?q=sleep', headers=ADMIN_HEADERS).status_code == 403
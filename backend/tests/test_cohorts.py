@@ -0,0 +1,60 @@
+"""Tests for cohort queries over the chat message tag index"""
+import pytest
+
+import app as app_module
+
+ADMIN_HEADERS = {'Authorization': 'Bearer secret'}
+
+
+@pytest.fixture
+def tagged(db):
+    ann, bo, cy = (db.create_user(name) for name in ('Ann', 'Bo', 'Cy'))
+    for user_id, sentiment, emotions, topics in (
+        (ann, 'high', ['sad'], ['work']),
+        (ann, 'low', ['sad'], ['family']),
+        (bo, 'moderate', ['sad', 'anxious'], ['work']),
+        (cy, 'low', ['happy'], ['work']),
+    ):
+        db.save_chat_message(user_id, 'user', 'text', sentiment=sentiment, emotions=emotions, topics=topics)
+    return db, ann, bo, cy
+
+
+def test_cohort_by_emotion(tagged):
+    db, ann, bo, _ = tagged
+    cohort = db.get_cohort(emotion='sad')
+
+    assert [(u['user_id'], u['matches'], u['max_risk']) for u in cohort['users']] == \
+        [(ann, 2, 'high'), (bo, 1, 'moderate')]
+    assert (cohort['total_users'], cohort['total_matches']) == (2, 3)
+
+
+def test_cohort_filters_combine_on_one_message(tagged):
+    db, ann, bo, _ = tagged
+
+    both = db.get_cohort(emotion='sad', topic='work')
+    assert sorted(u['user_id'] for u in both['users']) == [ann, bo]
+    assert db.get_cohort(emotion='sad', topic='family')['total_matches'] == 1
+    assert [u['user_id'] for u in db.get_cohort(emotion='sad', min_risk='high')['users']] == [ann]
+    assert db.get_cohort(emotion='sad', since='2999-01-01 00:00:00')['users'] == []
+
+
+def test_deleted_messages_leave_the_cohort(tagged):
+    db, ann, bo, _ = tagged
+    db.clear_chat_history(ann)
+    assert [u['user_id'] for u in db.get_cohort(emotion='sad')['users']] == [bo]
+
+
+def test_cohort_endpoint_requires_token(api, tagged):
+    assert api.get('/api/admin/cohorts?emotion=sad').status_code == 401
+    assert api.get('/api/admin/cohorts?emotion=sad',
+                   headers={'Authorization': 'Bearer wrong'}).status_code == 401
+
+    response = api.get('/api/admin/cohorts?emotion=sad&min_risk=moderate', headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    assert response.get_json()['total_users'] == 2
+
+
+def test_cohort_endpoint_is_disabled_without_configured_token(api, tagged, monkeypatch):
+    monkeypatch.setattr(app_module, 'ADMIN_API_TOKEN', None)
+    assert api.get('/api/admin/cohorts?emotion=sad').status_code == 403
+    assert api.get('/api/admin/cohorts?emotion=sad', headers=ADMIN_HEADERS).status_code == 403
@@ -0,0 +1,152 @@
+"""Tests for upgrading a database created by the original schema"""
+import json
+import sqlite3
+
+# Tables as created before schema migrations existed (user_version 0)
+BASELINE_SCHEMA = '''
+CREATE TABLE users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    email TEXT,
+    age INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_active TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE chat_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    sentiment TEXT,
+    emotions TEXT,
+    FOREIGN KEY (user_id) REFERENCES users (id)
+);
+CREATE TABLE assessments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    assessment_type TEXT NOT NULL,
+    scores TEXT,
+    risk_level TEXT,
+    conditions TEXT,
+    recommendations TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users (id)
+);
+CREATE TABLE chat_analysis (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    message_count INTEGER DEFAULT 0,
+    detected_emotions TEXT,
+    topics TEXT,
+    overall_sentiment TEXT,
+    risk_level TEXT,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users (id)
+);
+'''
+
+MESSAGES = [
+    (1, 'user', 'I feel sad and tired today', '2024-01-01 10:00:00', ['sad', 'tired']),
+    (1, 'assistant', 'I am sorry to hear that', '2024-01-01 10:00:01', None),
+    (1, 'user', 'Still sad about work deadlines', '2024-01-02 09:00:00', ['sad']),
+    (2, 'user', 'Feeling anxious before the exam', '2024-01-03 08:00:00', ['anxious']),
+]
+
+
+def _create_baseline(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.executemany('INSERT INTO users (name, email) VALUES (?, ?)',
+                     [('Ann', 'ann@example.com'), ('Bo', 'bo@example.com')])
+    conn.executemany(
+        'INSERT INTO chat_messages (user_id, role, content, timestamp, emotions) VALUES (?, ?, ?, ?, ?)',
+        [(u, r, c, t, json.dumps(e) if e else None) for u, r, c, t, e in MESSAGES]
+    )
+    # An old bug left two analysis rows for user 1; the newest one wins
+    conn.executemany(
+        '''INSERT INTO chat_analysis (user_id, message_count, detected_emotions, topics,
+                                      overall_sentiment, risk_level, updated_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?)''',
+        [(1, 1, '["sad"]', '["work"]', 'negative', 'low', '2024-01-01 10:00:00'),
+         (1, 2, '["sad", "lonely"]', '["work"]', 'negative', 'moderate', '2024-01-02 09:00:00'),
+         (2, 1, '["anxious"]', '[]', 'negative', 'moderate', '2024-01-03 08:00:00')]
+    )
+    conn.executemany(
+        'INSERT INTO assessments (user_id, assessment_type, risk_level, created_at) VALUES (?, ?, ?, ?)',
+        [(1, 'phq9', 'low', '2024-01-01 11:00:00'), (1, 'gad7', 'moderate', '2024-01-02 11:00:00')]
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_baseline_database_is_migrated_in_place(fresh_db):
+    database = fresh_db
+    _create_baseline(database.DB_PATH)
+
+    database.init_database()
+
+    assert database.get_schema_version() == database.MIGRATIONS[-1][0]
+    with database.get_db_connection() as conn:
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        analysis_rows = conn.execute('SELECT user_id, risk_level FROM chat_analysis ORDER BY user_id').fetchall()
+    assert {'idx_chat_messages_user_id', 'idx_chat_analysis_user', 'idx_users_email'} <= indexes
+    assert 'idx_chat_messages_user_timestamp' not in indexes
+    assert [tuple(row) for row in analysis_rows] == [(1, 'moderate'), (2, 'moderate')]
+
+    # Existing rows survive and the derived tables are backfilled from them
+    assert [m['content'] for m in database.get_chat_history(1)] == [m[2] for m in MESSAGES if m[0] == 1]
+    analysis = database.get_chat_analysis(1)
+    assert analysis['emotion_counts']['sad']['count'] == 2
+    assert analysis['emotion_counts']['tired']['count'] == 1
+    assert analysis['emotion_counts']['lonely']['count'] == 1
+    assert analysis['topic_counts']['work']['count'] == 1
+    assert database.get_cohort(emotion='sad')['total_matches'] == 2
+
+    stats = database.get_user_report_stats(1)
+    assert (stats['message_count'], stats['user_message_count'], stats['assessment_count']) == (3, 2, 2)
+    assert stats['latest_assessment_type'] == 'gad7'
+    assert stats['last_message_at'] == '2024-01-02 09:00:00'
+
+    # Old messages become searchable once the backfill has run
+    assert database.get_search_index_status() == {'complete': False, 'pending': 4}
+    assert database.backfill_chat_search(batch_size=2, pause_ms=0) == 4
+    assert database.get_search_index_status()['complete']
+    assert [r['id'] for r in database.search_chat_messages('sad', user_id=1, sort='recent')['results']] == [3, 1]
+
+
+def test_migrations_are_applied_once(fresh_db):
+    database = fresh_db
+    _create_baseline(database.DB_PATH)
+    database.init_database()
+
+    assert database.apply_migrations() == []
+    database.init_database()
+    assert database.get_chat_analysis(1)['emotion_counts']['sad']['count'] == 2
+
+
+def test_new_database_gets_current_schema(db):
+    assert db.get_schema_version() == db.MIGRATIONS[-1][0]
+    user_id = db.create_user('Cy')
+    message_id = db.save_chat_message(user_id, 'user', 'hello there', emotions=['happy'])
+    assert db.get_search_index_status() == {'complete': True, 'pending': 0}
+    assert db.search_chat_messages('hello')['results'][0]['id'] == message_id
+
+
+def test_backfilled_counts_match_live_counting(fresh_db):
+    database = fresh_db
+    _create_baseline(database.DB_PATH)
+    conn = sqlite3.connect(database.DB_PATH)
+    # Emotion lists were stored as detected, so one message may repeat a label
+    conn.execute('''INSERT INTO chat_messages (user_id, role, content, timestamp, emotions)
+                    VALUES (2, 'user', 'so anxious, anxious all day', '2024-01-04 08:00:00',
+                            '["anxious", "anxious"]')''')
+    conn.commit()
+    conn.close()
+
+    database.init_database()
+    assert database.get_chat_analysis(2)['emotion_counts']['anxious']['count'] == 2
+
+    # A live write of the same message counts each emotion once as well
+    database.record_chat_analysis(2, ['anxious', 'anxious'], [], 'moderate')
+    assert database.get_chat_analysis(2)['emotion_counts']['anxious']['count'] == 3
@@ -0,0 +1,98 @@
+"""Tests for near-duplicate clustering, compaction and group-aware splits"""
+import random
+
+import numpy as np
+import pytest
+
+import ml_model
+from dataset_compaction import find_near_duplicate_groups, compact_dataset
+from ml_model import MentalHealthMLModel
+
+WORDS = ('anxious calm tired sleep work family friends lonely hopeful worried exam deadline '
+         'morning night weekend walk music therapy doctor appetite energy focus panic breathe '
+         'cry laugh talk quiet heavy light tense relaxed restless stuck better worse').split()
+
+
+def make_corpus(n_texts=40, seed=1):
+    """Distinct 20-word texts, each followed by two near-duplicate variants"""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(n_texts):
+        words = rng.choices(WORDS, k=20)
+        original = ' '.join(words)
+        texts.append(original)
+        texts.append(original.upper() + '!!')  # Case and punctuation only
+        texts.append(original + ' ' + rng.choice(WORDS))  # One extra word
+    return texts
+
+
+def test_near_duplicates_collapse_to_one_cluster():
+    texts = make_corpus()
+
+    groups = find_near_duplicate_groups(texts, threshold=0.8)
+
+    assert len(set(groups.tolist())) == 40
+    for start in range(0, len(texts), 3):
+        assert groups[start] == groups[start + 1] == groups[start + 2] == start
+    assert len(find_near_duplicate_groups([])) == 0
+
+
+def test_compaction_keeps_one_text_per_cluster():
+    texts = make_corpus()
+    labels = ['low'] * len(texts)
+
+    compact_texts, compact_labels, stats = compact_dataset(texts, labels)
+
+    assert compact_texts == texts[::3]
+    assert compact_labels == ['low'] * 40
+    assert stats == {'input_samples': 120, 'clusters': 40, 'duplicate_clusters': 40,
+                     'conflicting_clusters': 0, 'dropped_clusters': 0, 'output_samples': 40}
+
+
+@pytest.mark.parametrize('policy, expected', [
+    ('majority', ['low', 'high', 'moderate']),
+    ('max_risk', ['high', 'high', 'moderate']),
+    ('drop', ['moderate'])
+])
+def test_label_conflicts_follow_the_policy(policy, expected):
+    texts = make_corpus(n_texts=3)
+    # A majority, a three-way tie (broken towards higher risk) and an agreeing cluster
+    labels = ['low', 'low', 'high',
+              'low', 'moderate', 'high',
+              'moderate', 'moderate', 'moderate']
+
+    compact_texts, compact_labels, stats = compact_dataset(texts, labels, conflict_policy=policy)
+
+    assert compact_labels == expected
+    assert stats['conflicting_clusters'] == 2
+    assert stats['dropped_clusters'] == (2 if policy == 'drop' else 0)
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        compact_dataset(['a'], ['low'], conflict_policy='newest')
+
+
+def test_clusters_never_span_train_and_test(tmp_path, monkeypatch):
+    monkeypatch.setattr(ml_model, 'MODEL_DIR', str(tmp_path))
+    monkeypatch.setattr(ml_model, 'MODEL_PATH', str(tmp_path / 'model.joblib'))
+    monkeypatch.setattr(ml_model, 'VECTORIZER_PATH', str(tmp_path / 'vectorizer.joblib'))
+    splits = []
+
+    class RecordingSplit(ml_model.GroupShuffleSplit):
+        def split(self, X, y=None, groups=None):
+            for train_idx, test_idx in super().split(X, y, groups):
+                splits.append((train_idx, test_idx))
+                yield train_idx, test_idx
+
+    monkeypatch.setattr(ml_model, 'GroupShuffleSplit', RecordingSplit)
+    texts = make_corpus()
+    labels = [('low', 'moderate', 'high')[(i // 3) % 3] for i in range(len(texts))]
+    groups = find_near_duplicate_groups(texts)
+
+    results = MentalHealthMLModel().train(texts, labels, use_cache=False, groups=groups)
+
+    train_idx, test_idx = splits[0]
+    assert results['test_samples'] == len(test_idx) > 0
+    assert not set(groups[train_idx]) & set(groups[test_idx])
+    assert len(np.concatenate([train_idx, test_idx])) == len(texts)
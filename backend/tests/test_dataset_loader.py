@@ -0,0 +1,42 @@
+"""Tests for the chunked dataset loader"""
+import json
+import os
+import tempfile
+
+from dataset_loader import load_dataset
+
+ROWS = [
+    {'text': 'I feel hopeless', 'label': 'High'},
+    {'text': 'Had a nice walk', 'label': 'low'},
+    {'text': 'Had a nice walk', 'label': 'low'},
+    {'text': 'Work is piling up', 'label': 'unknown'},
+    {'text': '   ', 'label': 'moderate'}
+]
+
+
+def _write(name, content):
+    path = os.path.join(tempfile.mkdtemp(), name)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return path
+
+
+def _check(path):
+    texts, labels, stats = load_dataset(path, chunksize=2)
+    assert texts == ['I feel hopeless', 'Had a nice walk']
+    assert labels == ['high', 'low']
+    assert stats['rows_read'] == 5
+    assert (stats['duplicates'], stats['invalid_label'], stats['empty_text']) == (1, 1, 1)
+
+
+def test_jsonl():
+    _check(_write('data.jsonl', ''.join(json.dumps(row) + '\n' for row in ROWS)))
+
+
+def test_json_array():
+    _check(_write('data.json', json.dumps(ROWS)))
+
+
+def test_csv():
+    lines = ['text,label'] + [f"{row['text']},{row['label']}" for row in ROWS]
+    _check(_write('data.csv', '\n'.join(lines) + '\n'))
@@ -0,0 +1,43 @@
+"""Tests for rolling facial emotion aggregation"""
+import pytest
+
+from facial_aggregator import FacialEmotionAggregator
+
+
+@pytest.fixture
+def aggregator():
+    return FacialEmotionAggregator(half_life_s=10)
+
+
+def test_older_frames_decay_by_half_life(aggregator):
+    summary = aggregator.add_frames('s', [['sad', 1.0, 0], ['happy', 1.0, 10_000]])
+
+    # The sad frame is one half-life older than the happy one
+    assert summary['distribution']['happy'] == pytest.approx(1 / 1.5, abs=1e-4)
+    assert summary['distribution']['sad'] == pytest.approx(0.5 / 1.5, abs=1e-4)
+    assert summary['volatility'] == 1.0
+
+
+def test_out_of_order_frame_is_decayed_by_its_age(aggregator):
+    in_order = aggregator.add_frames('a', [['sad', 1.0, 0], ['happy', 1.0, 10_000]])
+    late = aggregator.add_frames('b', [['happy', 1.0, 10_000], ['sad', 1.0, 0]])
+
+    assert late['distribution'] == in_order['distribution']
+    assert late['last_emotion'] == 'happy'
+    assert late['frames'] == 2
+
+
+def test_client_clock_is_anchored_to_first_frame(aggregator):
+    # A client clock far from the server's must not decay away untimestamped frames
+    summary = aggregator.add_frames('s', [['sad', 1.0, 5_000], {'emotion': 'happy'}])
+
+    assert summary['distribution']['sad'] == pytest.approx(0.5, abs=1e-3)
+    assert summary['distribution']['happy'] == pytest.approx(0.5, abs=1e-3)
+
+
+def test_invalid_frames_are_rejected(aggregator):
+    summary = aggregator.add_frames('s', [['bored', 1.0, 0], {'emotion': 'sad', 'confidence': 'x'}, 'sad'])
+
+    assert (summary['accepted'], summary['rejected']) == (0, 3)
+    with pytest.raises(ValueError):
+        aggregator.add_frames('', [])
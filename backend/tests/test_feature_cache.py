@@ -0,0 +1,33 @@
+"""Tests for the on-disk featurized dataset cache"""
+import tempfile
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from feature_cache import FeatureCache
+
+TEXTS = ['I feel anxious about work', 'I feel good about today', 'I feel I cannot sleep']
+PARAMS = {'max_features': 100, 'ngram_range': (1, 2)}
+
+
+def test_second_fit_is_a_cache_hit_with_same_features():
+    cache = FeatureCache(cache_dir=tempfile.mkdtemp())
+    vectorizer, X, hit = cache.get_or_fit(TEXTS, PARAMS)
+    cached_vectorizer, cached_X, cached_hit = cache.get_or_fit(TEXTS, PARAMS)
+
+    assert (hit, cached_hit) == (False, True)
+    assert (X != cached_X).nnz == 0
+    assert (vectorizer.transform(TEXTS) != cached_vectorizer.transform(TEXTS)).nnz == 0
+
+
+def test_save_leaves_callers_vectorizer_intact():
+    cache = FeatureCache(cache_dir=tempfile.mkdtemp())
+    vectorizer = TfidfVectorizer(**PARAMS)
+    X = vectorizer.fit_transform(TEXTS)
+    # Older scikit-learn versions keep the terms dropped by max_df/min_df here
+    vectorizer.stop_words_ = {'feel'}
+
+    cache.save('entry', vectorizer, X)
+    cached_vectorizer, _ = cache.load('entry')
+
+    assert vectorizer.stop_words_ == {'feel'}
+    assert cached_vectorizer.stop_words_ is None
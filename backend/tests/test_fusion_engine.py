@@ -0,0 +1,79 @@
+"""Tests for weighted multimodal fusion"""
+import itertools
+
+import numpy as np
+import pytest
+
+from fusion_engine import FusionEngine, extract_features
+
+NAN = float('nan')
+
+
+def _reference(features):
+    """The original unweighted average over available sources"""
+    scores = [value for value in features if value == value]
+    if not scores:
+        return 'low', 'medium'
+    average = sum(scores) / len(scores)
+    risk = 'high' if average >= 1.5 else 'moderate' if average >= 0.8 else 'low'
+    confidence = ['low', 'medium', 'high'][min(len(scores), 3) - 1]
+    return risk, confidence
+
+
+def _all_feature_rows():
+    return [list(row) for row in itertools.product([NAN, 0, 1, 2], [NAN, 0, 1, 2], [NAN, 0.0, 0.5, 1.0])]
+
+
+def test_default_config_matches_unweighted_average():
+    engine = FusionEngine()
+    for features in _all_feature_rows():
+        fused = engine.score(features)
+        assert (fused['overall_risk'], fused['confidence']) == _reference(features), features
+
+
+def test_batch_scoring_matches_single_scoring():
+    engine = FusionEngine(weights={'questionnaire': 2.0, 'facial': 0.5})
+    rows = _all_feature_rows()
+    missing = np.arange(len(rows)) % 2
+
+    fused = engine.score_batch(rows, missing_counts=missing)
+
+    for i, features in enumerate(rows):
+        single = engine.score(features, missing_count=int(missing[i]))
+        expected = np.nan if single['score'] is None else single['score']
+        assert round(float(fused['score'][i]), 4) == pytest.approx(expected, nan_ok=True)
+        assert fused['overall_risk'][i] == single['overall_risk']
+        assert fused['confidence'][i] == single['confidence']
+
+
+def test_weights_shift_the_fused_score():
+    features = [2, 0, NAN]
+    assert FusionEngine().score(features)['overall_risk'] == 'moderate'
+    assert FusionEngine(weights={'questionnaire': 3.0}).score(features)['score'] == 1.5
+    # A zero weight disables the modality entirely
+    disabled = FusionEngine(weights={'questionnaire': 0.0}).score(features)
+    assert (disabled['score'], disabled['sources']) == (0.0, 1)
+
+
+def test_missing_source_lowers_confidence_one_step():
+    engine = FusionEngine()
+    assert engine.score([1, 1, 1.0])['confidence'] == 'high'
+    assert engine.score([1, 1, 1.0], missing_count=1)['confidence'] == 'medium'
+    assert engine.score([1, NAN, NAN], missing_count=2)['confidence'] == 'low'
+
+
+def test_extract_features_prefers_facial_summary():
+    results = {
+        'questionnaire': {'risk_level': 'high'},
+        'text_analysis': {'risk_level': 'moderate'},
+        'facial_emotion': 'happy',
+        'facial_summary': {'distribution': {'sad': 0.3, 'happy': 0.1, 'neutral': 0.6}}
+    }
+    assert extract_features(results) == pytest.approx([2, 1, 0.75])
+
+
+def test_invalid_config_is_rejected():
+    with pytest.raises(ValueError):
+        FusionEngine(weights={'voice': 1.0})
+    with pytest.raises(ValueError):
+        FusionEngine(weights={'text': -1.0})
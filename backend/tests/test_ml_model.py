@@ -0,0 +1,57 @@
+"""Tests for streaming training, retraining and checkpointed gradient boosting"""
+import json
+
+import pytest
+
+import ml_model
+from ml_model import MentalHealthMLModel
+
+
+@pytest.fixture
+def model(tmp_path, monkeypatch):
+    """An untrained model that saves into a scratch directory"""
+    monkeypatch.setattr(ml_model, 'MODEL_DIR', str(tmp_path))
+    monkeypatch.setattr(ml_model, 'MODEL_PATH', str(tmp_path / 'model.joblib'))
+    monkeypatch.setattr(ml_model, 'VECTORIZER_PATH', str(tmp_path / 'vectorizer.joblib'))
+    return MentalHealthMLModel()
+
+
+def _chunks(texts, labels, size):
+    for i in range(0, len(texts), size):
+        yield texts[i:i + size], labels[i:i + size]
+
+
+def test_streamed_model_can_be_retrained(model, capsys):
+    texts, labels = MentalHealthMLModel.create_sample_dataset()
+
+    results = model.train_streaming(_chunks(texts, labels, 10))
+
+    assert results['model_type'] == 'sgd_streaming'
+    assert results['vectorize_seconds'] >= 0 and results['partial_fit_seconds'] >= 0
+    chunk_lines = [line for line in capsys.readouterr().out.splitlines() if line.startswith('Chunk ')]
+    assert chunk_lines and all('vectorize' in line and 'partial_fit' in line for line in chunk_lines)
+
+    retrained = model.retrain_with_new_data(['I cannot cope with anything anymore'], ['high'])
+
+    assert retrained['success']
+    assert retrained['model_type'] == 'sgd_streaming'
+    assert retrained['training_samples'] >= results['training_samples']
+    assert model.predict('I feel great today')['risk_level'] in model.classes
+
+
+def test_checkpointed_boosting_logs_each_stage(model, tmp_path):
+    texts, labels = MentalHealthMLModel.create_sample_dataset()
+    checkpoint_dir = tmp_path / 'checkpoints'
+
+    model.train(texts, labels, model_type='gradient_boosting', use_cache=False,
+                checkpoint_dir=str(checkpoint_dir), checkpoint_every=25)
+
+    with open(checkpoint_dir / 'training_log.jsonl', encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f]
+    stages = [e for e in entries if e['event'] == 'stage']
+    checkpoints = [e for e in entries if e['event'] == 'checkpoint']
+    assert [e['stage'] for e in stages] == list(range(1, 101))
+    assert [e['stage'] for e in checkpoints] == [25, 50, 75, 100]
+    # Stage times are measured one by one, not spread evenly over a checkpoint
+    assert len({e['seconds'] for e in stages[:25]}) > 1
+    assert not (checkpoint_dir / 'gb_checkpoint.joblib').exists()
@@ -0,0 +1,89 @@
+"""Tests for holdout evaluation metrics and promotion gates"""
+import numpy as np
+import pytest
+
+from model_evaluation import evaluate_model, check_gates
+
+CLASSES = ['high', 'low', 'moderate']
+
+# text -> (true label, predicted probabilities in CLASSES order)
+HOLDOUT = {
+    'text one': ('low', [0.05, 0.9, 0.05]),
+    'text two': ('low', [0.1, 0.7, 0.2]),
+    'text three': ('low', [0.1, 0.3, 0.6]),
+    'text four': ('moderate', [0.1, 0.1, 0.8]),
+    'text five': ('moderate', [0.6, 0.1, 0.3]),
+    'text six': ('high', [0.9, 0.05, 0.05])
+}
+
+
+class _Identity:
+    def transform(self, texts):
+        return list(texts)
+
+
+class _FixedEstimator:
+    classes_ = np.array(CLASSES)
+
+    def predict_proba(self, texts):
+        return np.array([HOLDOUT[text][1] for text in texts])
+
+
+class FixedModel:
+    """Stands in for MentalHealthMLModel with fixed probabilities per text"""
+    is_trained = True
+    model_type = 'fixed'
+    model = _FixedEstimator()
+    vectorizer = _Identity()
+
+    def predict(self, text):
+        return {'risk_level': CLASSES[int(np.argmax(HOLDOUT[text][1]))]}
+
+
+@pytest.fixture
+def results(tmp_path):
+    path = tmp_path / 'holdout.csv'
+    path.write_text('text,label\n' + ''.join(f'{text},{label}\n' for text, (label, _) in HOLDOUT.items()))
+    return evaluate_model(str(path), batch_size=4, chunksize=5, model=FixedModel())
+
+
+def test_quality_metrics(results):
+    assert results['samples'] == 6
+    assert results['accuracy'] == 0.6667
+    assert results['classes'] == CLASSES
+    # Rows are true labels, columns predictions
+    assert results['confusion_matrix'] == [[1, 0, 0], [0, 2, 1], [1, 0, 1]]
+    assert results['per_class'] == {
+        'high': {'precision': 0.5, 'recall': 1.0, 'f1_score': 0.6667, 'support': 1},
+        'low': {'precision': 1.0, 'recall': 0.6667, 'f1_score': 0.8, 'support': 3},
+        'moderate': {'precision': 0.5, 'recall': 0.5, 'f1_score': 0.5, 'support': 2}
+    }
+
+
+def test_calibration(results):
+    calibration = results['calibration']
+    assert calibration['expected_calibration_error'] == 0.3167
+    assert calibration['brier_score'] == 0.325
+    assert calibration['reliability'] == [
+        {'bin': '0.6-0.7', 'count': 2, 'mean_confidence': 0.6, 'accuracy': 0.0},
+        {'bin': '0.7-0.8', 'count': 1, 'mean_confidence': 0.7, 'accuracy': 1.0},
+        {'bin': '0.8-0.9', 'count': 1, 'mean_confidence': 0.8, 'accuracy': 1.0},
+        {'bin': '0.9-1.0', 'count': 2, 'mean_confidence': 0.9, 'accuracy': 1.0}
+    ]
+
+
+def test_speed_is_measured(results):
+    speed = results['speed']
+    assert speed['texts_per_second'] > 0
+    assert 0 < speed['latency_ms']['p50'] <= speed['latency_ms']['p90'] <= speed['latency_ms']['p99']
+
+
+def test_promotion_gates(results):
+    assert check_gates(results, min_accuracy=0.6, max_p99_ms=60_000) == []
+
+    failures = check_gates(results, min_accuracy=0.9, min_throughput=1e12)
+
+    assert failures == [
+        'accuracy 0.6667 < 0.9',
+        f"throughput {results['speed']['texts_per_second']} texts/sec < 1000000000000.0"
+    ]
@@ -0,0 +1,96 @@
+"""Tests for model comparison, successive-halving search and publishing"""
+import random
+
+import joblib
+import pytest
+
+import ml_model
+import model_search
+from ml_model import MentalHealthMLModel
+from model_search import run_model_search, publish_best
+
+REPORT_FIELDS = {
+    'model_type', 'params', 'cv_score', 'accuracy', 'f1_score', 'train_time_s',
+    'batch_latency_ms_per_text', 'single_latency_ms', 'model_size_bytes'
+}
+
+VOCABULARY = {
+    'low': ['calm', 'rested', 'grateful', 'hopeful', 'relaxed', 'content'],
+    'moderate': ['worried', 'tense', 'restless', 'uneasy', 'stressed', 'tired'],
+    'high': ['hopeless', 'worthless', 'desperate', 'trapped', 'empty', 'numb']
+}
+FILLER = ['today', 'work', 'family', 'week', 'morning', 'friends', 'lately', 'again']
+
+
+def make_dataset(per_class=100, seed=0):
+    """Separable synthetic texts: class words plus shared filler"""
+    rng = random.Random(seed)
+    texts, labels = [], []
+    for label, words in VOCABULARY.items():
+        for _ in range(per_class):
+            texts.append(' '.join(rng.sample(words, 3) + rng.sample(FILLER, 3)))
+            labels.append(label)
+    return texts, labels
+
+
+@pytest.fixture
+def model(tmp_path, monkeypatch):
+    """An untrained model that saves into a scratch directory"""
+    monkeypatch.setattr(ml_model, 'MODEL_DIR', str(tmp_path))
+    monkeypatch.setattr(ml_model, 'MODEL_PATH', str(tmp_path / 'model.joblib'))
+    monkeypatch.setattr(ml_model, 'VECTORIZER_PATH', str(tmp_path / 'vectorizer.joblib'))
+    return MentalHealthMLModel()
+
+
+def test_search_uses_successive_halving_and_reports_each_candidate(monkeypatch):
+    searches = []
+
+    class RecordingHalvingSearch(model_search.HalvingGridSearchCV):
+        def fit(self, *args, **kwargs):
+            searches.append(self)
+            return super().fit(*args, **kwargs)
+
+    monkeypatch.setattr(model_search, 'HalvingGridSearchCV', RecordingHalvingSearch)
+    texts, labels = make_dataset()
+
+    result = run_model_search(texts, labels, mode='search', model_types=['logistic_regression'],
+                              n_jobs=1, use_cache=False)
+
+    assert len(searches) == 1 and searches[0].n_iterations_ > 1
+    assert result['training_samples'] == 240 and result['test_samples'] == 60
+    candidate = result['candidates'][0]
+    assert set(candidate) == REPORT_FIELDS
+    assert candidate['params']['C'] in (0.1, 1.0, 10.0)
+    assert candidate['cv_score'] is not None
+    assert candidate['accuracy'] > 0.9
+    assert candidate['train_time_s'] > 0 and candidate['model_size_bytes'] > 0
+
+
+def test_compare_publishes_the_best_candidate(model):
+    texts, labels = make_dataset(per_class=30)
+
+    result = run_model_search(texts, labels, mode='compare',
+                              model_types=['logistic_regression', 'random_forest'],
+                              n_jobs=1, use_cache=False)
+
+    candidates = result['candidates']
+    assert {c['model_type'] for c in candidates} == {'logistic_regression', 'random_forest'}
+    assert all(set(c) == REPORT_FIELDS and c['cv_score'] is None for c in candidates)
+    # Best accuracy first, lower single-text latency breaking ties
+    assert [(-c['accuracy'], c['single_latency_ms']) for c in candidates] == \
+        sorted((-c['accuracy'], c['single_latency_ms']) for c in candidates)
+    assert result['best'] == candidates[0]
+
+    publish_best(model, result)
+
+    assert model.model is result['best_estimator']
+    assert model.model_type == result['best']['model_type']
+    saved = joblib.load(ml_model.MODEL_PATH)
+    assert type(saved) is type(result['best_estimator'])
+    assert MentalHealthMLModel().predict('hopeless worthless trapped')['risk_level'] == 'high'
+
+
+def test_unknown_model_type_is_rejected():
+    texts, labels = make_dataset(per_class=10)
+    with pytest.raises(ValueError):
+        run_model_search(texts, labels, model_types=['svm'], use_cache=False)
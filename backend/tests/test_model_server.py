@@ -0,0 +1,116 @@
+"""Tests for the model server wire protocol and sidecar round trip"""
+import os
+import tempfile
+import threading
+
+import pytest
+
+import model_server
+from model_server import (
+    ModelServer, ModelServerClient, MAX_TEXTS_PER_REQUEST,
+    encode_predict_request, decode_predict_request,
+    encode_predict_response, decode_predict_response
+)
+
+
+class _Estimator:
+    def __init__(self, classes):
+        self.classes_ = classes
+
+
+class StubModel:
+    """Stands in for MentalHealthMLModel with fixed classes and probabilities"""
+    is_trained = True
+
+    def __init__(self, classes=('high', 'low', 'moderate'), model_type='stub'):
+        self.classes = list(classes)
+        self.model = _Estimator(list(classes))
+        self.model_type = model_type
+
+    def predict_batch(self, texts):
+        best = self.classes[0]
+        return [{
+            'risk_level': best,
+            'confidence': 0.75,
+            'probabilities': {cls: (0.75 if cls == best else 0.25 / (len(self.classes) - 1))
+                              for cls in self.classes},
+            'model_type': self.model_type
+        } for _ in texts]
+
+    def get_model_info(self):
+        return {'model_type': self.model_type, 'is_trained': True}
+
+
+def test_predict_request_round_trip():
+    texts = ['first', '', 'ünïcödé text ✓']
+    assert decode_predict_request(encode_predict_request(texts)) == texts
+
+
+def test_predict_response_round_trip_with_error_result():
+    classes = ['high', 'low', 'moderate']
+    results = StubModel().predict_batch(['a']) + [{'error': 'boom'}]
+
+    decoded = decode_predict_response(encode_predict_response(results, classes, 'stub'))
+
+    assert decoded[0]['risk_level'] == 'high'
+    assert decoded[0]['confidence'] == 0.75
+    assert decoded[0]['probabilities'] == {'high': 0.75, 'low': 0.125, 'moderate': 0.125}
+    assert decoded[0]['model_type'] == 'stub'
+    assert decoded[1]['error'] == 'boom'
+    assert decoded[1]['fallback'] is True
+
+
+def test_request_count_is_limited():
+    with pytest.raises(ValueError):
+        encode_predict_request([''] * (MAX_TEXTS_PER_REQUEST + 1))
+
+
+@pytest.fixture
+def server():
+    socket_path = os.path.join(tempfile.mkdtemp(), 'model.sock')
+    server = ModelServer(socket_path, model=StubModel(), max_wait_ms=0.5)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_client_server_round_trip(server):
+    client = ModelServerClient(server.socket_path, fallback_factory=lambda: pytest.fail('fell back'))
+
+    results = client.predict_batch(['one', 'two', 'three'])
+
+    assert [result['risk_level'] for result in results] == ['high'] * 3
+    assert client.predict_batch([]) == []
+    assert client.get_model_info()['model_type'] == 'stub'
+
+
+def test_reload_swaps_model_and_classes(server, monkeypatch):
+    monkeypatch.setattr(model_server, 'MentalHealthMLModel',
+                        lambda: StubModel(classes=('low', 'moderate', 'high'), model_type='reloaded'))
+    client = ModelServerClient(server.socket_path, fallback_factory=lambda: pytest.fail('fell back'))
+    old_model = server.model
+
+    client.reload()
+    result = client.predict('text')
+
+    assert server.model is not old_model
+    assert result['risk_level'] == 'low'
+    assert result['model_type'] == 'reloaded'
+
+
+def test_client_splits_oversized_batches(monkeypatch):
+    monkeypatch.setattr(model_server, 'MAX_TEXTS_PER_REQUEST', 2)
+    client = ModelServerClient('/nonexistent.sock')
+    requests = []
+
+    def fake_request(body):
+        texts = decode_predict_request(body)
+        requests.append(len(texts))
+        return encode_predict_response(StubModel().predict_batch(texts), ['high', 'low', 'moderate'], 'stub')
+
+    monkeypatch.setattr(client, '_request', fake_request)
+
+    assert len(client.predict_batch(['a', 'b', 'c', 'd', 'e'])) == 5
+    assert requests == [2, 2, 1]
@@ -0,0 +1,46 @@
+"""Tests for the multi-head condition model"""
+import pytest
+
+import multi_head_model
+from ml_model import MentalHealthMLModel
+from multi_head_model import MultiHeadConditionModel, CONDITIONS
+
+
+@pytest.fixture
+def model(tmp_path, monkeypatch):
+    """An untrained model that saves into a scratch directory"""
+    monkeypatch.setattr(multi_head_model, 'MULTI_HEAD_MODEL_PATH', str(tmp_path / 'multi_head.joblib'))
+    return MultiHeadConditionModel()
+
+
+def test_predicts_every_head(model):
+    assert model.predict('anything')['fallback']
+
+    result = model.train(use_cache=False)
+    prediction = model.predict('I feel hopeless and anxious about everything')
+
+    assert result['heads'] == ['risk'] + CONDITIONS
+    assert prediction['risk_level'] in ('low', 'moderate', 'high')
+    assert set(prediction['conditions']) == set(CONDITIONS)
+    assert MultiHeadConditionModel().get_model_info()['is_trained']
+
+
+def test_retrain_during_prediction_does_not_mix_models(model):
+    texts, labels = MentalHealthMLModel.create_sample_dataset()
+    model.train(texts, labels, use_cache=False)
+    old_vectorizer = model._fitted.vectorizer
+    old_transform = old_vectorizer.transform
+
+    def transform_then_retrain(batch):
+        # A retrain on a different vocabulary finishes while this prediction
+        # is between featurization and scoring
+        X = old_transform(batch)
+        model.train([text + ' extra vocabulary words' for text in texts[:20]] + texts[20:],
+                    labels, use_cache=False)
+        return X
+
+    old_vectorizer.transform = transform_then_retrain
+    prediction = model.predict('I feel sad and alone')
+
+    assert 'error' not in prediction
+    assert model._fitted.vectorizer is not old_vectorizer
@@ -0,0 +1,85 @@
+"""Tests for vectorized questionnaire scoring"""
+import io
+
+import pytest
+
+from mental_health_predictor import MentalHealthPredictor
+
+predictor = MentalHealthPredictor()
+
+
+def test_batch_scores_match_single_scoring():
+    phq9 = [[0] * 9, [1] * 9, [3, 3, 3, 3, 3, 2, 1, 0, 0], [3] * 9]
+    gad7 = [[0] * 7, [2] * 7, [1] * 7, [3] * 7]
+
+    results = predictor.score_questionnaires_batch(phq9, gad7)
+
+    assert [r['scores'] for r in results] == [
+        {'depression': 0, 'anxiety': 0},
+        {'depression': 9, 'anxiety': 14},
+        {'depression': 18, 'anxiety': 7},
+        {'depression': 27, 'anxiety': 21}
+    ]
+    assert [r['risk_level'] for r in results] == ['low', 'moderate', 'high', 'high']
+    for row_phq9, row_gad7, result in zip(phq9, gad7, results):
+        assert predictor.calculate_phq9_score(row_phq9) == (
+            result['scores']['depression'], result['severity']['depression'])
+        assert predictor.calculate_gad7_score(row_gad7) == (
+            result['scores']['anxiety'], result['severity']['anxiety'])
+
+
+@pytest.mark.parametrize('bad_value', ['3', True, 1.5, 2.0, None, 4, -1])
+def test_non_integer_or_out_of_range_answers_invalidate_the_row(bad_value):
+    results = predictor.score_questionnaires_batch(gad7=[[bad_value] + [0] * 6, [1] * 7])
+
+    assert 'error' in results[0]
+    assert results[1]['scores'] == {'anxiety': 7}
+
+
+def test_wrong_shape_is_rejected():
+    with pytest.raises(ValueError):
+        predictor.score_questionnaires_batch(gad7=[[0] * 6])
+    with pytest.raises(ValueError):
+        predictor.score_questionnaires_batch(gad7='0000000')
+
+
+@pytest.mark.parametrize('bad_matrix', [5, 0, {'a': [0] * 7}, [5] * 7, [{'q1': 0}]])
+def test_non_list_matrix_is_a_value_error(bad_matrix):
+    with pytest.raises(ValueError):
+        predictor.score_questionnaires_batch(phq9=[[0] * 9], gad7=bad_matrix)
+
+
+def test_non_list_matrix_is_a_bad_request(api):
+    response = api.post('/api/analyze/questionnaire/batch', json={'phq9': [[0] * 9], 'gad7': 7})
+
+    assert response.status_code == 400
+    assert 'GAD-7' in response.get_json()['error']
+
+
+def test_csv_is_scored_per_row():
+    body = 'id,gad7_1,gad7_2,gad7_3,gad7_4,gad7_5,gad7_6,gad7_7\n' \
+           'a,3,3,3,3,3,3,3\n' \
+           'b,0,0,0,0,0,0,x\n'
+
+    lines = list(predictor.iter_questionnaire_csv(io.StringIO(body)))
+
+    assert lines[0].startswith('id,depression_score')
+    assert lines[1].strip() == 'a,,,21,severe,high,anxiety,'
+    assert lines[2].startswith('b,,,,,,,Responses must be integers')
+
+
+def test_csv_without_questionnaire_columns_fails_before_streaming():
+    with pytest.raises(ValueError):
+        predictor.iter_questionnaire_csv(io.StringIO('id,score\n1,3\n'))
+    with pytest.raises(ValueError):
+        predictor.iter_questionnaire_csv(io.StringIO(''))
+
+
+def test_malformed_csv_row_is_reported_in_band():
+    body = 'gad7_1,gad7_2,gad7_3,gad7_4,gad7_5,gad7_6,gad7_7\n' + '1,1,1,1,1,1,1\n' * 3 + \
+           '1,1,1,1,1,1,1,1,1\n'
+
+    lines = list(predictor.iter_questionnaire_csv(io.StringIO(body), chunk_size=2))
+
+    assert len(lines) == 4
+    assert 'Malformed CSV after row 2' in lines[-1]
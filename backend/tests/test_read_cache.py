@@ -0,0 +1,110 @@
+"""Tests for the read-through cache and its database invalidation"""
+import sqlite3
+import threading
+
+from read_cache import ReadThroughCache
+
+
+class Loader:
+    def __init__(self, value='v'):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def test_hit_after_miss_and_copy_on_read():
+    cache = ReadThroughCache('t', copy=dict)
+    loader = Loader({'a': 1})
+
+    first = cache.get(1, loader)
+    first['a'] = 2
+    assert cache.get(1, loader) == {'a': 1}
+    assert loader.calls == 1
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['misses'], stats['hit_ratio']) == (1, 1, 0.5)
+
+
+def test_lru_eviction_and_ttl_expiry():
+    cache = ReadThroughCache('t', max_entries=2, ttl_s=0)
+    loader = Loader()
+    for key in (1, 2, 3):
+        cache.get(key, loader)
+    assert cache.get_stats()['evictions'] == 1
+    # ttl 0: every entry is already expired on the next read
+    cache.get(3, loader)
+    assert cache.get_stats()['expirations'] == 1
+    assert loader.calls == 4
+
+
+def test_load_overlapping_an_invalidation_is_not_cached():
+    cache = ReadThroughCache('t')
+    loading = threading.Event()
+    resume = threading.Event()
+
+    def slow_loader():
+        loading.set()
+        resume.wait(5)
+        return 'stale'
+
+    thread = threading.Thread(target=lambda: cache.get(1, slow_loader))
+    thread.start()
+    loading.wait(5)
+    cache.invalidate(1)
+    resume.set()
+    thread.join(5)
+
+    assert cache.get(1, Loader('fresh')) == 'fresh'
+
+
+def test_disabled_cache_always_loads():
+    cache = ReadThroughCache('t', max_entries=0)
+    loader = Loader()
+    cache.get(1, loader)
+    cache.get(1, loader)
+    assert loader.calls == 2
+
+
+def test_own_writes_invalidate_immediately(db):
+    user_id = db.create_user('Ann')
+    db.record_chat_analysis(user_id, ['sad'], [], 'low')
+    assert db.get_chat_analysis(user_id)['emotion_counts']['sad']['count'] == 1
+
+    db.record_chat_analysis(user_id, ['sad'], ['work'], 'high')
+    analysis = db.get_chat_analysis(user_id)
+    assert analysis['emotion_counts']['sad']['count'] == 2
+    assert analysis['risk_level'] == 'high'
+
+    # Session writes are visible inside the session and in the cache after it
+    with db.db_session():
+        db.record_chat_analysis(user_id, ['happy'], [], 'low')
+        assert 'happy' in db.get_chat_analysis(user_id)['emotion_counts']
+    assert 'happy' in db.get_chat_analysis(user_id)['emotion_counts']
+
+
+def test_cached_rows_cannot_be_modified_by_callers(db):
+    user_id = db.create_user('Ann')
+    db.get_user(user_id)['name'] = 'Mallory'
+    db.record_chat_analysis(user_id, ['sad'], [], 'low')
+    db.get_chat_analysis(user_id)['emotion_counts']['sad']['count'] = 99
+
+    assert db.get_user(user_id)['name'] == 'Ann'
+    assert db.get_chat_analysis(user_id)['emotion_counts']['sad']['count'] == 1
+
+
+def test_other_workers_writes_are_picked_up_on_sync(db, monkeypatch):
+    monkeypatch.setattr(db, 'READ_CACHE_SYNC_MS', 0)
+    user_id = db.create_user('Ann')
+    assert db.get_user(user_id)['name'] == 'Ann'
+    assert db.get_user(user_id)['name'] == 'Ann'
+
+    # Another process writes through its own connection
+    other = sqlite3.connect(db.DB_PATH)
+    other.execute("UPDATE users SET name = 'Anna' WHERE id = ?", (user_id,))
+    other.commit()
+    other.close()
+
+    assert db.get_user(user_id)['name'] == 'Anna'
+    assert db.get_cache_stats()['caches']['user']['invalidations'] >= 1
@@ -0,0 +1,118 @@
+"""Tests for trigger-maintained report aggregates and bulk report generation"""
+import gzip
+import json
+import random
+
+import pytest
+
+import generate_reports
+from reports import build_user_report
+
+RECOUNT = '''
+    SELECT u.id,
+           (SELECT COUNT(*) FROM chat_messages WHERE user_id = u.id),
+           (SELECT COUNT(*) FROM chat_messages WHERE user_id = u.id AND role = 'user'),
+           (SELECT timestamp FROM chat_messages WHERE user_id = u.id ORDER BY id LIMIT 1),
+           (SELECT timestamp FROM chat_messages WHERE user_id = u.id ORDER BY id DESC LIMIT 1),
+           (SELECT COUNT(*) FROM assessments WHERE user_id = u.id),
+           (SELECT id FROM assessments WHERE user_id = u.id ORDER BY id DESC LIMIT 1),
+           (SELECT risk_level FROM assessments WHERE user_id = u.id ORDER BY id DESC LIMIT 1)
+    FROM users u ORDER BY u.id
+'''
+
+
+def _aggregates(db, user_id):
+    stats = db.get_user_report_stats(user_id)
+    return (user_id, stats['message_count'], stats['user_message_count'], stats['first_message_at'],
+            stats['last_message_at'], stats['assessment_count'], stats['latest_assessment_id'],
+            stats['latest_risk_level'])
+
+
+def test_trigger_aggregates_match_a_recount(db):
+    rng = random.Random(7)
+    users = [db.create_user(f'user {i}') for i in range(6)]
+    for _ in range(300):
+        user_id = rng.choice(users)
+        action = rng.random()
+        if action < 0.6:
+            db.save_chat_message(user_id, rng.choice(['user', 'assistant']), 'text')
+        elif action < 0.85:
+            db.save_assessment(user_id, 'phq9', {}, rng.choice(['low', 'moderate', 'high']))
+        elif action < 0.95:
+            with db.get_db_connection() as conn:
+                conn.execute('''DELETE FROM assessments WHERE id = (
+                                    SELECT id FROM assessments WHERE user_id = ?
+                                    ORDER BY random() LIMIT 1)''', (user_id,))
+                conn.commit()
+        else:
+            db.clear_chat_history(user_id)
+
+    with db.get_db_connection() as conn:
+        expected = [tuple(row) for row in conn.execute(RECOUNT)]
+    assert [_aggregates(db, user_id) for user_id in users] == expected
+
+
+def test_report_uses_aggregates(db):
+    user_id = db.create_user('Ann', email='ann@example.com')
+    db.save_chat_message(user_id, 'user', 'I feel anxious')
+    db.save_chat_message(user_id, 'assistant', 'Tell me more')
+    db.record_chat_analysis(user_id, ['anxious'], ['work'], 'moderate')
+    db.save_assessment(user_id, 'gad7', {}, 'moderate')
+
+    report = build_user_report(user_id)
+
+    assert report['summary']['total_messages'] == 1
+    assert report['summary']['total_assessments'] == 1
+    assert report['summary']['latest_assessment']['assessment_type'] == 'gad7'
+    assert report['summary']['emotion_counts']['anxious']['count'] == 1
+    assert report['recommendations'][0] == 'Consider speaking with a mental health professional'
+    assert build_user_report(user_id + 1) is None
+
+
+class _Result:
+    def __init__(self, pool, value):
+        self.pool = pool
+        self.value = value
+
+    def get(self):
+        self.pool.outstanding -= 1
+        return self.value
+
+
+class CountingPool:
+    """Runs tasks inline and tracks how many were submitted but not collected"""
+
+    def __init__(self):
+        self.outstanding = 0
+        self.max_outstanding = 0
+
+    def apply_async(self, fn, args):
+        self.outstanding += 1
+        self.max_outstanding = max(self.max_outstanding, self.outstanding)
+        return _Result(self, fn(*args))
+
+
+def test_ordered_results_bounds_work_in_flight(db):
+    users = [db.create_user(f'user {i}') for i in range(25)]
+    pool = CountingPool()
+    tasks = generate_reports.batches(db.iter_user_ids(batch_size=4), 3)
+
+    blocks = [block for _, block in generate_reports.ordered_results(pool, tasks, window=2)]
+
+    assert pool.max_outstanding == 2
+    ids = [json.loads(line)['user']['id'] for block in blocks for line in block.splitlines()]
+    assert ids == users
+
+
+@pytest.mark.parametrize('workers', ['1', '2'])
+def test_generate_reports_cli(db, tmp_path, monkeypatch, workers):
+    for i in range(5):
+        db.create_user(f'user {i}')
+    output = tmp_path / 'reports.jsonl.gz'
+    monkeypatch.setattr('sys.argv', ['generate_reports.py', '--output', str(output),
+                                     '--workers', workers, '--batch-size', '2'])
+
+    generate_reports.main()
+
+    with gzip.open(output, 'rt', encoding='utf-8') as f:
+        assert [json.loads(line)['user']['name'] for line in f] == [f'user {i}' for i in range(5)]
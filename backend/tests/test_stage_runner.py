@@ -0,0 +1,86 @@
+"""Tests for deadline-bounded analyzers in /api/analyze/combined"""
+import threading
+import time
+
+import pytest
+
+import app as app_module
+from stage_runner import Stage, StageRunner
+
+REQUEST = {
+    'responses': {'phq9': [1] * 9, 'gad7': [1] * 7},
+    'text': 'I have been feeling sad and tired lately',
+    'facial_emotion': 'sad'
+}
+
+
+@pytest.fixture
+def release():
+    """Event that lets a deliberately slow stage finish once the test is done"""
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+def test_late_optional_stage_is_dropped():
+    runner = StageRunner(max_workers=2)
+    gate = threading.Event()
+
+    run = runner.run([
+        Stage('fast', lambda emit: emit('fast', 1), required=True),
+        Stage(['slow'], lambda emit: gate.wait(5) and emit('slow', 2))
+    ], deadline_ms=50)
+    gate.set()
+
+    assert run['outputs'] == {'fast': 1}
+    assert run['missing'] == ['slow']
+    assert run['errors'] == {'slow': 'deadline exceeded'}
+    assert set(run['timings_ms']) == {'fast'}
+    assert run['total_ms'] < 1000
+
+
+def test_slow_text_analysis_degrades_the_combined_result(api, monkeypatch, release):
+    baseline = api.post('/api/analyze/combined', json=REQUEST).get_json()
+    assert baseline['combined_assessment']['confidence'] == 'high'
+
+    analyze = app_module.text_analyzer.analyze
+
+    def slow_analyze(text):
+        release.wait(5)
+        return analyze(text)
+
+    monkeypatch.setattr(app_module.text_analyzer, 'analyze', slow_analyze)
+    monkeypatch.setattr(app_module, 'COMBINED_ANALYSIS_DEADLINE_MS', 50)
+
+    started = time.perf_counter()
+    response = api.post('/api/analyze/combined', json=REQUEST)
+    elapsed = time.perf_counter() - started
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert elapsed < 2
+    assert 'text_analysis' not in body and 'questionnaire' in body
+    # Questionnaire and facial remain: two sources, lowered one step for the missing one
+    assert body['combined_assessment']['confidence'] == 'low'
+    assert 'text_analysis' in body['combined_assessment']['missing_sources']
+    metadata = body['metadata']
+    assert metadata['deadline_ms'] == 50
+    assert metadata['missing_sources']['text_analysis'] == 'deadline exceeded'
+    assert 'questionnaire' in metadata['timings_ms'] and 'text_analysis' not in metadata['timings_ms']
+    assert metadata['total_ms'] >= 50
+
+
+def test_failed_text_analysis_is_dropped(api, monkeypatch):
+    def broken_analyze(text):
+        raise RuntimeError('analyzer crashed')
+
+    monkeypatch.setattr(app_module.text_analyzer, 'analyze', broken_analyze)
+
+    response = api.post('/api/analyze/combined', json=REQUEST)
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert 'text_analysis' not in body and 'ml_prediction' not in body
+    assert body['combined_assessment']['confidence'] == 'low'
+    assert body['metadata']['missing_sources']['text_analysis'] == 'analyzer crashed'
+    assert 'questionnaire' in body['metadata']['timings_ms']
@@ -21,15 +21,23 @@ Usage:
 
 import argparse
 import sys
-import csv
 import json
 from pathlib import Path
 from ml_model import MentalHealthMLModel
+from multi_head_model import MultiHeadConditionModel
+from model_search import run_model_search, publish_best
+from dataset_compaction import compact_dataset, find_near_duplicate_groups, CONFLICT_POLICIES
+from model_evaluation import evaluate_model, check_gates
+from dataset_loader import load_dataset, iter_dataset_chunks, print_load_stats, LoadStats, DEFAULT_CHUNK_SIZE
 
 
-def load_dataset_from_csv(filepath):
+def load_dataset_from_csv(filepath, chunksize=DEFAULT_CHUNK_SIZE):
     """
-    Load dataset from CSV file.
+    Load dataset from one or more files.
+    
+    Accepts CSV, TSV, JSONL, JSON or Parquet files (optionally gzip-compressed),
+    several paths, or glob patterns for sharded datasets. Labels are
+    validated in bulk and exact duplicates are removed.
     
     Expected CSV format:
     text,label
@@ -38,40 +46,19 @@ def load_dataset_from_csv(filepath):
     "I feel hopeless",high
     
     Args:
-        filepath: Path to CSV file
+        filepath: Path, glob pattern, or list of them
+        chunksize: Rows read per chunk
     
     Returns:
         tuple: (texts, labels)
     """
-    texts = []
-    labels = []
-    
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            
-            # Validate headers
-            if 'text' not in reader.fieldnames or 'label' not in reader.fieldnames:
-                raise ValueError("CSV must have 'text' and 'label' columns")
-            
-            for row in reader:
-                text = row['text'].strip()
-                label = row['label'].strip().lower()
-                
-                # Validate label
-                if label not in ['low', 'moderate', 'high']:
-                    print(f"Warning: Skipping row with invalid label '{label}'. Must be 'low', 'moderate', or 'high'")
-                    continue
-                
-                if text:
-                    texts.append(text)
-                    labels.append(label)
-        
-        print(f"Loaded {len(texts)} samples from {filepath}")
+        texts, labels, stats = load_dataset(filepath, chunksize=chunksize)
+        print_load_stats(stats)
         return texts, labels
     
-    except FileNotFoundError:
-        print(f"Error: File '{filepath}' not found")
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
         sys.exit(1)
     except Exception as e:
         print(f"Error loading dataset: {e}")
@@ -92,11 +79,14 @@ def print_training_results(results):
     print(f"\nModel Type: {results['model_type']}")
     print(f"Training Samples: {results['training_samples']}")
     print(f"Test Samples: {results['test_samples']}")
+    print(f"Feature Cache: {results.get('feature_cache', 'disabled')}")
     print(f"\nPerformance Metrics:")
-    print(f"  Accuracy: {results['accuracy']:.2%}")
-    print(f"  F1 Score: {results['f1_score']:.4f}")
-    print(f"  Cross-validation Mean: {results['cross_val_mean']:.4f}")
-    print(f"  Cross-validation Std: {results['cross_val_std']:.4f}")
+    if results['accuracy'] is not None:
+        print(f"  Accuracy: {results['accuracy']:.2%}")
+        print(f"  F1 Score: {results['f1_score']:.4f}")
+    if results['cross_val_mean'] is not None:
+        print(f"  Cross-validation Mean: {results['cross_val_mean']:.4f}")
+        print(f"  Cross-validation Std: {results['cross_val_std']:.4f}")
     
     print(f"\nPer-class Performance:")
     report = results.get('classification_report', {})
@@ -112,6 +102,64 @@ def print_training_results(results):
     print("\n" + "="*60)
 
 
+def print_search_report(report):
+    """Print a comparison table of model candidates"""
+    print("\n" + "="*60)
+    print(f"MODEL {report['mode'].upper()} REPORT")
+    print("="*60)
+    print(f"Training Samples: {report['training_samples']}")
+    print(f"Test Samples: {report['test_samples']}\n")
+    
+    print(f"{'Model':<22}{'Accuracy':>9}{'Train s':>9}{'Lat ms':>9}{'Size KB':>10}")
+    for candidate in report['candidates']:
+        print(f"{candidate['model_type']:<22}"
+              f"{candidate['accuracy']:>9.2%}"
+              f"{candidate['train_time_s']:>9.3f}"
+              f"{candidate['single_latency_ms']:>9.3f}"
+              f"{candidate['model_size_bytes'] / 1024:>10.1f}")
+        if candidate['params']:
+            print(f"  params: {candidate['params']}")
+    
+    best = report['best']
+    print(f"\nBest: {best['model_type']} ({best['accuracy']:.2%} accuracy)")
+    print("="*60)
+
+
+def print_evaluation(results):
+    """Print a summary of a holdout evaluation"""
+    print("\n" + "="*60)
+    print("MODEL EVALUATION")
+    print("="*60)
+    print(f"Model Type: {results['model_type']}")
+    print(f"Samples: {results['samples']}")
+    print(f"Accuracy: {results['accuracy']:.2%}")
+    
+    print("\nConfusion Matrix (rows = true, columns = predicted):")
+    classes = results['classes']
+    print("  " + "".join(f"{cls:>10}" for cls in classes))
+    for cls, row in zip(classes, results['confusion_matrix']):
+        print(f"  {cls:<8}" + "".join(f"{count:>10}" for count in row[:len(classes)]))
+    
+    print("\nPer-class Performance:")
+    for cls, metrics in results['per_class'].items():
+        print(f"  {cls}: precision {metrics['precision']:.2%}, recall {metrics['recall']:.2%}, "
+              f"support {metrics['support']}")
+    
+    calibration = results['calibration']
+    print(f"\nCalibration: ECE {calibration['expected_calibration_error']:.4f}, "
+          f"Brier {calibration['brier_score']:.4f}")
+    
+    speed = results['speed']
+    latency = speed['latency_ms']
+    print(f"\nThroughput: {speed['texts_per_second']} texts/sec (batch size {speed['batch_size']})")
+    print(f"Latency: p50 {latency['p50']:.3f} ms, p90 {latency['p90']:.3f} ms, p99 {latency['p99']:.3f} ms")
+    memory = results['memory']
+    if memory['artifact_load_mb'] is not None:
+        print(f"Artifact load: {memory['artifact_load_mb']} MB allocated")
+    print(f"Peak RSS: {memory['peak_rss_mb']} MB")
+    print("="*60)
+
+
 def test_model(model, test_texts=None):
     """Test the trained model with example predictions"""
     print("\n" + "="*60)
@@ -163,14 +211,35 @@ Examples:
   
   # Skip testing after training
   python train_model.py --no-test
+  
+  # Long gradient boosting run that checkpoints every 10 stages and resumes if interrupted
+  python train_model.py --data big.csv --model gradient_boosting --checkpoint-dir checkpoints
+  
+  # Stream a large sharded, compressed dataset into an out-of-core model
+  python train_model.py --data 'shards/*.jsonl.gz' --out-of-core
+  
+  # Drop near-duplicate texts before training
+  python train_model.py --data scraped.csv --near-dedup compact --similarity 0.8
+  
+  # Evaluate the saved model on a holdout set and gate on quality and speed
+  python train_model.py --evaluate holdout.csv --eval-output eval.json --min-accuracy 0.8 --max-p99-ms 5
+  
+  # Compare all model types in parallel and publish the best one
+  python train_model.py --data my_dataset.csv --compare
+  
+  # Grid search every model type with successive halving, save a JSON report
+  python train_model.py --data my_dataset.csv --search --report search.json
+  
+  # Train the multi-head model (overall risk + depression/anxiety/stress levels)
+  python train_model.py --data my_dataset.csv --multi-head
 
 Supported model types:
   - logistic_regression (default, fast and interpretable)
   - random_forest (ensemble method, robust)
   - gradient_boosting (high accuracy, slower training)
 
-Dataset Format (CSV):
-  The CSV file must have two columns: 'text' and 'label'
+Dataset Format (CSV, TSV, JSONL, JSON or Parquet, optionally gzip-compressed):
+  The file must have two columns/fields: 'text' and 'label'
   Labels must be: 'low', 'moderate', or 'high'
   
   Example:
@@ -184,7 +253,22 @@ Dataset Format (CSV):
     parser.add_argument(
         '--data', '-d',
         type=str,
-        help='Path to training dataset CSV file (optional, uses sample data if not provided)'
+        nargs='+',
+        help='Training dataset file(s) or glob patterns: CSV, TSV, JSONL, JSON or Parquet, '
+             'optionally .gz (optional, uses sample data if not provided)'
+    )
+    
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help=f'Rows read per chunk (default: {DEFAULT_CHUNK_SIZE})'
+    )
+    
+    parser.add_argument(
+        '--out-of-core',
+        action='store_true',
+        help='Stream --data chunks into an incremental SGD model instead of loading it all'
     )
     
     parser.add_argument(
@@ -215,12 +299,137 @@ Dataset Format (CSV):
         help='Custom texts to test the model with'
     )
     
+    parser.add_argument(
+        '--no-feature-cache',
+        action='store_true',
+        help='Always refit the TF-IDF vectorizer instead of using the feature cache'
+    )
+    
+    parser.add_argument(
+        '--evaluate',
+        type=str,
+        nargs='+',
+        metavar='HOLDOUT',
+        help='Evaluate the saved model on labeled holdout file(s) instead of training'
+    )
+    
+    parser.add_argument(
+        '--eval-output',
+        type=str,
+        help='Write --evaluate results as JSON to this path'
+    )
+    
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=1024,
+        help='Texts per inference batch for --evaluate (default: 1024)'
+    )
+    
+    parser.add_argument('--min-accuracy', type=float, help='Fail --evaluate below this accuracy')
+    parser.add_argument('--min-throughput', type=float, help='Fail --evaluate below this many texts/sec')
+    parser.add_argument('--max-p99-ms', type=float, help='Fail --evaluate above this p99 latency (ms)')
+    
+    parser.add_argument(
+        '--near-dedup',
+        choices=['compact', 'group'],
+        help='Handle near-duplicate texts: keep one per cluster (compact) or '
+             'keep all but never split a cluster across train/test (group)'
+    )
+    
+    parser.add_argument(
+        '--similarity',
+        type=float,
+        default=0.8,
+        help='Estimated Jaccard similarity treated as near-duplicate (default: 0.8)'
+    )
+    
+    parser.add_argument(
+        '--conflict-policy',
+        choices=CONFLICT_POLICIES,
+        default='majority',
+        help='Label for a compacted cluster with mixed labels (default: majority)'
+    )
+    
+    parser.add_argument(
+        '--checkpoint-dir',
+        type=str,
+        help='Checkpoint gradient boosting runs here and resume interrupted runs'
+    )
+    
+    parser.add_argument(
+        '--checkpoint-every',
+        type=int,
+        default=10,
+        help='Boosting stages between checkpoints (default: 10)'
+    )
+    
+    parser.add_argument(
+        '--early-stopping-patience',
+        type=int,
+        help='Stop after this many checkpoints without validation loss improvement'
+    )
+    
+    parser.add_argument(
+        '--compare',
+        action='store_true',
+        help='Compare all model types with default parameters in parallel'
+    )
+    
+    parser.add_argument(
+        '--search',
+        action='store_true',
+        help='Grid search every model type (successive halving) in parallel'
+    )
+    
+    parser.add_argument(
+        '--report',
+        type=str,
+        help='Write the --compare/--search report as JSON to this path'
+    )
+    
+    parser.add_argument(
+        '--no-publish',
+        action='store_true',
+        help='Do not save the best --compare/--search candidate as the active model'
+    )
+    
+    parser.add_argument(
+        '--multi-head',
+        action='store_true',
+        help='Also train the multi-head condition model on the same data'
+    )
+    
     args = parser.parse_args()
     
     print("="*60)
     print("MENTAL HEALTH RISK PREDICTION - MODEL TRAINING")
     print("="*60)
     
+    if args.evaluate:
+        print(f"\nEvaluating saved model on: {', '.join(args.evaluate)}")
+        try:
+            results = evaluate_model(args.evaluate, batch_size=args.batch_size, chunksize=args.chunk_size)
+        except Exception as e:
+            print(f"\n❌ Evaluation failed: {e}")
+            sys.exit(1)
+        
+        failures = check_gates(results, args.min_accuracy, args.min_throughput, args.max_p99_ms)
+        results['gates'] = {'passed': not failures, 'failures': failures}
+        print_evaluation(results)
+        
+        if args.eval_output:
+            with open(args.eval_output, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            print(f"Results written to {args.eval_output}")
+        
+        if failures:
+            print("\n❌ Promotion gates failed:")
+            for failure in failures:
+                print(f"  - {failure}")
+            sys.exit(2)
+        return
+    
     # Initialize model
     print("\nInitializing model...")
     model = MentalHealthMLModel()
@@ -229,9 +438,26 @@ Dataset Format (CSV):
     texts = None
     labels = None
     
+    if args.data and args.out_of_core:
+        print(f"\nStreaming dataset from: {', '.join(args.data)}")
+        stats = LoadStats()
+        try:
+            results = model.train_streaming(
+                iter_dataset_chunks(args.data, chunksize=args.chunk_size, stats=stats),
+                test_size=args.test_size
+            )
+        except Exception as e:
+            print(f"\n❌ Training failed with error: {e}")
+            sys.exit(1)
+        print_load_stats(stats.to_dict())
+        print_training_results(results)
+        if not args.no_test:
+            test_model(model, args.test_texts)
+        return
+    
     if args.data:
-        print(f"\nLoading dataset from: {args.data}")
-        texts, labels = load_dataset_from_csv(args.data)
+        print(f"\nLoading dataset from: {', '.join(args.data)}")
+        texts, labels = load_dataset_from_csv(args.data, chunksize=args.chunk_size)
         
         if len(texts) < 10:
             print("Error: Dataset too small. Need at least 10 samples for training.")
@@ -252,6 +478,49 @@ Dataset Format (CSV):
         print("\nNo dataset provided. Using built-in sample dataset...")
         print("(Use --data <file.csv> to train with your own data)")
     
+    groups = None
+    if args.near_dedup and texts is not None:
+        print(f"\nFinding near-duplicates (similarity >= {args.similarity})...")
+        if args.near_dedup == 'compact':
+            texts, labels, compaction = compact_dataset(
+                texts, labels, args.similarity, args.conflict_policy
+            )
+            print(f"  {compaction['input_samples']} samples -> {compaction['output_samples']} "
+                  f"({compaction['duplicate_clusters']} duplicate clusters, "
+                  f"{compaction['conflicting_clusters']} with conflicting labels, "
+                  f"{compaction['dropped_clusters']} dropped)")
+            if len(texts) < 10:
+                print("Error: Dataset too small after compaction. Need at least 10 samples.")
+                sys.exit(1)
+        else:
+            groups = find_near_duplicate_groups(texts, args.similarity)
+            print(f"  {len(set(groups.tolist()))} groups over {len(texts)} samples")
+    
+    if args.compare or args.search:
+        if texts is None:
+            texts, labels = model.create_sample_dataset()
+        mode = 'search' if args.search else 'compare'
+        print(f"\nRunning model {mode} across all cores...")
+        report = run_model_search(
+            texts, labels,
+            mode=mode,
+            test_size=args.test_size,
+            use_cache=not args.no_feature_cache,
+            groups=groups
+        )
+        print_search_report(report)
+        
+        if args.report:
+            public = {k: v for k, v in report.items() if k not in ('vectorizer', 'best_estimator')}
+            with open(args.report, 'w', encoding='utf-8') as f:
+                json.dump(public, f, indent=2, default=str)
+            print(f"Report written to {args.report}")
+        
+        if not args.no_publish:
+            publish_best(model, report)
+            print(f"\n✅ Published {report['best']['model_type']} as the active model")
+        return
+    
     # Train model
     print(f"\nTraining {args.model} model...")
     print("This may take a few moments...\n")
@@ -261,7 +530,12 @@ Dataset Format (CSV):
             texts=texts,
             labels=labels,
             model_type=args.model,
-            test_size=args.test_size
+            test_size=args.test_size,
+            use_cache=not args.no_feature_cache,
+            checkpoint_dir=args.checkpoint_dir,
+            checkpoint_every=args.checkpoint_every,
+            early_stopping_patience=args.early_stopping_patience,
+            groups=groups
         )
         
         # Print results
@@ -271,6 +545,19 @@ Dataset Format (CSV):
         if not args.no_test:
             test_model(model, args.test_texts)
         
+        if args.multi_head:
+            print("\nTraining multi-head condition model...")
+            multi_head_results = MultiHeadConditionModel().train(
+                texts=texts,
+                labels=labels,
+                test_size=args.test_size,
+                use_cache=not args.no_feature_cache,
+                groups=groups
+            )
+            print("Per-head accuracy:")
+            for head, accuracy in multi_head_results['accuracy'].items():
+                print(f"  {head}: {accuracy:.2%}")
+        
         print("\n✅ Model saved successfully!")
         print(f"Model location: {Path('models/mental_health_model.joblib').absolute()}")
         print("\nYou can now use this model via the API endpoints:")
@@ -0,0 +1,191 @@
+"""
+Write-Behind Module for Database Writes
+
+This module funnels writes through a single writer thread per process that
+commits them in groups:
+- Callers submit a unit of work (a function making database calls) to a queue
+- The writer drains up to a maximum batch or waits a few milliseconds, then
+  runs the whole group in one transaction with one commit
+- Each job runs in its own SAVEPOINT, so one failing job does not undo the others
+- Callers get a Future that resolves after the group has committed
+- The queue is flushed at interpreter exit; it is recreated after a fork
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from database import db_session, get_db_connection
+
+WRITE_BEHIND_MAX_BATCH = int(os.environ.get('WRITE_BEHIND_MAX_BATCH', '256'))
+WRITE_BEHIND_MAX_WAIT_MS = float(os.environ.get('WRITE_BEHIND_MAX_WAIT_MS', '1'))
+
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """
+    Single writer thread that group-commits queued units of work.
+    """
+
+    def __init__(self, max_batch=WRITE_BEHIND_MAX_BATCH, max_wait_ms=WRITE_BEHIND_MAX_WAIT_MS):
+        """
+        Initialize the queue
+
+        Args:
+            max_batch: maximum jobs committed together
+            max_wait_ms: how long the writer waits for more jobs after the first one
+        """
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+        self._atexit_registered = False
+
+        self._jobs = 0
+        self._failed = 0
+        self._batches = 0
+        self._largest_batch = 0
+
+    def _ensure_worker(self):
+        """Start the writer thread lazily (and again after a fork)"""
+        if self._worker is not None and self._worker.is_alive() and self._worker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive() or self._worker_pid != os.getpid():
+                if self._worker_pid != os.getpid():
+                    # Jobs copied from the parent belong to the parent
+                    self._queue = queue.Queue()
+                self._worker = threading.Thread(target=self._run, name='write-behind', daemon=True)
+                self._worker_pid = os.getpid()
+                self._worker.start()
+                if not self._atexit_registered:
+                    atexit.register(self.close)
+                    self._atexit_registered = True
+
+    def submit(self, fn):
+        """
+        Queue a unit of work
+
+        Args:
+            fn: callable making database calls; it runs on the writer thread
+                inside the group's transaction
+
+        Returns:
+            Future resolving to fn's return value once the group has committed
+        """
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((fn, future))
+        return future
+
+    def flush(self, timeout=None):
+        """Wait until every job queued so far has been committed"""
+        if self._worker is None or self._worker_pid != os.getpid() or not self._worker.is_alive():
+            return
+        self.submit(lambda: None).result(timeout=timeout)
+
+    def close(self, timeout=10.0):
+        """Flush pending jobs and stop the writer thread"""
+        worker = self._worker
+        if worker is None or self._worker_pid != os.getpid() or not worker.is_alive():
+            return
+        self._queue.put(_STOP)
+        worker.join(timeout)
+
+    def _collect(self):
+        """Block for the first job, then gather more until the batch is full or the wait expires"""
+        first = self._queue.get()
+        if first is _STOP:
+            return None, True
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        """Writer loop: one transaction and commit per batch"""
+        while True:
+            batch, stop = self._collect()
+            if batch:
+                self._write(batch)
+            if stop:
+                return
+
+    def _write(self, batch):
+        """Run a batch of jobs in one transaction, isolating each in a savepoint"""
+        outcomes = []
+        try:
+            with db_session():
+                with get_db_connection() as conn:
+                    for fn, future in batch:
+                        conn.execute('SAVEPOINT write_behind_job')
+                        try:
+                            result = fn()
+                            conn.execute('RELEASE write_behind_job')
+                            outcomes.append((future, result, None))
+                        except Exception as e:
+                            conn.execute('ROLLBACK TO write_behind_job')
+                            conn.execute('RELEASE write_behind_job')
+                            outcomes.append((future, None, e))
+        except Exception as e:
+            # The commit itself failed: nothing in the batch was written
+            outcomes = [(future, None, e) for _, future in batch]
+
+        failed = 0
+        for future, result, error in outcomes:
+            if error is not None:
+                failed += 1
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        if failed:
+            print(f"Write-behind: {failed} of {len(batch)} queued writes failed")
+
+        with self._lock:
+            self._jobs += len(batch)
+            self._failed += failed
+            self._batches += 1
+            self._largest_batch = max(self._largest_batch, len(batch))
+
+    def get_stats(self):
+        """Get job and batch counters"""
+        with self._lock:
+            return {
+                'jobs': self._jobs,
+                'failed': self._failed,
+                'batches': self._batches,
+                'average_batch_size': round(self._jobs / self._batches, 2) if self._batches else 0.0,
+                'largest_batch': self._largest_batch,
+                'queued': self._queue.qsize()
+            }
+
+
+# Global write-behind queue
+_queue_instance = None
+_queue_lock = threading.Lock()
+
+
+def get_write_behind():
+    """Get or create the global write-behind queue"""
+    global _queue_instance
+    if _queue_instance is None:
+        with _queue_lock:
+            if _queue_instance is None:
+                _queue_instance = WriteBehindQueue()
+    return _queue_instance